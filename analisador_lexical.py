@@ -1,124 +1,311 @@
+import re
+import sys
+from enum import IntEnum
+
+class Simbolo(IntEnum):    # Códigos inteiros dos tipos de token (comparações e conjuntos baratos no sintático)
+    SPROGRAMA = 1
+    SINICIO = 2
+    SFIM = 3
+    SPROCEDIMENTO = 4
+    SFUNCAO = 5
+    SSE = 6
+    SENTAO = 7
+    SSENAO = 8
+    SENQUANTO = 9
+    SFACA = 10
+    SATRIBUICAO = 11
+    SESCREVA = 12
+    SLEIA = 13
+    SVAR = 14
+    SINTEIRO = 15
+    SBOOLEANO = 16
+    SIDENTIFICADOR = 17
+    SNUMERO = 18
+    SPONTO = 19
+    SPONTO_VIRGULA = 20
+    SVIRGULA = 21
+    SABRE_PARENTESES = 22
+    SFECHA_PARENTESES = 23
+    SMAIOR = 24
+    SMAIORIGUAL = 25
+    SIGUAL = 26
+    SMENOR = 27
+    SMENORIGUAL = 28
+    SDIF = 29
+    SMAIS = 30
+    SMENOS = 31
+    SMULT = 32
+    SDIV = 33
+    SE = 34
+    SOU = 35
+    SNAO = 36
+    SDOISPONTOS = 37
+    SVERDADEIRO = 38
+    SFALSO = 39
+    SERRO = 40
+
+DESCRICAO_SIMBOLO = {  # Texto mostrado nas mensagens de erro para cada tipo de token
+    Simbolo.SPROGRAMA: "programa",
+    Simbolo.SINICIO: "inicio",
+    Simbolo.SFIM: "fim",
+    Simbolo.SPROCEDIMENTO: "procedimento",
+    Simbolo.SFUNCAO: "funcao",
+    Simbolo.SSE: "se",
+    Simbolo.SENTAO: "entao",
+    Simbolo.SSENAO: "senao",
+    Simbolo.SENQUANTO: "enquanto",
+    Simbolo.SFACA: "faca",
+    Simbolo.SATRIBUICAO: ":=",
+    Simbolo.SESCREVA: "escreva",
+    Simbolo.SLEIA: "leia",
+    Simbolo.SVAR: "var",
+    Simbolo.SINTEIRO: "inteiro",
+    Simbolo.SBOOLEANO: "booleano",
+    Simbolo.SIDENTIFICADOR: "identificador",
+    Simbolo.SNUMERO: "numero",
+    Simbolo.SPONTO: ".",
+    Simbolo.SPONTO_VIRGULA: ";",
+    Simbolo.SVIRGULA: ",",
+    Simbolo.SABRE_PARENTESES: "(",
+    Simbolo.SFECHA_PARENTESES: ")",
+    Simbolo.SMAIOR: ">",
+    Simbolo.SMAIORIGUAL: ">=",
+    Simbolo.SIGUAL: "=",
+    Simbolo.SMENOR: "<",
+    Simbolo.SMENORIGUAL: "<=",
+    Simbolo.SDIF: "!=",
+    Simbolo.SMAIS: "+",
+    Simbolo.SMENOS: "-",
+    Simbolo.SMULT: "*",
+    Simbolo.SDIV: "div",
+    Simbolo.SE: "e",
+    Simbolo.SOU: "ou",
+    Simbolo.SNAO: "nao",
+    Simbolo.SDOISPONTOS: ":",
+    Simbolo.SVERDADEIRO: "verdadeiro",
+    Simbolo.SFALSO: "falso",
+    Simbolo.SERRO: "erro",
+}
+
 class Token:
-    def __init__(self, lexema, simbolo, linha): # Armazena informação de um token (lexema, tipo e linha)
+    __slots__ = ("lexema", "simbolo", "linha", "coluna")
+
+    def __init__(self, lexema, simbolo, linha, coluna=0): # Armazena informação de um token (lexema, tipo, linha e coluna)
         self.lexema = lexema
         self.simbolo = simbolo
         self.linha = linha
+        self.coluna = coluna
 
     def __repr__(self): # Representação bonita para debug
-        return f"Token(lexema='{self.lexema}', simbolo='{self.simbolo}', linha={self.linha})"
+        return f"Token(lexema='{self.lexema}', simbolo={self.simbolo.name}, linha={self.linha}, coluna={self.coluna})"
+
+# Espaços em branco (mesma classe de str.isspace) e comentários { ... }; um comentário sem '}' vai até o fim
+_IGNORAVEIS = re.compile(r"(?:\s+|\{[^}]*\}?)+")
+
+# Regex mestre: cada grupo nomeado corresponde a uma classe de token. \w equivale a isalnum() ou '_'
+_TOKEN = re.compile(r"(?P<numero>[0-9]+)|(?P<identificador>[A-Za-z]\w*)|(?P<operador>:=|<=|<>|>=|!=|[-+*:<>=.;,()])")
+
+_OPERADORES = {
+    ":=": Simbolo.SATRIBUICAO, ":": Simbolo.SDOISPONTOS,
+    "+": Simbolo.SMAIS, "-": Simbolo.SMENOS, "*": Simbolo.SMULT,
+    "<": Simbolo.SMENOR, "<=": Simbolo.SMENORIGUAL, "<>": Simbolo.SDIF, ">": Simbolo.SMAIOR, ">=": Simbolo.SMAIORIGUAL,
+    "=": Simbolo.SIGUAL, "!=": Simbolo.SDIF,
+    ".": Simbolo.SPONTO, ";": Simbolo.SPONTO_VIRGULA, ",": Simbolo.SVIRGULA,
+    "(": Simbolo.SABRE_PARENTESES, ")": Simbolo.SFECHA_PARENTESES,
+}
+
+_CONTINUACAO_IDENTIFICADOR = re.compile(r"\w*")
 
 class AnalisadorLexical:
-    def __init__(self, nome_arquivo):   # Inicializa o analisador e abre o arquivo fonte
+    def __init__(self, nome_arquivo):   # Inicializa o analisador e lê o arquivo fonte inteiro para a memória
         try:
-            self.file = open(nome_arquivo, 'r')
+            with open(nome_arquivo, 'r') as arquivo:
+                texto = arquivo.read()
         except FileNotFoundError:
             raise Exception(f"Erro: Ficheiro '{nome_arquivo}' não encontrado.")
-        
+        self._iniciar(texto)
+
+    @classmethod
+    def de_texto(cls, texto):   # Cria o analisador sobre um texto já em memória (editor, compilação em memória)
+        lexico = cls.__new__(cls)
+        lexico._iniciar(texto)
+        return lexico
+
+    def _iniciar(self, texto):
+        self.texto = texto
         self.keywords = {
-            "programa": "sprograma", "se": "sse", "entao": "sentao", "senao": "ssenao",
-            "enquanto": "senquanto", "faca": "sfaca", "inicio": "sinicio", "fim": "sfim",
-            "escreva": "sescreva", "leia": "sleia", "var": "svar", "inteiro": "sinteiro",
-            "booleano": "sbooleano", "verdadeiro": "sverdadeiro", "falso": "sfalso",
-            "procedimento": "sprocedimento", "funcao": "sfuncao", "div": "sdiv",
-            "e": "se", "ou": "sou", "nao": "snao",
+            "programa": Simbolo.SPROGRAMA, "se": Simbolo.SSE, "entao": Simbolo.SENTAO, "senao": Simbolo.SSENAO,
+            "enquanto": Simbolo.SENQUANTO, "faca": Simbolo.SFACA, "inicio": Simbolo.SINICIO, "fim": Simbolo.SFIM,
+            "escreva": Simbolo.SESCREVA, "leia": Simbolo.SLEIA, "var": Simbolo.SVAR, "inteiro": Simbolo.SINTEIRO,
+            "booleano": Simbolo.SBOOLEANO, "verdadeiro": Simbolo.SVERDADEIRO, "falso": Simbolo.SFALSO,
+            "procedimento": Simbolo.SPROCEDIMENTO, "funcao": Simbolo.SFUNCAO, "div": Simbolo.SDIV,
+            "e": Simbolo.SE, "ou": Simbolo.SOU, "nao": Simbolo.SNAO,
         }
         self.linha_atual = 0
+        self.comentario_aberto = False  # True se a varredura terminou dentro de um comentário sem '}'
+        self._tokens = self.tokens()
 
-    def proximo_token(self):    # Lê e retorna o próximo token válido
-        """Versão simplificada e corrigida para ler o próximo token."""
-        char = self.file.read(1)
-        # 1. Loop para ignorar todos os espaços em branco e comentários
-        while char and (char.isspace() or char == '{'):
-            if char == '\n':
-                self.linha_atual += 1
-            if char == '{':
-                # Consome tudo até encontrar o '}'
-                while char and char != '}':
-                    char = self.file.read(1)
-                    if char == '\n':
-                        self.linha_atual += 1
-            char = self.file.read(1)
-        
-        # 2. Se chegámos ao fim do ficheiro/arquivo, retorna None
-        if not char:
-            return None
-
-        # 3. Se temos um caractere válido, retorna o seu token
-        return self._get_token(char)
-
-    def fechar(self):   # Fecha o arquivo aberto
-        if self.file:
-            self.file.close()
-
-    def _get_token(self, char):  # Decide o tipo de token com base no caractere inicial
-        if char.isdigit():
-            return self._handle_digit(char) # Número
-        elif char.isalpha():
-            return self._handle_identifier_or_keyword(char) # Identificador ou palavra-chave
-        elif char == ':':
-            return self._handle_assignment(char)    # :=
-        elif char in ['+', '-', '*']:
-            return Token(char, {'+': 'smais', '-': 'smenos', '*': 'smult'}.get(char), self.linha_atual)
-        elif char in ['<', '>', '=', '!']:
-            return self._handle_relational_operator(char)   # <, >, <=, >=, !=
-        elif char in ['.', ';', ',', '(', ')']:
-            return Token(char, {'.': 'sponto', ';': 'sponto_virgula', ',': 'svirgula', '(': 'sabre_parenteses', ')': 'sfecha_parenteses'}.get(char), self.linha_atual)
-        else:
-            return Token(char, "serro", self.linha_atual)   # Token inválido
-
-    def _handle_relational_operator(self, char):    # Trata < > <= >= <> !=
-        prox_char = self.file.read(1)
-        
-        if char == '<':
-            if prox_char == '=':
-                return Token("<=", "smenorigual", self.linha_atual)
-            if prox_char == '>':
-                return Token("<>", "sdif", self.linha_atual)
-        elif char == '>':
-            if prox_char == '=':
-                return Token(">=", "smaiorigual", self.linha_atual)
-        elif char == '!':
-            if prox_char == '=':
-                return Token("!=", "sdif", self.linha_atual)        
-        if prox_char:   # Se não formou operador duplo, devolve o caractere lido
-            self.file.seek(self.file.tell() - 1)
-        if char == '=':
-            return Token("=", "sigual", self.linha_atual)
-        if char == '<':
-            return Token("<", "smenor", self.linha_atual)
-        if char == '>':
-            return Token(">", "smaior", self.linha_atual)
-        return Token(char, "serro", self.linha_atual)
-
-    def _handle_assignment(self, char): # Trata ':' e ':='
-        prox_char = self.file.read(1)
-        if prox_char == '=':
-            return Token(":=", "satribuicao", self.linha_atual)
-        else:
-            if prox_char:
-                self.file.seek(self.file.tell() - 1)
-            return Token(":", "sdoispontos", self.linha_atual)
+    def tokens(self):   # Gerador que varre o buffer uma única vez e produz todos os tokens
+        return self._varrer(self.texto, 0, 0)
 
-    def _handle_identifier_or_keyword(self, char):  # Diferencia palavras-chave de identificadores
-        lexema = char
-        while True:
-            prox_char = self.file.read(1)
-            if prox_char and (prox_char.isalnum() or prox_char == '_'):
-                lexema += prox_char
-            else:
-                if prox_char:
-                    self.file.seek(self.file.tell() - 1)
-                break
-        return Token(lexema, self.keywords.get(lexema, "sidentificador"), self.linha_atual)
+    def _varrer(self, texto, pos, linha):  # Núcleo da varredura a partir de 'pos' (usado também pelo léxico incremental)
+        tamanho = len(texto)
+        keywords = self.keywords
+        ignoraveis = _IGNORAVEIS.match
+        proximo = _TOKEN.match
+        intern = sys.intern
+        identificador = Simbolo.SIDENTIFICADOR
+        numero = Simbolo.SNUMERO
+        inicio_linha = texto.rfind('\n', 0, pos) + 1
+        self.linha_atual = linha
+        self.comentario_aberto = False
 
-    def _handle_digit(self, char):  # Lê números inteiros
-        lexema = char
         while True:
-            prox_char = self.file.read(1)
-            if prox_char and prox_char.isdigit():
-                lexema += prox_char
+            # 1. Pula espaços em branco e comentários contando as quebras de linha
+            pulo = ignoraveis(texto, pos)
+            if pulo:
+                fim = pulo.end()
+                quebras = texto.count('\n', pos, fim)
+                if quebras:
+                    linha += quebras
+                    inicio_linha = texto.rfind('\n', pos, fim) + 1
+                    self.linha_atual = linha
+                pos = fim
+
+            # 2. Fim do arquivo (o último pulo pode ter aberto um comentário que nunca fecha)
+            if pos >= tamanho:
+                if pulo and texto.rfind('{', pulo.start()) > texto.rfind('}', pulo.start()):
+                    self.comentario_aberto = True
+                return
+
+            # 3. Token pela regex mestre; caracteres fora do ASCII seguem o caminho lento
+            m = proximo(texto, pos)
+            if m is None:
+                token, pos = self._token_unicode(texto, pos, linha, pos - inicio_linha)
+                yield token
+                continue
+
+            lexema = m.group()
+            fim = m.end()
+            tipo = m.lastgroup
+            if tipo == "identificador":
+                simbolo = keywords.get(lexema)
+                if simbolo is None:
+                    yield Token(intern(lexema), identificador, linha, pos - inicio_linha)
+                else:
+                    yield Token(lexema, simbolo, linha, pos - inicio_linha)
+            elif tipo == "numero":
+                if fim < tamanho and texto[fim] > '\x7f':   # dígitos Unicode (isdigit) continuam o número
+                    fim = self._fim_numero(texto, fim)
+                    lexema = texto[pos:fim]
+                yield Token(lexema, numero, linha, pos - inicio_linha)
             else:
-                if prox_char:
-                    self.file.seek(self.file.tell() - 1)
+                yield Token(lexema, _OPERADORES[lexema], linha, pos - inicio_linha)
+            pos = fim
+
+    def _token_unicode(self, texto, pos, linha, coluna):  # Caminho lento: replica isdigit/isalpha do léxico original
+        char = texto[pos]
+        if char.isdigit():
+            fim = self._fim_numero(texto, pos + 1)
+            return Token(texto[pos:fim], Simbolo.SNUMERO, linha, coluna), fim
+        if char.isalpha():
+            fim = _CONTINUACAO_IDENTIFICADOR.match(texto, pos + 1).end()
+            lexema = sys.intern(texto[pos:fim])
+            return Token(lexema, self.keywords.get(lexema, Simbolo.SIDENTIFICADOR), linha, coluna), fim
+        return Token(char, Simbolo.SERRO, linha, coluna), pos + 1   # Token inválido
+
+    def _fim_numero(self, texto, pos):  # Avança enquanto houver dígitos
+        tamanho = len(texto)
+        while pos < tamanho and texto[pos].isdigit():
+            pos += 1
+        return pos
+
+    def proximo_token(self):    # Lê e retorna o próximo token válido
+        return next(self._tokens, None)
+
+    def fechar(self):   # Mantido por compatibilidade: o arquivo já foi lido e fechado na construção
+        self._tokens.close()
+
+class LexicoIncremental:    # Mantém os tokens por linha e re-lexa apenas as linhas afetadas por uma edição
+    """
+    Tokens nunca atravessam quebras de linha; o único estado que passa de uma linha
+    para a seguinte é estar (ou não) dentro de um comentário { ... }. Por isso cada
+    linha guarda seus tokens e o estado com que começa: após uma edição, o re-léxico
+    parte da primeira linha alterada e segue até o estado de entrada de uma linha
+    posterior à edição coincidir com o da execução anterior.
+    """
+
+    def __init__(self, texto=""):
+        self._lexico = AnalisadorLexical.de_texto("")
+        self.carregar(texto)
+
+    def carregar(self, texto):  # Léxico completo (ex.: ao abrir um arquivo)
+        self.linhas = texto.split('\n')
+        self.tokens_por_linha = [[] for _ in self.linhas]
+        self.estados = [False] * (len(self.linhas) + 1)  # estados[i]: linha i começa dentro de um comentário
+        self._relexar(0, len(self.linhas))
+
+    def editar(self, inicio, fim, texto_novo):  # Substitui o trecho [inicio, fim) — posições (linha, coluna) — por texto_novo
+        """Aplica a edição e devolve o intervalo de linhas (primeira, última + 1) que foi re-lexado."""
+        (linha_ini, col_ini), (linha_fim, col_fim) = inicio, fim
+        trecho = (self.linhas[linha_ini][:col_ini] + texto_novo + self.linhas[linha_fim][col_fim:]).split('\n')
+        return self._substituir(linha_ini, linha_fim + 1, trecho)
+
+    def atualizar_texto(self, texto):   # Descobre o trecho alterado comparando linhas e re-lexa só ele
+        novas = texto.split('\n')
+        antigas = self.linhas
+        limite = min(len(novas), len(antigas))
+        prefixo = 0
+        while prefixo < limite and novas[prefixo] == antigas[prefixo]:
+            prefixo += 1
+        sufixo = 0
+        while sufixo < limite - prefixo and novas[-1 - sufixo] == antigas[-1 - sufixo]:
+            sufixo += 1
+        if prefixo == len(novas) == len(antigas):
+            return (prefixo, prefixo)
+        return self._substituir(prefixo, len(antigas) - sufixo, novas[prefixo:len(novas) - sufixo])
+
+    def tokens(self):   # Todos os tokens em ordem, com as âncoras de linha atualizadas
+        for i in range(len(self.linhas)):
+            yield from self.tokens_da_linha(i)
+
+    def tokens_da_linha(self, i):   # Tokens de uma linha; a âncora é corrigida aqui se linhas anteriores mudaram
+        tokens = self.tokens_por_linha[i]
+        if tokens and tokens[0].linha != i:
+            for token in tokens:
+                token.linha = i
+        return tokens
+
+    def _substituir(self, inicio, fim, novas_linhas):   # Troca linhas [inicio, fim) e re-lexa a partir de 'inicio'
+        self.linhas[inicio:fim] = novas_linhas
+        self.tokens_por_linha[inicio:fim] = [[] for _ in novas_linhas]
+        # Linhas novas começam com estado desconhecido (None força o re-léxico); a linha seguinte ao trecho
+        # conserva o estado de entrada antigo, usado para decidir onde o re-léxico pode parar
+        if novas_linhas:
+            self.estados[inicio + 1:fim + 1] = [None] * (len(novas_linhas) - 1) + [self.estados[fim]]
+        else:
+            del self.estados[inicio + 1:fim + 1]
+        return self._relexar(inicio, inicio + len(novas_linhas))
+
+    def _relexar(self, inicio, fim_minimo):  # Re-lexa de 'inicio' até 'fim_minimo' e além, enquanto o estado divergir
+        i = inicio
+        total = len(self.linhas)
+        while i < total:
+            tokens, estado_saida = self._lexar_linha(i)
+            self.tokens_por_linha[i] = tokens
+            i += 1
+            if i >= fim_minimo and self.estados[i] == estado_saida:
                 break
-        return Token(lexema, "snumero", self.linha_atual)
\ No newline at end of file
+            self.estados[i] = estado_saida
+        return (inicio, i)
+
+    def _lexar_linha(self, i):  # Lexa uma linha partindo do estado de comentário da sua entrada
+        texto = self.linhas[i]
+        pos = 0
+        if self.estados[i]:
+            fecha = texto.find('}')
+            if fecha < 0:
+                return [], True
+            pos = fecha + 1
+        tokens = list(self._lexico._varrer(texto, pos, i))
+        return tokens, self._lexico.comentario_aberto
@@ -1,185 +1,233 @@
-class TabelaSimbolos:
+from diagnosticos import Diagnostico, SEMANTICO
+from arvore_sintatica import (pos_ordem, Atribuicao, ChamadaProcedimento, Composto,
+                              Enquanto, Escreva, Identificador, Leia, Se, Unario, Binario)
+
+_TIPOS_SIMPLES = frozenset({'inteiro', 'booleano'})    # tipos que ocupam 1 posição de memória
+
+class EntradaSimbolo:   # Registro de um identificador declarado
+    __slots__ = ("nome", "escopo", "tipo", "memoria", "rotulo")
+
+    def __init__(self, nome, escopo, tipo, memoria, rotulo):
+        self.nome = nome
+        self.escopo = escopo        # nível do escopo onde foi declarado
+        self.tipo = tipo
+        self.memoria = memoria
+        self.rotulo = rotulo
+
+    def __repr__(self):
+        return (f"EntradaSimbolo({self.nome!r}, escopo={self.escopo}, tipo={self.tipo!r}, "
+                f"memoria={self.memoria}, rotulo={self.rotulo!r})")
+
+class TabelaSimbolos:   # Tabela com hashing por escopo: nome -> pilha de declarações, a do topo é a visível
     def __init__(self):
-        self.escopos = [{}]  # lista de escopos (pilha): escopo global começa aqui
+        self.simbolos = {}  # nome -> lista de EntradaSimbolo (a última esconde as anteriores)
+        self.declarados = [[]]  # por escopo (pilha), os nomes declarados nele: desfeitos ao sair
         self.nivel_atual = 0  # nível atual do escopo
         self.endereco_memoria = 1  # contador de endereços para variáveis
+        self.bases = [1]    # por escopo, o endereço livre ao entrar nele (restaurado ao sair)
 
     def adicionar_simbolo(self, nome, tipo=None, rotulo=None):  # adiciona identificador no escopo atual
-        if nome in self.escopos[-1]:
+        pilha = self.simbolos.get(nome)
+        if pilha and pilha[-1].escopo == self.nivel_atual:
             raise ValueError(f"símbolo '{nome}' já declarado no escopo atual.")
-        memoria = self.endereco_memoria
-        self.escopos[-1][nome] = {
-            'nome': nome,
-            'escopo': self.nivel_atual,
-            'tipo': tipo,
-            'memoria': memoria,
-            'rotulo': rotulo
-        }
-        if self.escopos[-1][nome]['tipo'] in ['inteiro', 'booleano']:   # tipos simples ocupam 1 posição
+        entrada = EntradaSimbolo(nome, self.nivel_atual, tipo, self.endereco_memoria, rotulo)
+        if pilha is None:
+            self.simbolos[nome] = [entrada]
+        else:
+            pilha.append(entrada)
+        self.declarados[-1].append(nome)
+        if tipo in _TIPOS_SIMPLES:
             self.endereco_memoria += 1
+        return entrada
 
-    def buscar_simbolo(self, nome): # busca identificador do escopo atual para trás
-        for escopo in reversed(self.escopos):
-            if nome in escopo:
-                return escopo[nome]
+    def buscar_simbolo(self, nome): # declaração visível do identificador (a do escopo mais interno), em O(1)
+        pilha = self.simbolos.get(nome)
+        if pilha:
+            return pilha[-1]
         raise ValueError(f"símbolo '{nome}' não declarado dentro do escopo.")
-                    
+
+    def simbolo_local(self, nome):  # declaração do identificador no escopo atual, ou None
+        pilha = self.simbolos.get(nome)
+        if pilha and pilha[-1].escopo == self.nivel_atual:
+            return pilha[-1]
+        return None
+
     def entrar_escopo(self):        # cria um novo escopo (bloco, função, procedimento)
-        self.escopos.append({})
+        self.declarados.append([])
+        self.bases.append(self.endereco_memoria)
         self.nivel_atual += 1
 
-    def sair_escopo(self):          # remove último escopo e devolve símbolos retirados
-        pop = []
-        dalloc = None
-        if len(self.escopos) >= 1:
-            dalloc = self.escopos.pop()
-            self.nivel_atual -= 1
-
-        for simbolo in dalloc:      # coleta símbolos para desalocar
-            pop.append(simbolo)
-        
-        for simbolo in pop:         # decrementa contador de memória
-            dalloc.pop(simbolo)
-            self.endereco_memoria -= 1
-                
-        return dalloc
-
-def tipo_expressao(posfixa, tabela):    # determina o tipo final da expressão pós-fixa
+    def sair_escopo(self):          # remove o último escopo desfazendo só as suas declarações; devolve os nomes retirados
+        nomes = self.declarados.pop()
+        self.nivel_atual -= 1
+        simbolos = self.simbolos
+        for nome in nomes:
+            pilha = simbolos[nome]
+            pilha.pop()
+            if not pilha:
+                del simbolos[nome]
+        # As variáveis do escopo ocupavam [base, endereco_memoria): a área volta a ficar livre. Subrotinas
+        # não ocupam memória, então não se desconta uma posição por símbolo retirado.
+        self.endereco_memoria = self.bases.pop()
+        return nomes
+
+_OPERADORES_ARITMETICOS = {'+', '-', '*', 'div'}
+_OPERADORES_RELACIONAIS = {'<', '<=', '>', '>=', '=', '!='}
+
+def tipo_unario(operador, tipo):    # tipo do resultado de '+u', '-u' ou 'nao'; TypeError se o operando não serve
+    if operador == 'nao':
+        if tipo != 'booleano':
+            raise TypeError(f"Erro de tipo: O operador 'nao' espera 'booleano', mas recebeu '{tipo}'")
+        return 'booleano'
+    if tipo != 'inteiro':
+        raise TypeError(f"Erro de tipo: O operador '{operador}' espera 'inteiro', mas recebeu '{tipo}'")
+    return 'inteiro'
+
+def tipo_binario(operador, tipo1, tipo2):   # tipo do resultado de um operador binário; TypeError se os operandos não servem
+    if operador in _OPERADORES_ARITMETICOS:
+        if not (tipo1 == 'inteiro' and tipo2 == 'inteiro'):
+            raise TypeError(f"Erro de tipo: Operador '{operador}' inválido entre '{tipo1}' e '{tipo2}'")
+        return 'inteiro'
+    if operador in _OPERADORES_RELACIONAIS:
+        if not (tipo1 == 'inteiro' and tipo2 == 'inteiro'):
+            raise TypeError(f"Erro de tipo: Operador relacional '{operador}' inválido entre '{tipo1}' e '{tipo2}'")
+        return 'booleano'
+    if not (tipo1 == 'booleano' and tipo2 == 'booleano'):   # 'e' / 'ou'
+        raise TypeError(f"Erro de tipo: Operador lógico '{operador}' inválido entre '{tipo1}' e '{tipo2}'")
+    return 'booleano'
+
+class VerificadorSemantico:     # Passo semântico do modo em passes: resolve nomes, endereços e tipos na árvore
     """
-    Determina o tipo de retorno de uma expressão pós-fixa.
+    Percorre a árvore na mesma ordem em que o modo de passo único consulta a tabela, de modo que
+    endereços e escopos saem idênticos. Anota DeclaracaoVariaveis (endereco/tamanho), Subrotina e
+    Identificador (simbolo = entrada da tabela) e o tipo de cada nó de expressão.
+    Os erros vão para self.diagnosticos e a verificação continua; um tipo desconhecido (None)
+    não gera novos erros, para não repetir a mesma falha em cascata.
     """
-    
-    # 1. Define os nossos operadores
-    # Usar um Set é mais rápido para 'in'
-    OPERADORES_UNARIOS = {'+u', '-u', 'nao'}    # operadores que usam 1 operando
-    OPERADORES_BINARIOS = {                     # operadores que usam 2 operandos
-        '+', '-', '*', 'div', 
-        '<', '<=', '>', '>=', '=', '!=', 
-        'e', 'ou'
-    }
-    
-    # 2. Cria a nossa pilha (stack) de tipos
-    pilha_tipos = []                            # pilha para validar tipos
-    
-    # 3. Itera pela expressão pós-fixa UMA VEZ
-    for token in posfixa:
-        
-        # Caso 1: O token é um OPERANDO (um literal ou variável)
-        if token not in OPERADORES_UNARIOS and token not in OPERADORES_BINARIOS:
-            tipo_token = ''
-            
-            if token in ['verdadeiro', 'falso']:
-                tipo_token = 'booleano'         # literal booleano
-            elif token.isnumeric():
-                tipo_token = 'inteiro'          # literal inteiro
-            else:
-                # É uma variável, busca na tabela de símbolos
+
+    def __init__(self):
+        self.tabela = TabelaSimbolos()
+        self.diagnosticos = []
+        self._comandos = {
+            Atribuicao: self._atribuicao,
+            ChamadaProcedimento: self._chamada_procedimento,
+            Composto: self._composto,
+            Enquanto: self._enquanto,
+            Escreva: self._escreva,
+            Leia: self._leia,
+            Se: self._se,
+        }
+
+    def verificar(self, programa):
+        if programa.nome is not None:
+            self.tabela.adicionar_simbolo(programa.nome, tipo='programa')
+        self._bloco(programa.bloco)
+        return self.diagnosticos
+
+    def _erro(self, mensagem, linha, coluna=None):
+        self.diagnosticos.append(Diagnostico(SEMANTICO, str(mensagem), linha, coluna))
+
+    def _buscar(self, identificador):   # Resolve o nome e anota o nó com a entrada da tabela (None se não declarado)
+        try:
+            simbolo = self.tabela.buscar_simbolo(identificador.nome)
+        except ValueError as e:
+            self._erro(e, identificador.linha, identificador.coluna)
+            return None
+        identificador.simbolo = simbolo
+        identificador.tipo = simbolo.tipo.replace('funcao ', '') if simbolo.tipo else None
+        return simbolo
+
+    def _bloco(self, bloco):
+        bloco.endereco = self.tabela.endereco_memoria
+        for declaracao in bloco.variaveis:
+            declaracao.endereco = self.tabela.endereco_memoria
+            for nome, (linha, coluna) in zip(declaracao.nomes, declaracao.posicoes):
                 try:
-                    simbolo = tabela.buscar_simbolo(token)  # Ex: buscar 'a'
-                    tipo_token = simbolo['tipo']            # Ex: 'inteiro'
-                    if tipo_token in ['funcao inteiro', 'funcao booleano']: # funções retornam tipo simples
-                        tipo_token = tipo_token.replace('funcao ', '')
-                except Exception as e:
-                    raise ValueError(f"Erro ao buscar símbolo '{token}': {e}")
-            
-            # Empilha o TIPO do operando
-            pilha_tipos.append(tipo_token)
-        
-        # Caso 2: O token é um OPERADOR
-        else:
-            operador = token
-            try:
-                # --- Lógica para Operadores Unários ---
-                if operador in OPERADORES_UNARIOS:
-                    tipo1 = pilha_tipos.pop()
-                    
-                    if operador == 'nao':
-                        if tipo1 != 'booleano':
-                            raise TypeError(f"Erro de tipo: O operador 'nao' espera 'booleano', mas recebeu '{tipo1}'")
-                        pilha_tipos.append('booleano')      # Resultado de 'nao' é booleano
-                    
-                    else: # +u ou -u (unário)
-                        if tipo1 != 'inteiro':
-                            raise TypeError(f"Erro de tipo: O operador '{operador}' espera 'inteiro', mas recebeu '{tipo1}'")
-                        pilha_tipos.append('inteiro')       # Resultado de '+u' é inteiro
-
-                # --- Lógica para Operadores Binários ---
-                elif operador in OPERADORES_BINARIOS:
-                    tipo2 = pilha_tipos.pop()
-                    tipo1 = pilha_tipos.pop()
-                    
-                    if operador in ['+', '-', '*', 'div']:
-                        if not (tipo1 == 'inteiro' and tipo2 == 'inteiro'):
-                            raise TypeError(f"Erro de tipo: Operador '{operador}' inválido entre '{tipo1}' e '{tipo2}'")
-                        pilha_tipos.append('inteiro')       # Resultado de aritmética é inteiro
-                    
-                    elif operador in ['<', '<=', '>', '>=', '=', '!=']:
-                        if not (tipo1 == 'inteiro' and tipo2 == 'inteiro'):
-                            raise TypeError(f"Erro de tipo: Operador relacional '{operador}' inválido entre '{tipo1}' e '{tipo2}'")
-                        pilha_tipos.append('booleano')      # Resultado de comparação é booleano
-                    
-                    elif operador in ['e', 'ou']:
-                        if not (tipo1 == 'booleano' and tipo2 == 'booleano'):
-                            raise TypeError(f"Erro de tipo: Operador lógico '{operador}' inválido entre '{tipo1}' e '{tipo2}'")
-                        pilha_tipos.append('booleano')      # Resultado de lógica é booleano
-            
-            except IndexError:
-                                                            # Se der .pop() numa pilha vazia, a expressão está mal formada
-                raise ValueError(f"Expressão pós-fixa mal formada. Faltam operandos para o operador '{operador}'.")
-
-    # 4. Verificação Final
-    if len(pilha_tipos) != 1:
-        raise ValueError(f"Expressão final mal formada. Sobraram tipos na pilha: {pilha_tipos}")
-    
-    # O único item que sobrou na pilha é o tipo final!
-    return pilha_tipos[0]
-
-def posfix(expressao):  # converte infixa → pós-fixa (shunting-yard adaptado)
-    order = {'*': 1, 'div': 1,                                  # Multiplicação e Divisão têm precedência 1
-             '+': 2, '-': 2,                                    # Adição e Subtração têm precedência 2
-             '<': 3, '<=': 3, '>': 3, '>=': 3, '=': 3, '!=': 3, # Relações têm precedência 3
-             'nao': 4,                                          # Negação tem precedência 4
-             'e': 5,                                            # Conjunção tem precedência 5
-             'ou': 6}                                           # Disjunção tem precedência 6
-    
-    stack = []      # pilha de operadores
-    posfixa = []    # saída pós-fixa
-
-    for i in range(len(expressao)):                                         # varre expressão token por token
-        if expressao[i] not in order and expressao[i] not in ['(', ')']:
-            posfixa.append(expressao[i])                                    # token simples vai direto para saída
-            if stack and stack[-1] in ['+u', '-u']:                         # resolve unários imediatamente
-                posfixa.append(stack.pop())
-        
-        if expressao[i] == '(':
-            stack.append(expressao[i])                      # empilha parênteses
-
-        if expressao[i] == ')':                             # desempilha até achar '('
-            while stack and stack[-1] != '(':
-                posfixa.append(stack.pop())
-            stack.pop()
-            if stack and stack[-1] == 'nao':                # resolve NOT
-                posfixa.append(stack.pop())
-            if stack and stack[-1] in ['+u', '-u']:         # resolve unário
-                posfixa.append(stack.pop())
-
-        if expressao[i] in ['+', '-']:
-            if expressao[i-1] in ['+', '-', '*', 'div', '<', '<=', '>', '>=', '=', '!=', 'e', 'ou', '(', None]:
-                stack.append(f'{expressao[i]}u')            # Operador unário
-            else:
-                while stack and stack[-1] != '(' and order[expressao[i]] >= order[stack[-1]]:
-                    posfixa.append(stack.pop())
-                stack.append(expressao[i])  
-        
-        elif expressao[i] in ['*', 'div', '<', '<=', '>', '>=', '=', '!=', 'e', 'ou', 'nao']:
-            while stack and stack[-1] != '(' and order[expressao[i]] >= order[stack[-1]]:
-                posfixa.append(stack.pop())
-            stack.append(expressao[i])
-
-    while stack:                                            # esvazia pilha
-        posfixa.append(stack.pop())
-
-    if None in posfixa:                                     # remove marcadores auxiliares
-        posfixa.remove(None)
-    return posfixa
+                    self.tabela.adicionar_simbolo(nome, tipo=declaracao.tipo)
+                except ValueError as e:
+                    self._erro(e, linha, coluna)
+            declaracao.tamanho = self.tabela.endereco_memoria - declaracao.endereco
+        bloco.tamanho = self.tabela.endereco_memoria - bloco.endereco  # área de todas as variáveis do bloco
+
+        for subrotina in bloco.subrotinas:
+            if subrotina.nome is not None and subrotina.tipo is not None:
+                try:
+                    subrotina.simbolo = self.tabela.adicionar_simbolo(subrotina.nome, tipo=subrotina.tipo)
+                except ValueError as e:
+                    self._erro(e, subrotina.linha, subrotina.coluna)
+            self.tabela.entrar_escopo()
+            self._bloco(subrotina.bloco)
+
+        self._composto(bloco.corpo)
+        self.tabela.sair_escopo()
+
+    def _comando(self, comando):
+        self._comandos[comando.__class__](comando)
+
+    def _composto(self, composto):
+        for comando in composto.comandos:
+            self._comando(comando)
 
+    def _atribuicao(self, atribuicao):
+        simbolo = self._buscar(atribuicao.alvo)
+        tipo_expressao = self._expressao(atribuicao.expressao, atribuicao)
+        if simbolo is None or tipo_expressao is None:
+            return
+        tipo = simbolo.tipo
+        if tipo in ['funcao inteiro', 'funcao booleano']:
+            tipo = tipo.replace('funcao ', '')
+        if tipo_expressao != tipo:
+            self._erro(f"Tipo incompatível na atribuição para '{atribuicao.alvo.nome}'. Esperado '{tipo}'.",
+                       atribuicao.linha, atribuicao.coluna)
+
+    def _chamada_procedimento(self, chamada):
+        simbolo = self._buscar(chamada.alvo)
+        if simbolo is not None and simbolo.tipo != 'procedimento' and not simbolo.tipo.startswith('funcao'):
+            self._erro(f"símbolo '{chamada.alvo.nome}' não é um procedimento.", chamada.linha, chamada.coluna)
+
+    def _leia(self, leia):
+        self._buscar(leia.alvo)
+
+    def _escreva(self, escreva):
+        self._buscar(escreva.alvo)
+
+    def _condicao(self, comando, nome):     # Condição de se/enquanto precisa ser booleana
+        tipo = self._expressao(comando.condicao, comando)
+        if tipo is not None and tipo != 'booleano':
+            self._erro(f"Expressão do '{nome}' deve ser do tipo booleano.", comando.linha, comando.coluna)
+
+    def _se(self, se):
+        self._condicao(se, 'se')
+        self._comando(se.entao)
+        if se.senao is not None:
+            self._comando(se.senao)
+
+    def _enquanto(self, enquanto):
+        self._condicao(enquanto, 'enquanto')
+        self._comando(enquanto.corpo)
+
+    def _expressao(self, expressao, comando):   # Tipa em pós-ordem; erros de tipo saem na posição do fim da expressão
+        erro_tipo = None
+        for no in pos_ordem(expressao):
+            classe = no.__class__
+            if classe is Identificador:
+                self._buscar(no)
+                continue
+            if classe is Unario:
+                tipos = (no.operando.tipo,)
+                regra = tipo_unario
+            elif classe is Binario:
+                tipos = (no.esquerda.tipo, no.direita.tipo)
+                regra = tipo_binario
+            else:
+                continue
+            no.tipo = None
+            if erro_tipo is None and None not in tipos:
+                try:
+                    no.tipo = regra(no.operador, *tipos)
+                except TypeError as e:
+                    erro_tipo = e
+        if erro_tipo is not None:   # só o primeiro erro de tipo da expressão, como no modo de passo único
+            self._erro(erro_tipo, comando.linha, comando.coluna)
+            return None
+        return expressao.tipo
@@ -1,78 +1,84 @@
+import argparse
+import json
 import sys
 import os
-from analisador_lexical import AnalisadorLexical
-from analisador_semantico import TabelaSimbolos, posfix, tipo_expressao
-from geracao_codigo import Gera
+from analisador_lexical import AnalisadorLexical, Simbolo, DESCRICAO_SIMBOLO
+from analisador_semantico import TabelaSimbolos, VerificadorSemantico, tipo_binario, tipo_unario
+from arvore_sintatica import AnalisadorArvore, OPERADORES_BINARIOS, OPERADORES_SINAL, ORDEM_MAXIMA, ORDEM_RELACIONAL
+from diagnosticos import Diagnostico, LEXICO, SINTATICO, SEMANTICO
+from estatisticas import Estatisticas
+from geracao_codigo import Gera, GeradorArvore, Rotulo, alocar_quadro, avaliar_constante, INSTRUCOES_BINARIAS, INSTRUCOES_UNARIAS
+from bytecode import codificar, escrever_binario
+from ligador import escrever_rotulos, ligar
+from otimizador import LIMITE_EXPANSAO, otimizar_gera, superinstrucoes_gera
+
+_TIPOS = frozenset({Simbolo.SINTEIRO, Simbolo.SBOOLEANO})
+_SUBROTINAS = frozenset({Simbolo.SPROCEDIMENTO, Simbolo.SFUNCAO})
+_BOOLEANOS = frozenset({Simbolo.SVERDADEIRO, Simbolo.SFALSO})
+_REPETICAO_PERMITIDA = frozenset({"inicio", "fim", "(", ")"})   # lexemas que podem aparecer duas vezes seguidas
+_ORDEM_E = OPERADORES_BINARIOS[Simbolo.SE][1]   # operandos de 'e'/'ou' ligam mais forte que o 'e'
+
+# Pontos de sincronização do modo pânico: ';' é consumido, os demais ficam para quem vem depois
+SINCRONIZACAO = frozenset({Simbolo.SPONTO_VIRGULA, Simbolo.SFIM, Simbolo.SINICIO})
+SINCRONIZACAO_DECLARACOES = SINCRONIZACAO | _SUBROTINAS
+SINCRONIZACAO_CABECALHO = SINCRONIZACAO_DECLARACOES | {Simbolo.SVAR}
 
-class Rotulo:   # Classe utilitária que gera rótulos únicos para desvios (L1, L2, ...)
-    contador = 1
-
-    def __new__(cls):   # Cria um novo rótulo único automaticamente
-        rotulo = f"L{cls.contador}"
-        cls.contador += 1
-        return rotulo
+class AnalisadorSintatico:  # Classe principal que coordena toda a análise sintática e geração de código
+    def __init__(self, arquivo_entrada, arquivo_saida): # Inicializa estado, tabela, léxico e gerador
+        self._iniciar(AnalisadorLexical(arquivo_entrada), Gera(filename = arquivo_saida))
 
     @classmethod
-    def go_back_i_want_to_be_monke(cls):   # Decrementa o contador para reutilizar o último rótulo gerado
-        cls.contador = cls.contador - 1
+    def de_texto(cls, texto, gera=None):   # Cria o analisador sobre um texto em memória (sem ler nem escrever arquivos)
+        analisador = cls.__new__(cls)
+        analisador._iniciar(AnalisadorLexical.de_texto(texto), Gera() if gera is None else gera)
+        return analisador
 
-class AnalisadorSintatico:  # Classe principal que coordena toda a análise sintática e geração de código
-    def __init__(self, arquivo_entrada, arquivo_saida): # Inicializa estado, tabela, léxico e gerador
+    def _iniciar(self, lexador, gera):
         self.token_atual = None
-        self.erro = False
-        self.expressao = []
+        self.erro = False       # modo pânico: ligado no erro sintático, desligado ao sincronizar
+        self.erro_tipo = None   # primeiro erro de tipo da expressão em análise
+        self.constante = None   # valor do último operando compilado, se for constante (para dobrar em um LDC)
+        self.curto_circuito = False     # 'e'/'ou' das condições de se/enquanto viram desvios (--curto-circuito)
+        self.diagnosticos = []  # todos os erros encontrados (léxicos, sintáticos e semânticos)
         self.qtd_var = 1
         self.nome_programa = ""
 
         self.escopos_dalloc = [[]]
         self.escopo_atual = 0
+        self.pisos = [1]    # por bloco aberto, o menor s possível entre os seus comandos (s = 1 depois do ALLOC 0 1)
 
-        self.lexador = AnalisadorLexical(arquivo_entrada)
+        self.lexador = lexador
         self.tabela = TabelaSimbolos()
-        self.gera = Gera(filename = arquivo_saida)
-
-        self.keywords = {
-            "sprograma": "programa",
-            "sinicio": "inicio",
-            "sfim": "fim",
-            "sprocedimento": "procedimento",
-            "sfuncao": "funcao",
-            "sse": "se",
-            "sentao": "entao",
-            "ssenao": "senao",
-            "senquanto": "enquanto",
-            "sfaca": "faca",
-            "satribuicao": ":=",
-            "sescreva": "escreva",
-            "sleia": "leia",
-            "svar": "var",
-            "sinteiro": "inteiro",
-            "sbooleano": "booleano",
-            "sidentificador": "identificador",
-            "snumero": "numero",
-            "sponto": ".",
-            "sponto_virgula": ";",
-            "svirgula": ",",
-            "sabre_parenteses": "(",
-            "sfecha_parenteses": ")",
-            "smaior": ">",
-            "smaiorigual": ">=",
-            "sigual": "=",
-            "smenor": "<",
-            "smenorigual": "<=",
-            "sdif": "!=",
-            "smais": "+",
-            "smenos": "-",
-            "smult": "*",
-            "sdiv": "div",
-            "se": "e",
-            "sou": "ou",
-            "snao": "nao",
-            "sdoispontos": ":",
-            "sverdadeiro": "verdadeiro",
-            "sfalso": "falso",
-            "serro": "erro",
-        }
+        self.gera = gera
+        self.rotulo = Rotulo()  # contador de rótulos desta compilação
+
+        self.keywords = DESCRICAO_SIMBOLO
+
+    def _erro_sintatico(self, mensagem):    # Registra o erro e entra em modo pânico (erros seguintes são ignorados até sincronizar)
+        if not self.erro:
+            token = self.token_atual
+            if token is not None and token.simbolo == Simbolo.SERRO:
+                self.diagnosticos.append(Diagnostico.no_token(LEXICO, f"Caractere inválido '{token.lexema}'", token))
+            else:
+                self.diagnosticos.append(Diagnostico.no_token(SINTATICO, mensagem, token))
+        self.erro = True
+
+    def _erro_semantico(self, mensagem, token=None):    # Registra o erro; a análise segue normalmente
+        self.diagnosticos.append(Diagnostico.no_token(SEMANTICO, str(mensagem), token or self.token_atual))
+
+    def _sincronizar(self, parada=SINCRONIZACAO):   # Modo pânico: descarta tokens até um ponto de sincronização
+        while self.token_atual and self.token_atual.simbolo not in parada:
+            self.token_atual = self.lexador.proximo_token()
+        if self.token_atual and self.token_atual.simbolo == Simbolo.SPONTO_VIRGULA:
+            self.token_atual = self.lexador.proximo_token()
+        self.erro = False
+
+    def _buscar(self, token):   # Consulta a tabela; se o nome não existe registra o erro e devolve None
+        try:
+            return self.tabela.buscar_simbolo(token.lexema)
+        except ValueError as e:
+            self._erro_semantico(e, token)
+            return None
 
     def _consumir(self, simbolo_esperado):  # Garante que o token atual é o esperado e avança
         """Verifica o token atual e avança para o próximo."""
@@ -83,59 +89,53 @@ class AnalisadorSintatico:  # Classe principal que coordena toda a análise sint
                 self.token_atual = self.lexador.proximo_token()
             else:
                 simbolo_encontrado = self.token_atual.lexema
-                if self.token_atual.simbolo != "serro":
-                    print(f"Erro sintático na linha {self.token_atual.linha}: Esperado '{self.keywords[simbolo_esperado]}', mas encontrado '{simbolo_encontrado}'")
-                self.erro = True
+                self._erro_sintatico(f"Esperado '{self.keywords[simbolo_esperado]}', mas encontrado '{simbolo_encontrado}'")
                 return
 
             if self.token_atual:
-                if simbolo_anterior == self.token_atual.lexema and simbolo_anterior not in ["inicio", "fim", "(", ")"]:
-                    print(f"Erro Sintático na linha {self.token_atual.linha}: Símbolo '{self.token_atual.lexema}' duplicado.")
-                    self.erro = True
+                if simbolo_anterior == self.token_atual.lexema and simbolo_anterior not in _REPETICAO_PERMITIDA:
+                    self._erro_sintatico(f"Símbolo '{self.token_atual.lexema}' duplicado.")
                     return
 
         else:
-            print(f"Erro sintático: Esperado '{self.keywords[simbolo_esperado]}', mas encontrado 'EOF'")
-    
-    def analisar(self): # Ponto de entrada — inicia parsing do programa e escreve o .obj
+            self._erro_sintatico(f"Esperado '{self.keywords[simbolo_esperado]}', mas encontrado 'EOF'")
+
+    def analisar(self): # Ponto de entrada — analisa o programa e escreve o .obj se não houve erros
+        if not self.compilar():
+            self.gera.escreve()
+        return self.diagnosticos
+
+    def compilar(self): # Analisa e gera o código em memória (no Gera), sem escrever o .obj; devolve os diagnósticos
         self.token_atual = self.lexador.proximo_token()
         self._analisar_programa()
-        if not self.erro:
-            self.gera.escreve()
         self.lexador.fechar()
+        return self.diagnosticos
 
-    # AQUI DEVE TER CÓDIGO DE GERAÇÃO DE RÓTULO
     def _analisar_programa(self):   # Analisa cabeçalho "programa identificador; ... fim."
-        """Analisa a estrutura principal do programa."""     
-        self._consumir("sprograma")
+        """Analisa a estrutura principal do programa."""
+        self._consumir(Simbolo.SPROGRAMA)
         self.gera("", "START", "", "")
         self.gera("", "ALLOC", 0, 1)
+        rotulo_skip = self.rotulo()
         if not self.erro:
-
-            self.tabela.adicionar_simbolo(self.token_atual.lexema, tipo='programa', rotulo=Rotulo())
-            self.nome_programa = self.token_atual.lexema
-            self._consumir("sidentificador")
+            if self.token_atual and self.token_atual.simbolo == Simbolo.SIDENTIFICADOR:
+                self.tabela.adicionar_simbolo(self.token_atual.lexema, tipo='programa', rotulo=rotulo_skip)
+                self.nome_programa = self.token_atual.lexema
+            self._consumir(Simbolo.SIDENTIFICADOR)
             if not self.erro:
-                self._consumir("sponto_virgula")
-                if not self.erro:
-                    try:
-                        rotulo_skip = self.tabela.buscar_simbolo(self.nome_programa)['rotulo']
-                    except ValueError as e:
-                        print(f"Erro Semântico na linha {self.token_atual.linha}: {e}")
-                    self.analisar_bloco(rotulo_skip, final=True)
-                    self.gera("", "DALLOC", 0, 1)
-                    self.gera("", "HLT", "", "")
-        
+                self._consumir(Simbolo.SPONTO_VIRGULA)
+        if self.erro:
+            self._sincronizar(SINCRONIZACAO_CABECALHO)
+        self.analisar_bloco(rotulo_skip, final=True)
+        self.gera("", "DALLOC", 0, 1)
+        self.gera("", "HLT", "", "")
+
     def analisar_bloco(self, rotulo_skip, final=False): # Analisa bloco: variáveis + subrotinas + comandos
-        vars_dalloc = None
         self._analisa_et_variaveis()
-        if not self.erro:
-            func_proc = self._analisa_subrotinas(rotulo_skip)
-            if not self.erro:
-                self._analisa_comandos(rotulo_skip, func_proc=func_proc, final=final)
-                self.tabela.sair_escopo()
-
-                self._gera_dalloc()
+        func_proc = self._analisa_subrotinas(rotulo_skip)
+        self._analisa_comandos(rotulo_skip, func_proc=func_proc, final=final)
+        self.tabela.sair_escopo()
+        self._gera_dalloc()
 
     def _gera_dalloc(self): # Gera DALLOCs do escopo atual para liberar variáveis
         """Gera as instruções de DALLOC para o escopo atual."""
@@ -147,489 +147,536 @@ class AnalisadorSintatico:  # Classe principal que coordena toda a análise sint
             self.escopo_atual -= 1
 
     def _analisa_et_variaveis(self):    # Gerencia todas as declarações iniciando com 'var'
-        """Analisa todas as seções de declaração de variáveis."""
-        if self.token_atual and self.token_atual.simbolo == "svar":
-            self._consumir("svar")
-            if not self.erro:
-                while self.token_atual and self.token_atual.simbolo == "sidentificador":
-                    self._analisa_variaveis()
-
-    def _analisa_variaveis(self):   # Analisa linha "a, b, c : inteiro;" e aloca memória
+        """Analisa todas as seções de declaração de variáveis e aloca a área do bloco (ver alocar_quadro)."""
+        inicio = self.tabela.endereco_memoria
+        if self.token_atual and self.token_atual.simbolo == Simbolo.SVAR:
+            self._consumir(Simbolo.SVAR)
+            while self.token_atual and self.token_atual.simbolo == Simbolo.SIDENTIFICADOR:
+                self._analisa_variaveis()
+                if self.erro:
+                    self._sincronizar(SINCRONIZACAO_DECLARACOES)
+        tamanho = self.tabela.endereco_memoria - inicio
+        if tamanho:
+            quadros, self.pisos[-1] = alocar_quadro(inicio, tamanho, self.pisos[-1], principal=len(self.pisos) == 1)
+            for quadro in quadros:
+                self.gera("", "ALLOC", *quadro)
+                self.escopos_dalloc[-1].append(quadro)
+
+    def _analisa_variaveis(self):   # Analisa linha "a, b, c : inteiro;" e reserva os endereços na tabela
         """Analisa uma linha de declaração como 'a, b, c : inteiro;'"""
         variaveis_para_declarar = []
-        end_inicial_var= self.tabela.endereco_memoria
-        # end_inicial_var = self.qtd_var 
 
-        if self.token_atual and self.token_atual.simbolo == "sidentificador" and not self.erro:
-            variaveis_para_declarar.append(self.token_atual.lexema)
-            self._consumir("sidentificador")
+        if self.token_atual and self.token_atual.simbolo == Simbolo.SIDENTIFICADOR and not self.erro:
+            variaveis_para_declarar.append(self.token_atual)
+            self._consumir(Simbolo.SIDENTIFICADOR)
 
-        while self.token_atual and self.token_atual.simbolo == "svirgula" and not self.erro:
-            self._consumir("svirgula")
-            variavel = self.token_atual.lexema
-            self._consumir("sidentificador")
+        while self.token_atual and self.token_atual.simbolo == Simbolo.SVIRGULA and not self.erro:
+            self._consumir(Simbolo.SVIRGULA)
+            variavel = self.token_atual
+            self._consumir(Simbolo.SIDENTIFICADOR)
             if not self.erro:
                 variaveis_para_declarar.append(variavel)
-        
+
         # 2. Consumir os dois-pontos e o tipo
-        self._consumir("sdoispontos")
+        if not self.erro:
+            self._consumir(Simbolo.SDOISPONTOS)
         if self.erro:
             return
-        
+
         tipo_das_variaveis = None
-        if self.token_atual and self.token_atual.simbolo in ["sinteiro", "sbooleano"]:
+        if self.token_atual and self.token_atual.simbolo in _TIPOS:
             tipo_das_variaveis = self.token_atual.lexema # Guarda o tipo (ex: 'inteiro')
             self._consumir(self.token_atual.simbolo)
         else:
-            print(f"Erro sintático na linha {self.token_atual.linha}: Tipo esperado (inteiro ou booleano)")
-            self.erro = True
+            self._erro_sintatico("Tipo esperado (inteiro ou booleano)")
             return
 
         # 3. INSERÇÃO NA TABELA: Inserir cada variável coletada com o tipo encontrado
-        if tipo_das_variaveis:
-            for nome_var in variaveis_para_declarar:
-                try:
-                    self.tabela.adicionar_simbolo(nome_var, tipo=tipo_das_variaveis)
-                except ValueError as e:
-                    print(f"Erro Semântico na linha {self.token_atual.linha}: {e}")
-                    self.erro = True
-                self.qtd_var += 1
-
-        self._consumir("sponto_virgula")
-        self.gera("", "ALLOC", end_inicial_var, self.tabela.endereco_memoria - end_inicial_var)
-        self.escopos_dalloc[-1].append((end_inicial_var, self.tabela.endereco_memoria - end_inicial_var))
+        for variavel in variaveis_para_declarar:
+            try:
+                self.tabela.adicionar_simbolo(variavel.lexema, tipo=tipo_das_variaveis)
+            except ValueError as e:
+                self._erro_semantico(e, variavel)
+            self.qtd_var += 1
+
+        self._consumir(Simbolo.SPONTO_VIRGULA)
 
     def _analisa_comandos(self, rotulo_skip, func_proc, final=False):   # Analisa bloco 'inicio ... fim'
-        if self.token_atual and self.token_atual.simbolo == "sinicio":
+        if not (self.token_atual and self.token_atual.simbolo == Simbolo.SINICIO):
+            self._erro_sintatico("Esperado 'inicio' para iniciar o bloco de comandos.")
+            self._sincronizar()
+
+        if self.token_atual and self.token_atual.simbolo == Simbolo.SINICIO:
             if rotulo_skip != None:
                 # Se houve sub-rotinas (func_proc >= 1), o JMP lá em cima pulou pra cá.
                 # Se não houve, o fluxo seguiu normal e esse rótulo é apenas um marcador.
                 if func_proc >= 1:
                     self.gera(rotulo_skip, "NULL", "", "")
-                
-            self._consumir("sinicio")
-            while self.token_atual and self.token_atual.simbolo != "sfim" and not self.erro:
-                self._analisa_comando_simples()
-            
-            if not self.erro:
-                self._consumir("sfim")
-                if not self.erro and final:
-                    self._consumir("sponto")
+            self._consumir(Simbolo.SINICIO)
 
-                if not self.erro and not final:
-                    self._consumir("sponto_virgula")
-        else:
-            print(f"Erro sintático na linha {self.token_atual.linha}: Esperado 'inicio' para iniciar o bloco de comandos.")
-            self.erro = True
-                    
+        while self.token_atual and self.token_atual.simbolo != Simbolo.SFIM:
+            self._analisa_comando_simples()
+            if self.erro:
+                self._sincronizar()
+
+        self._consumir(Simbolo.SFIM)
+        if not self.erro and final:
+            self._consumir(Simbolo.SPONTO)
+
+        if not self.erro and not final:
+            self._consumir(Simbolo.SPONTO_VIRGULA)
 
     def _analisa_comando_simples(self, sentao_ssenao = False):  # Executa parsing de um único comando
         """Analisa um comando simples dentro do bloco de comandos."""
-        if self.token_atual.simbolo == "sidentificador":
-            self._analisa_atrib_chprocedimento()
-            if self.token_atual.simbolo == "sfim":
-                return
-            elif not self.erro and sentao_ssenao:
-                if self.token_atual.simbolo == "sponto_virgula":
-                    self._consumir("sponto_virgula")
-                return
-            elif not self.erro:
-                self._consumir("sponto_virgula")
+        if self.token_atual is None:
+            self._erro_sintatico("Esperado um comando, mas encontrado 'EOF'")
+            return
 
-        elif self.token_atual.simbolo == "sse":
+        if self.token_atual.simbolo == Simbolo.SSE:
             self._analisa_se()
-
-        elif self.token_atual.simbolo == "senquanto":
+            return
+        elif self.token_atual.simbolo == Simbolo.SENQUANTO:
             self._analisa_enquanto()
-
-        elif self.token_atual.simbolo == "sescreva":
+            return
+        elif self.token_atual.simbolo == Simbolo.SINICIO:
+            self._analisa_comandos(None, func_proc=True)
+            return
+        elif self.token_atual.simbolo == Simbolo.SIDENTIFICADOR:
+            self._analisa_atrib_chprocedimento()
+        elif self.token_atual.simbolo == Simbolo.SESCREVA:
             self._analisa_escreva()
-            if self.token_atual.simbolo == "sfim":
-                return
-            elif not self.erro and sentao_ssenao:
-                if self.token_atual.simbolo == "sponto_virgula":
-                    self._consumir("sponto_virgula")
-                return
-            elif not self.erro:
-                self._consumir("sponto_virgula")
-
-        elif self.token_atual.simbolo == "sleia":
+        elif self.token_atual.simbolo == Simbolo.SLEIA:
             self._analisa_leia()
-            if self.token_atual.simbolo == "sfim":
-                return
-            elif not self.erro and sentao_ssenao:
-                if self.token_atual.simbolo == "sponto_virgula":
-                    self._consumir("sponto_virgula")
-                return
-            elif not self.erro:
-                self._consumir("sponto_virgula")
+        else:
+            self._erro_sintatico(f"Comando inválido ou inesperado '{self.token_atual.lexema}'.")
+            return
 
-        elif self.token_atual.simbolo == "sinicio":
-            self._analisa_comandos(None, func_proc=True)
+        # ';' é opcional antes de 'fim' e, dentro de se/senao, antes de qualquer coisa
+        if self.erro or (self.token_atual and self.token_atual.simbolo == Simbolo.SFIM):
+            return
+        elif sentao_ssenao:
+            if self.token_atual and self.token_atual.simbolo == Simbolo.SPONTO_VIRGULA:
+                self._consumir(Simbolo.SPONTO_VIRGULA)
         else:
-            print(f"Erro Sintático na linha {self.token_atual.linha}: Comando inválido ou inesperado '{self.token_atual.lexema}'.")
-            self.erro = True
+            self._consumir(Simbolo.SPONTO_VIRGULA)
 
     def _analisa_atrib_chprocedimento(self):    # Diferencia entre atribuição e chamada de procedimento
-        simbolo = self.token_atual.lexema
-        self._consumir("sidentificador")
+        token = self.token_atual
+        self._consumir(Simbolo.SIDENTIFICADOR)
         if not self.erro:
-            if self.token_atual.simbolo == "satribuicao":
-                self._consumir("satribuicao")
-                self._analisa_atribuicao(simbolo)
+            if self.token_atual and self.token_atual.simbolo == Simbolo.SATRIBUICAO:
+                self._consumir(Simbolo.SATRIBUICAO)
+                if not self.erro:
+                    self._analisa_atribuicao(token)
             else:
-                try:
-                    self.gera("", "CALL", self.tabela.buscar_simbolo(simbolo)['rotulo'], "")
-                except ValueError as e:
-                    print(f"Erro Semântico na linha {self.token_atual.linha}: {e}")
-                self._analisa_chamada_procedimento(simbolo)
+                self._analisa_chamada_procedimento(token)
 
     def _analisa_leia(self):    # Analisa comando 'leia(x)' e gera RD + STR
-        simbolo = None
-        self._consumir("sleia")
-        self._consumir("sabre_parenteses")
+        self._consumir(Simbolo.SLEIA)
+        if not self.erro:
+            self._consumir(Simbolo.SABRE_PARENTESES)
         if not self.erro:
-            if not self.erro and self.token_atual.simbolo == "sidentificador":
-                try:
-                    simbolo = self.tabela.buscar_simbolo(self.token_atual.lexema)
-                except ValueError as e:
-                    print(f"Erro Semântico na linha {self.token_atual.linha}: {e}")
-                    self.erro = True
+            token = self.token_atual
+            self._consumir(Simbolo.SIDENTIFICADOR)
+            if not self.erro:
+                simbolo = self._buscar(token)
                 self.gera("", "RD", "", "")
-                self.gera("", "STR", simbolo['memoria'], "")
-                if not self.erro:
-                    self._consumir("sidentificador")
-                    if not self.erro:
-                        self._consumir("sfecha_parenteses")
+                if simbolo:
+                    self.gera("", "STR", simbolo.memoria, "")
+                self._consumir(Simbolo.SFECHA_PARENTESES)
 
     def _analisa_escreva(self):  # Analisa 'escreva(x)' e gera LDV/CALL + PRN
-        simbolo_info = None
-        self._consumir("sescreva")
-        self._consumir("sabre_parenteses")
+        self._consumir(Simbolo.SESCREVA)
         if not self.erro:
+            self._consumir(Simbolo.SABRE_PARENTESES)
+        if not self.erro:
+            token = self.token_atual
+            self._consumir(Simbolo.SIDENTIFICADOR)
             if not self.erro:
-                try:
-                    simbolo_info = self.tabela.buscar_simbolo(self.token_atual.lexema)
-                except ValueError as e:
-                    print(f"Erro Semântico na linha {self.token_atual.linha}: {e}")
-                    self.erro = True
-                if simbolo_info and 'funcao' in simbolo_info['tipo']:
-                    self.gera("", "CALL", simbolo_info['rotulo'], "")
+                simbolo_info = self._buscar(token)
+                if simbolo_info and 'funcao' in simbolo_info.tipo:
+                    self.gera("", "CALL", simbolo_info.rotulo, "")
                     self.gera("", "LDV", "0", "")
-                else:
-                    self.gera("", "LDV", simbolo_info['memoria'], "")
+                elif simbolo_info:
+                    self.gera("", "LDV", simbolo_info.memoria, "")
 
                 self.gera("", "PRN", "", "")
-                self._consumir("sidentificador")
-                if not self.erro:
-                    self._consumir("sfecha_parenteses")
-    
+                self._consumir(Simbolo.SFECHA_PARENTESES)
+
     def _analisa_enquanto(self):  # Comando 'enquanto ... faca' com geração de rótulos do laço
-        rotulo_inicio = Rotulo()
-        rotulo_sair = Rotulo()
-        self._consumir("senquanto")
+        rotulo_inicio = self.rotulo()
+        rotulo_sair = self.rotulo()
+        self._consumir(Simbolo.SENQUANTO)
         self.gera(rotulo_inicio, "NULL", "", "")
-        if not self.erro and self._expressao() == 'booleano':
-            self.gera("", "JMPF", rotulo_sair, "")
-            self._consumir("sfaca")
-            if not self.erro:
-                self._analisa_comando_simples() 
-                self.gera("", "JMP", rotulo_inicio, "")
-                self.gera(rotulo_sair, "NULL", "", "")
-        elif not self.erro:
-            print(f"Erro Semântico na linha {self.token_atual.linha}: Expressão do 'enquanto' deve ser do tipo booleano.")
-            self.erro = True     
+        if self.erro:
+            return
+        tipo = self._condicao(rotulo_sair)
+        if self.erro:
+            return
+        if tipo is not None and tipo != 'booleano':
+            self._erro_semantico("Expressão do 'enquanto' deve ser do tipo booleano.")
+        self._consumir(Simbolo.SFACA)
+        if not self.erro:
+            self._analisa_comando_simples()
+            self.gera("", "JMP", rotulo_inicio, "")
+            self.gera(rotulo_sair, "NULL", "", "")
 
     def _analisa_se(self):  # Comando condicional 'se ... entao ... senao'
-        rotulo_se = Rotulo()
-        rotulo_pula_senao = Rotulo()
-        self._consumir("sse")
-        if not self.erro and self._expressao() == 'booleano':
-            self.gera("", "JMPF", rotulo_se, "")
-            self._consumir("sentao")
-            if not self.erro:
-                self._analisa_comando_simples(sentao_ssenao=True)
-                if not self.erro and self.token_atual and self.token_atual.simbolo == "ssenao":
-                    self.gera("", "JMP", rotulo_pula_senao, "")
-                self.gera(rotulo_se, "NULL","", "")
-                if not self.erro and self.token_atual and self.token_atual.simbolo == "ssenao":
-                    self._consumir("ssenao")
-                    if not self.erro:
-                        self._analisa_comando_simples(sentao_ssenao=True)
-                        self.gera(rotulo_pula_senao, "NULL","", "")
-        elif not self.erro:
-            print(f"Erro Semântico na linha {self.token_atual.linha}: Expressão do 'se' deve ser do tipo booleano.")
-            self.erro = True
+        rotulo_se = self.rotulo()
+        rotulo_pula_senao = self.rotulo()
+        self._consumir(Simbolo.SSE)
+        if self.erro:
+            return
+        tipo = self._condicao(rotulo_se)
+        if self.erro:
+            return
+        if tipo is not None and tipo != 'booleano':
+            self._erro_semantico("Expressão do 'se' deve ser do tipo booleano.")
+        self._consumir(Simbolo.SENTAO)
+        if not self.erro:
+            self._analisa_comando_simples(sentao_ssenao=True)
+            if not self.erro and self.token_atual and self.token_atual.simbolo == Simbolo.SSENAO:
+                self.gera("", "JMP", rotulo_pula_senao, "")
+            self.gera(rotulo_se, "NULL","", "")
+            if not self.erro and self.token_atual and self.token_atual.simbolo == Simbolo.SSENAO:
+                self._consumir(Simbolo.SSENAO)
+                if not self.erro:
+                    self._analisa_comando_simples(sentao_ssenao=True)
+                    self.gera(rotulo_pula_senao, "NULL","", "")
 
     def _analisa_subrotinas(self, rotulo_skip): # Detecta e processa funções e procedimentos
         subrotinas = 0
-        flag_jump_gerado = False # Controle para gerar o JMP apenas uma vez
 
         # Verifica se o próximo token inicia uma sub-rotina para gerar o pulo
-        if self.token_atual and self.token_atual.simbolo in ["sprocedimento", "sfuncao"]:
+        if self.token_atual and self.token_atual.simbolo in _SUBROTINAS:
             self.gera("", "JMP", rotulo_skip, "")
-            flag_jump_gerado = True
 
-        while self.token_atual and self.token_atual.simbolo in ["sprocedimento", "sfuncao"]:
-            if self.token_atual.simbolo == "sprocedimento":
+        while self.token_atual and self.token_atual.simbolo in _SUBROTINAS:
+            if self.token_atual.simbolo == Simbolo.SPROCEDIMENTO:
                 subrotinas += 1
-                self._consumir("sprocedimento")
+                self._consumir(Simbolo.SPROCEDIMENTO)
                 # Não passamos mais rotulo_skip para dentro, pois o pulo já foi feito
-                self._analisa_declaracao_procedimento() 
-            elif self.token_atual.simbolo == "sfuncao":
+                self._analisa_declaracao_procedimento()
+            elif self.token_atual.simbolo == Simbolo.SFUNCAO:
                 subrotinas += 1
-                self._consumir("sfuncao")
+                self._consumir(Simbolo.SFUNCAO)
                 self._analisa_declaracao_funcao()
-        
+            if self.erro:
+                self._sincronizar(SINCRONIZACAO_DECLARACOES)
+
         # Se não houve sub-rotinas, o contador de rótulos pode ser ajustado (seu código original)
         if subrotinas == 0:
-            Rotulo.go_back_i_want_to_be_monke()
-        
+            self.rotulo.go_back_i_want_to_be_monke()
+
         return subrotinas
 
     def _analisa_declaracao_procedimento(self): # Analisa e gera código para um procedimento
-        rotulo_procedimento = Rotulo()
-        rotulo_skip = Rotulo() # Rótulo para o bloco interno deste procedimento
-        
-        # REMOVIDO: self.gera("", "JMP", skippar, "") <--- O pai já pulou tudo
+        rotulo_procedimento = self.rotulo()
+        rotulo_skip = self.rotulo() # Rótulo para o bloco interno deste procedimento
+        inicio = len(self.gera)
 
-        if self.token_atual.simbolo == "sidentificador":
+        token = self.token_atual
+        self._consumir(Simbolo.SIDENTIFICADOR)
+        if not self.erro:
             try:
-                self.tabela.adicionar_simbolo(self.token_atual.lexema, tipo='procedimento', rotulo=rotulo_procedimento)
+                self.tabela.adicionar_simbolo(token.lexema, tipo='procedimento', rotulo=rotulo_procedimento)
             except ValueError as e:
-                print(f"Erro Semântico na linha {self.token_atual.linha}: {e}")
-                self.erro = True
-            
+                self._erro_semantico(e, token)
             # Gera o rótulo de entrada do procedimento
-            try:
-                self.gera(self.tabela.buscar_simbolo(self.token_atual.lexema)['rotulo'], "NULL", "", "")
-            except ValueError as e:
-                print(f"Erro Semântico na linha {self.token_atual.linha}: {e}")
-            if not self.erro:
-                self._consumir("sidentificador")
-                if not self.erro:
-                    self._consumir("sponto_virgula")
-                    if not self.erro:
-                        self.escopo_atual += 1
-                        self.escopos_dalloc.append([])
-                        self.tabela.entrar_escopo()
-                        self.analisar_bloco(rotulo_skip) # Recursão normal
-                        self.gera("", "RETURN", "", "")
+            self.gera(rotulo_procedimento, "NULL", "", "")
+            self._consumir(Simbolo.SPONTO_VIRGULA)
+        if self.erro:   # cabeçalho inválido: ainda analisa o corpo para achar os erros de dentro dele
+            self._sincronizar(SINCRONIZACAO_CABECALHO)
+
+        self.escopo_atual += 1
+        self.escopos_dalloc.append([])
+        self.pisos.append(self.pisos[-1] + 1)   # + o endereço de retorno do CALL
+        self.tabela.entrar_escopo()
+        self.analisar_bloco(rotulo_skip) # Recursão normal
+        self.gera("", "RETURN", "", "")
+        self.pisos.pop()
+        if not self.diagnosticos:   # só programas sem erros têm código aproveitado
+            self.gera.subrotina(token.lexema, rotulo_procedimento, inicio)
 
     def _analisa_declaracao_funcao(self):   # Analisa declaração de função e seu tipo de retorno
-        rotulo_funcao = Rotulo()
-        rotulo_skip = Rotulo()
-        nome_funcao = self.token_atual.lexema
-        tipo_retorno = None
+        rotulo_funcao = self.rotulo()
+        rotulo_skip = self.rotulo()
+        inicio = len(self.gera)
+        token = self.token_atual
 
-        self._consumir("sidentificador")
+        self._consumir(Simbolo.SIDENTIFICADOR)
         if not self.erro:
-            self._consumir("sdoispontos")
-            if not self.erro:
-                if self.token_atual.simbolo in ["sinteiro", "sbooleano"]:
-                    tipo_retorno = self.token_atual.lexema
-                    self._consumir(self.token_atual.simbolo)
-                    if not self.erro:
-                        try:
-                            self.tabela.adicionar_simbolo(nome_funcao, tipo=f'funcao {tipo_retorno}', rotulo=rotulo_funcao)
-                        except ValueError as e:
-                            print(f"Erro Semântico: {e}")
-                            self.erro = True
-                        try:
-                            self.gera(self.tabela.buscar_simbolo(nome_funcao)['rotulo'], "NULL", "", "")
-                        except ValueError as e:
-                            print(f"Erro Semântico na linha {self.token_atual.linha}: {e}")
-                        if not self.erro:
-                            self._consumir("sponto_virgula")
-                            if not self.erro:
-                                self.escopo_atual += 1
-                                self.escopos_dalloc.append([])
-                                self.tabela.entrar_escopo()
-                                self.analisar_bloco(rotulo_skip)
-                                self.gera("", "RETURN", "", "")
-                else:
-                    print(f"Erro sintático na linha {self.token_atual.linha}: Tipo de retorno esperado (inteiro ou booleano)")
-                    self.erro = True
-                    
-    def _expressao(self):   # Constrói expressão, converte para pós-fixa e gera código da expressão
-        posfixa = None
-        tipo = None
-        self._analisa_expressao()
-        self.expressao.append(None)
+            self._consumir(Simbolo.SDOISPONTOS)
+        if not self.erro:
+            if self.token_atual and self.token_atual.simbolo in _TIPOS:
+                tipo_retorno = self.token_atual.lexema
+                self._consumir(self.token_atual.simbolo)
+            else:
+                self._erro_sintatico("Tipo de retorno esperado (inteiro ou booleano)")
         if not self.erro:
-            posfixa = posfix(self.expressao)
             try:
-                tipo = tipo_expressao(posfixa, self.tabela)
-            except TypeError as e:
-                print(f"Erro Semântico na linha {self.token_atual.linha}: {e}")
-                self.erro = True
-        if posfixa: 
-            for token in posfixa:
-                if token.isnumeric():
-                    self.gera("", "LDC", token, "")
-                elif token in ["verdadeiro", "falso"]:
-                    valor = 1 if token == "verdadeiro" else 0
-                    self.gera("", "LDC", valor, "")
-                elif token[0].isalpha() and token not in ['e', 'ou', 'nao', 'div']:
-                    if self.tabela.buscar_simbolo(token)['tipo'] in ['funcao inteiro', 'funcao booleano']:
-                        try:
-                            self.gera("", "CALL", self.tabela.buscar_simbolo(token)['rotulo'], "")
-                        except ValueError as e:
-                            print(f"Erro Semântico na linha {self.token_atual.linha}: {e}")
-                        self.gera("", "LDV", "0", "")
-                    else:
-                        try:
-                            self.gera("", "LDV", self.tabela.buscar_simbolo(token)['memoria'], "")
-                        except ValueError as e:
-                            print(f"Erro Semântico na linha {self.token_atual.linha}: {e}")
-                elif token == '+':
-                    self.gera("", "ADD", "", "")
-                elif token == '-':
-                    self.gera("", "SUB", "", "")
-                elif token == '*':
-                    self.gera("", "MULT", "", "")
-                elif token == 'div':
-                    self.gera("", "DIVI", "", "")
-                elif token == '<':
-                    self.gera("", "CME", "", "")
-                elif token == '<=':
-                    self.gera("", "CMEQ", "", "")
-                elif token == '>':
-                    self.gera("", "CMA", "", "")
-                elif token == '>=':
-                    self.gera("", "CMAQ", "", "")
-                elif token == '=':
-                    self.gera("", "CEQ", "", "")
-                elif token == '!=':
-                    self.gera("", "CDIF", "", "")
-                elif token == 'e':
-                    self.gera("", "AND", "", "")
-                elif token == 'ou':
-                    self.gera("", "OR", "", "")
-                elif token == 'nao':
-                    self.gera("", "NEG", "", "")
-                elif token == '-u':
-                    self.gera("", "INV", "", "")
-                elif token == '+u':
-                    pass
-
-        self.expressao = []
+                self.tabela.adicionar_simbolo(token.lexema, tipo=f'funcao {tipo_retorno}', rotulo=rotulo_funcao)
+            except ValueError as e:
+                self._erro_semantico(e, token)
+            self.gera(rotulo_funcao, "NULL", "", "")
+            self._consumir(Simbolo.SPONTO_VIRGULA)
+        if self.erro:   # cabeçalho inválido: ainda analisa o corpo para achar os erros de dentro dele
+            self._sincronizar(SINCRONIZACAO_CABECALHO)
+
+        self.escopo_atual += 1
+        self.escopos_dalloc.append([])
+        self.pisos.append(self.pisos[-1] + 1)   # + o endereço de retorno do CALL
+        self.tabela.entrar_escopo()
+        self.analisar_bloco(rotulo_skip)
+        self.gera("", "RETURN", "", "")
+        self.pisos.pop()
+        if not self.diagnosticos:   # só programas sem erros têm código aproveitado
+            self.gera.subrotina(token.lexema, rotulo_funcao, inicio)
+
+    def _expressao(self):   # Compila a expressão numa única passada (tipa e gera cada parte ao reconhecê-la)
+        self.erro_tipo = None
+        tipo = self._analisa_expressao(ORDEM_MAXIMA, sinal=True)
+        if self.erro:
+            return None
+        if self.erro_tipo is not None:
+            # Como antes, o erro de tipo é reportado na linha em que a expressão termina
+            self._erro_semantico(self.erro_tipo)
+            return None
         return tipo
 
-    def _analisa_expressao(self):   # Analisa expressões com operadores relacionais
-        self._analisa_expressao_simples()
-        while self.token_atual and self.token_atual.simbolo in ["smaior", "smaiorigual", "smenor", "smenorigual", "sigual", "sdif"]:
+    def _condicao(self, rotulo_falso):  # Condição de se/enquanto: segue para o corpo se verdadeira, senão pula para rotulo_falso
+        """
+        Sem curto-circuito é a expressão inteira seguida de JMPF. Com curto-circuito, os 'e'/'ou' do nível mais
+        externo viram desvios: cada operando de um termo "a e b e ..." tem o seu JMPF, que vai para o próximo termo
+        do 'ou' (ou para rotulo_falso, no último termo); um termo todo verdadeiro pula direto para o corpo.
+        Como só se sabe se vem outro 'ou' depois do termo, os JMPF do termo são remendados no fim dele.
+        """
+        if not self.curto_circuito:
+            tipo = self._expressao()
             if not self.erro:
-                self.expressao.append(self.token_atual.lexema)
-                self._consumir(self.token_atual.simbolo)
-                if not self.erro:
-                    self._analisa_expressao_simples()
-            else:
+                self.gera("", "JMPF", rotulo_falso, "")
+            return tipo
+
+        self.erro_tipo = None
+        rotulo_verdade = None
+        tipo = None
+        sinal = True    # sinal unário só no início da condição, como em _continua_expressao
+        while True:     # termos do 'ou'
+            pendentes = []  # JMPFs do termo, com destino ainda indefinido
+            tipo_termo = None
+            while True:     # operandos do 'e'
+                tipo_operando = self._analisa_expressao(_ORDEM_E - 1, sinal)
+                if self.erro:
+                    return None
+                if pendentes:
+                    tipo_operando = self._tipo_operacao(tipo_binario, 'e', tipo_termo, tipo_operando)
+                tipo_termo = tipo_operando
+                pendentes.append(len(self.gera))
+                self.gera("", "JMPF", "", "")
+                sinal = False
+                if not (self.token_atual and self.token_atual.simbolo == Simbolo.SE):
+                    break
+                self._consumir(Simbolo.SE)
+                if self.erro:
+                    return None
+            if rotulo_verdade is not None:  # depois do primeiro termo
+                tipo_termo = self._tipo_operacao(tipo_binario, 'ou', tipo, tipo_termo)
+            tipo = tipo_termo
+            if not (self.token_atual and self.token_atual.simbolo == Simbolo.SOU):
                 break
+            if rotulo_verdade is None:
+                rotulo_verdade = self.rotulo()
+            self.gera("", "JMP", rotulo_verdade, "")
+            rotulo_proximo = self.rotulo()
+            for indice in pendentes:
+                self.gera.remenda(indice, "JMPF", rotulo_proximo)
+            self.gera(rotulo_proximo, "NULL", "", "")
+            self._consumir(Simbolo.SOU)
+            if self.erro:
+                return None
+
+        for indice in pendentes:
+            self.gera.remenda(indice, "JMPF", rotulo_falso)
+        if rotulo_verdade is not None:
+            self.gera(rotulo_verdade, "NULL", "", "")
+        if self.erro_tipo is not None:
+            self._erro_semantico(self.erro_tipo)
+            return None
+        return tipo
 
-    def _analisa_expressao_simples(self):   # Expressões com +, -, ou lógico, etc.
-        if self.token_atual and self.token_atual.simbolo in ["smais", "smenos"]:
-            self.expressao.append(self.token_atual.lexema)
-            self._consumir(self.token_atual.simbolo)
-        
-        self._analisa_termo()
-        
-        while self.token_atual and self.token_atual.simbolo in ["smais", "smenos", "sou", "se"]:
-            self.expressao.append(self.token_atual.lexema)
-            self._consumir(self.token_atual.simbolo)
-            if not self.erro:
-                self._analisa_termo()
+    def _analisa_expressao(self, limite, sinal):    # Operando seguido de operadores com ordem <= limite
+        return self._continua_expressao(self._analisa_fator(sinal), limite)
 
-    def _analisa_termo(self):   # Termo com prioridade: *, div, e, ou
-        self._analisa_fator()
-        while self.token_atual and self.token_atual.simbolo in ["smult", "sdiv", "se", "sou"]:
-            self.expressao.append(self.token_atual.lexema)
+    def _continua_expressao(self, tipo, limite):    # Precedência por escalada: ordem menor liga mais forte
+        while not self.erro and self.token_atual and self.token_atual.simbolo in OPERADORES_BINARIOS:
+            operador, ordem = OPERADORES_BINARIOS[self.token_atual.simbolo]
+            if ordem > limite:
+                break
             self._consumir(self.token_atual.simbolo)
-            if not self.erro:
-                self._analisa_fator()
+            if self.erro:
+                break
+            # Sinal unário só no início da expressão, após '(' ou após um relacional
+            esquerda = self.constante
+            tipo_direita = self._analisa_expressao(ordem - 1, sinal=ordem == ORDEM_RELACIONAL)
+            self._operacao(INSTRUCOES_BINARIAS[operador], esquerda, self.constante)
+            tipo = self._tipo_operacao(tipo_binario, operador, tipo, tipo_direita)
+        return tipo
 
-    def _analisa_fator(self):   # Fatores: números, variáveis, parênteses, chamadas e 'nao'
-        if self.token_atual.simbolo == "sidentificador":
-            try:
-                simbolo = self.tabela.buscar_simbolo(self.token_atual.lexema)
-            except ValueError as e:
-                print(f"Erro Semântico na linha {self.token_atual.linha}: {e}")
-                self.erro = True
-            if not self.erro:
-                self.expressao.append(self.token_atual.lexema)    
-                self._consumir("sidentificador")
-                if not self.erro and simbolo['tipo'] in ['funcao inteiro', 'funcao booleano']:
-                    self._analisa_chamada_funcao(simbolo['nome'])
-
-        elif self.token_atual.simbolo == "snumero":
-            self.expressao.append(self.token_atual.lexema)
-            self._consumir("snumero")
-        elif self.token_atual.simbolo in ["sverdadeiro", "sfalso"]:
-            self.expressao.append(self.token_atual.lexema)
+    def _operacao(self, instrucao, *operandos):     # Emite a instrução, ou dobra os LDCs dos operandos constantes num só
+        self.constante = None
+        if None not in operandos:
+            valor = avaliar_constante(instrucao, *operandos)
+            if valor is not None:
+                self.gera.desfaz(len(operandos))
+                self.gera("", "LDC", valor, "")
+                self.constante = valor
+                return
+        self.gera("", instrucao, "", "")
+
+    def _tipo_operacao(self, regra, operador, *tipos):  # Aplica a regra de tipos guardando só o primeiro erro
+        if self.erro_tipo is not None or None in tipos:
+            return None
+        try:
+            return regra(operador, *tipos)
+        except TypeError as e:
+            self.erro_tipo = e
+            return None
+
+    def _analisa_fator(self, sinal=False):  # Fatores: números, variáveis, parênteses, chamadas, 'nao' e sinal
+        self.constante = None
+        if self.erro:
+            return None
+        if self.token_atual is None:
+            self._erro_sintatico("Esperado um fator, mas encontrado 'EOF'")
+            return None
+
+        if self.token_atual.simbolo in OPERADORES_SINAL and sinal:
+            operador = OPERADORES_SINAL[self.token_atual.simbolo]
             self._consumir(self.token_atual.simbolo)
-        elif self.token_atual.simbolo == "sabre_parenteses":
-            self.expressao.append(self.token_atual.lexema)
-            self._consumir("sabre_parenteses")
+            tipo = self._analisa_fator()
+            if INSTRUCOES_UNARIAS[operador] is not None:
+                self._operacao(INSTRUCOES_UNARIAS[operador], self.constante)
+            return self._tipo_operacao(tipo_unario, operador, tipo)
+
+        if self.token_atual.simbolo == Simbolo.SIDENTIFICADOR:
+            simbolo = self._buscar(self.token_atual)    # única consulta à tabela
+            self._consumir(Simbolo.SIDENTIFICADOR)
+            if simbolo is None:
+                return None
+            if simbolo.tipo in ['funcao inteiro', 'funcao booleano']:
+                self.gera("", "CALL", simbolo.rotulo, "")
+                self.gera("", "LDV", "0", "")
+                return simbolo.tipo.replace('funcao ', '')
+            self.gera("", "LDV", simbolo.memoria, "")
+            return simbolo.tipo
+
+        elif self.token_atual.simbolo == Simbolo.SNUMERO:
+            self.gera("", "LDC", self.token_atual.lexema, "")
+            constante = int(self.token_atual.lexema)
+            self._consumir(Simbolo.SNUMERO)
+            self.constante = constante
+            return 'inteiro'
+        elif self.token_atual.simbolo in _BOOLEANOS:
+            constante = 1 if self.token_atual.simbolo == Simbolo.SVERDADEIRO else 0
+            self.gera("", "LDC", constante, "")
+            self._consumir(self.token_atual.simbolo)
+            self.constante = constante
+            return 'booleano'
+        elif self.token_atual.simbolo == Simbolo.SABRE_PARENTESES:
+            self._consumir(Simbolo.SABRE_PARENTESES)
+            tipo = None
             if not self.erro:
-                self._analisa_expressao()
+                tipo = self._analisa_expressao(ORDEM_MAXIMA, sinal=True)
                 if not self.erro:
-                    self.expressao.append(self.token_atual.lexema)
-                    self._consumir("sfecha_parenteses")
-        elif self.token_atual.simbolo == "snao":
-            self.expressao.append(self.token_atual.lexema)
-            self._consumir("snao")
-            if not self.erro:
-                self._analisa_fator()
+                    self._consumir(Simbolo.SFECHA_PARENTESES)
+            return tipo
+        elif self.token_atual.simbolo == Simbolo.SNAO:
+            self._consumir(Simbolo.SNAO)
+            if self.erro:
+                return None
+            # 'nao (x)' nega só o grupo; sem parênteses alcança os operadores até os relacionais
+            if self.token_atual and self.token_atual.simbolo == Simbolo.SABRE_PARENTESES:
+                tipo = self._analisa_fator()
+            else:
+                tipo = self._continua_expressao(self._analisa_fator(), ORDEM_RELACIONAL)
+            self._operacao("NEG", self.constante)
+            return self._tipo_operacao(tipo_unario, 'nao', tipo)
         else:
-            print(f"Erro Sintático na linha {self.token_atual.linha}: Fator inválido ou inesperado '{self.token_atual.lexema}'.")
-            self.erro = True
-
-    def _analisa_atribuicao(self, simbolo): # Verifica tipo e gera STR para atribuição
-        tipo = None
-        try:
-            tipo = self.tabela.buscar_simbolo(simbolo)['tipo']
-        except ValueError as e:
-            print(f"Erro Semântico na linha {self.token_atual.linha}: {e}")
-            self.erro = True
+            self._erro_sintatico(f"Fator inválido ou inesperado '{self.token_atual.lexema}'.")
+            return None
 
+    def _analisa_atribuicao(self, token):   # Verifica tipo e gera STR para atribuição
+        simbolo = self._buscar(token)
+        tipo = simbolo.tipo if simbolo else None
         if tipo in ['funcao inteiro', 'funcao booleano']:
             tipo = tipo.replace('funcao ', '')
 
-        if not self.erro:
-            if self._expressao() != tipo:
-                print(f"Erro Semântico na linha {self.token_atual.linha}: Tipo incompatível na atribuição para '{simbolo}'. Esperado '{tipo}'.")
-                self.erro = True
-            else:
-                if self.tabela.buscar_simbolo(simbolo)['tipo'] in ['funcao inteiro', 'funcao booleano']:
-                    self.gera("", "STR", "0", "")
-                else:
-                    try:
-                        self.gera("", "STR", self.tabela.buscar_simbolo(simbolo)['memoria'], "")
-                    except ValueError as e:
-                        print(f"Erro Semântico na linha {self.token_atual.linha}: {e}")
-            
-    def _analisa_chamada_procedimento(self, simbolo):   # Apenas valida a existência do procedimento
-        try:
-            self.tabela.buscar_simbolo(simbolo)
-        except ValueError as e:
-            print(f"Erro Semântico na linha {self.token_atual.linha}: {e}")
-            self.erro = True
+        tipo_expressao = self._expressao()
+        if self.erro or simbolo is None or tipo_expressao is None:
+            return
+        if tipo_expressao != tipo:
+            self._erro_semantico(f"Tipo incompatível na atribuição para '{token.lexema}'. Esperado '{tipo}'.")
+        elif simbolo.tipo in ['funcao inteiro', 'funcao booleano']:
+            self.gera("", "STR", "0", "")
+        else:
+            self.gera("", "STR", simbolo.memoria, "")
 
-    def _analisa_chamada_funcao(self, simbolo): # Valida existência da função ao analisá-la
-        try:
-            self.tabela.buscar_simbolo(simbolo)
-        except ValueError as e:
-            print(f"Erro Semântico na linha {self.token_atual.linha}: {e}")
-            self.erro = True
+    def _analisa_chamada_procedimento(self, token): # Valida o procedimento e gera o CALL
+        simbolo = self._buscar(token)
+        if simbolo is None:
+            return
+        if simbolo.rotulo is None or simbolo.tipo == 'programa':
+            self._erro_semantico(f"símbolo '{token.lexema}' não é um procedimento.", token)
+            return
+        self.gera("", "CALL", simbolo.rotulo, "")
+
+def compilar_em_passes(lexador, gera, estatisticas=None, curto_circuito=False):  # Modo em passes: árvore -> semântico -> geração (no Gera, em memória)
+    """Compila em três passos separados sobre a árvore; devolve a lista de diagnósticos (vazia = código no gera)."""
+    medir = estatisticas.medir if estatisticas else lambda fase, funcao: funcao
+    if estatisticas:
+        estatisticas.instrumentar_lexico(lexador)
+    analisador = AnalisadorArvore(lexador)
+    programa = medir("sintatico", analisador.analisar)()
+    diagnosticos = analisador.diagnosticos
+    if programa is not None:
+        verificador = VerificadorSemantico()
+        if estatisticas:
+            estatisticas.instrumentar_tabela(verificador.tabela)
+        medir("semantico", verificador.verificar)(programa)
+        diagnosticos = diagnosticos + verificador.diagnosticos
+    if not diagnosticos:
+        medir("geracao", GeradorArvore(gera, curto_circuito).gerar)(programa)
+    if estatisticas:
+        estatisticas.finalizar(gera)
+    return sorted(diagnosticos, key=lambda d: (d.linha is None, d.linha or 0, d.coluna or 0))
 
 if __name__ == "__main__":  # Função principal: prepara arquivos e inicia análise
-    if len(sys.argv) != 2:
-        print("Erro: Modo de uso incorreto.")
-        print("Uso: python analisador_sintatico.py <caminho_para_o_arquivo.txt>")
-        sys.exit(1) 
+    parser = argparse.ArgumentParser(description="Compila um programa-fonte .txt para código da MVD (.obj).")
+    parser.add_argument("arquivo", help="caminho para o arquivo .txt")
+    parser.add_argument("--arvore", action="store_true",
+                        help="constrói a árvore sintática e compila em passes separados (semântico e geração)")
+    parser.add_argument("--json", action="store_true",
+                        help="imprime os diagnósticos como uma lista JSON (linha, coluna, fase, mensagem)")
+    parser.add_argument("--time-passes", action="store_true",
+                        help="mostra na saída de erro o tempo e as chamadas de cada fase, e os contadores")
+    parser.add_argument("--stats", nargs="?", const="-", metavar="ARQUIVO",
+                        help="grava tempos e contadores em JSON no arquivo (ou na saída de erro, sem arquivo)")
+    parser.add_argument("-O", "--otimizar", action="store_true",
+                        help="passa o código gerado pelo otimizador peephole antes de escrever o .obj")
+    parser.add_argument("--limite-expansao", type=int, default=LIMITE_EXPANSAO, metavar="N",
+                        help="com -O: expande subrotinas folha de até N instruções no lugar das chamadas (0 desliga)")
+    parser.add_argument("--curto-circuito", action="store_true",
+                        help="nas condições de se/enquanto, 'e'/'ou' só avaliam o lado direito quando preciso")
+    parser.add_argument("--superinstrucoes", action="store_true",
+                        help="troca sequências comuns por superinstruções da MVD (LDVV, LDVC, ADDC, INCV, CMEJF, ...)")
+    parser.add_argument("--ligar", action="store_true",
+                        help="grava o .obj ligado (saltos em índices absolutos) e os rótulos no .rot ao lado")
+    parser.add_argument("--binario", action="store_true",
+                        help="grava o programa ligado no formato binário (.mvdb) em vez do .obj")
+    args = parser.parse_args()
+
+    caminho_arquivo = args.arquivo
 
-    caminho_arquivo = sys.argv[1]
-    
     nome_base, extensao = os.path.splitext(caminho_arquivo)
     _, _, nome_arquivo = nome_base.rpartition(os.sep)
 
@@ -637,7 +684,52 @@ if __name__ == "__main__":  # Função principal: prepara arquivos e inicia aná
         print(f"Erro: O arquivo '{caminho_arquivo}' não é válido.")
         print("Por favor, forneça um arquivo .txt")
         sys.exit(1)
-    
+
     output_file = os.path.join(os.path.dirname(caminho_arquivo), f"{nome_arquivo}.obj")
-    analisador = AnalisadorSintatico(caminho_arquivo, output_file)
-    analisador.analisar()
\ No newline at end of file
+    estatisticas = Estatisticas() if args.time_passes or args.stats else None
+    if args.arvore:
+        gera = Gera(filename=output_file)
+        if estatisticas:
+            estatisticas.instrumentar_gera(gera)
+        diagnosticos = compilar_em_passes(AnalisadorLexical(caminho_arquivo), gera, estatisticas, args.curto_circuito)
+    else:
+        analisador = AnalisadorSintatico(caminho_arquivo, output_file)
+        analisador.curto_circuito = args.curto_circuito
+        gera = analisador.gera
+        if estatisticas:
+            estatisticas.instrumentar_sintatico(analisador)
+        diagnosticos = analisador.compilar()
+        if estatisticas:
+            estatisticas.finalizar(gera)
+    if not diagnosticos:
+        if args.otimizar:
+            removidas = otimizar_gera(gera, estatisticas, args.limite_expansao).subrotinas_removidas
+            if removidas:
+                print(f"Subrotinas nunca chamadas (removidas): {', '.join(removidas)}", file=sys.stderr)
+        if args.superinstrucoes:
+            superinstrucoes_gera(gera, estatisticas)
+        if args.binario:
+            try:
+                dados, rotulos = codificar(gera)
+            except ValueError as e:
+                print(f"Erro: {e}")
+                sys.exit(1)
+            escrever_binario(os.path.splitext(output_file)[0] + ".mvdb", dados, rotulos)
+        else:
+            if args.ligar:
+                escrever_rotulos(output_file, ligar(gera))
+            gera.escreve()
+
+    if args.json:
+        print(json.dumps([d.como_dict() for d in diagnosticos], ensure_ascii=False))
+    else:
+        for diagnostico in diagnosticos:
+            print(diagnostico)
+
+    if args.time_passes:
+        print(estatisticas.como_texto(), file=sys.stderr)
+    if args.stats == "-":
+        print(estatisticas.como_json(), file=sys.stderr)
+    elif args.stats:
+        with open(args.stats, "w") as f:
+            f.write(estatisticas.como_json() + "\n")
@@ -0,0 +1,462 @@
+from analisador_lexical import Simbolo, DESCRICAO_SIMBOLO
+from diagnosticos import Diagnostico, ErroCompilacao, LEXICO, SINTATICO
+
+# Árvore sintática do modo em passes: o parser só monta os nós; a verificação semântica
+# (analisador_semantico.VerificadorSemantico) e a geração (geracao_codigo.GeradorArvore)
+# percorrem a árvore depois, cada uma no seu passo.
+
+_TIPOS = frozenset({Simbolo.SINTEIRO, Simbolo.SBOOLEANO})
+_SUBROTINAS = frozenset({Simbolo.SPROCEDIMENTO, Simbolo.SFUNCAO})
+OPERADORES_SINAL = {Simbolo.SMAIS: "+u", Simbolo.SMENOS: "-u"}
+_BOOLEANOS = {Simbolo.SVERDADEIRO: True, Simbolo.SFALSO: False}
+OPERADORES_BINARIOS = {   # símbolo -> (operador, ordem); ordem menor liga mais forte, iguais associam à esquerda
+    Simbolo.SMULT: ("*", 1), Simbolo.SDIV: ("div", 1),
+    Simbolo.SMAIS: ("+", 2), Simbolo.SMENOS: ("-", 2),
+    Simbolo.SMAIOR: (">", 3), Simbolo.SMAIORIGUAL: (">=", 3), Simbolo.SMENOR: ("<", 3),
+    Simbolo.SMENORIGUAL: ("<=", 3), Simbolo.SIGUAL: ("=", 3), Simbolo.SDIF: ("!=", 3),
+    Simbolo.SE: ("e", 5),
+    Simbolo.SOU: ("ou", 6),
+}
+ORDEM_RELACIONAL = 3
+ORDEM_MAXIMA = 6
+_REPETICAO_PERMITIDA = frozenset({"inicio", "fim", "(", ")"})   # lexemas que podem aparecer duas vezes seguidas
+
+# ---------------------------------------------------------------- nós
+
+class Programa:
+    __slots__ = ("nome", "bloco", "linha", "coluna")
+
+    def __init__(self, nome, bloco, linha, coluna=None):
+        self.nome = nome
+        self.bloco = bloco
+        self.linha = linha
+        self.coluna = coluna
+
+class Bloco:    # Declarações de variáveis, sub-rotinas e o comando composto do corpo; endereco/tamanho (área
+    __slots__ = ("variaveis", "subrotinas", "corpo", "endereco", "tamanho")    # das variáveis) vêm do semântico
+
+    def __init__(self, variaveis, subrotinas, corpo):
+        self.variaveis = variaveis
+        self.subrotinas = subrotinas
+        self.corpo = corpo
+        self.endereco = None
+        self.tamanho = 0
+
+class DeclaracaoVariaveis:  # Uma linha "a, b: inteiro;"; endereco/tamanho são preenchidos pelo semântico
+    __slots__ = ("nomes", "posicoes", "tipo", "linha", "coluna", "endereco", "tamanho")
+
+    def __init__(self, nomes, posicoes, tipo, linha, coluna=None):
+        self.nomes = nomes
+        self.posicoes = posicoes    # (linha, coluna) de cada nome, para posicionar erros de redeclaração
+        self.tipo = tipo
+        self.linha = linha
+        self.coluna = coluna
+        self.endereco = None
+        self.tamanho = None
+
+class Subrotina:    # Procedimento (tipo 'procedimento') ou função (tipo 'funcao inteiro' / 'funcao booleano')
+    __slots__ = ("nome", "tipo", "bloco", "linha", "coluna", "simbolo")
+
+    def __init__(self, nome, tipo, bloco, linha, coluna=None):
+        self.nome = nome
+        self.tipo = tipo
+        self.bloco = bloco
+        self.linha = linha
+        self.coluna = coluna
+        self.simbolo = None # entrada da tabela de símbolos (preenchida pelo semântico)
+
+class Composto:     # inicio ... fim
+    __slots__ = ("comandos", "linha", "coluna")
+
+    def __init__(self, comandos, linha, coluna=None):
+        self.comandos = comandos
+        self.linha = linha
+        self.coluna = coluna
+
+class Atribuicao:
+    __slots__ = ("alvo", "expressao", "linha", "coluna")
+
+    def __init__(self, alvo, expressao, linha, coluna=None):
+        self.alvo = alvo
+        self.expressao = expressao
+        self.linha = linha
+        self.coluna = coluna
+
+class ChamadaProcedimento:
+    __slots__ = ("alvo", "linha", "coluna")
+
+    def __init__(self, alvo, linha, coluna=None):
+        self.alvo = alvo
+        self.linha = linha
+        self.coluna = coluna
+
+class Se:
+    __slots__ = ("condicao", "entao", "senao", "linha", "coluna")
+
+    def __init__(self, condicao, entao, senao, linha, coluna=None):
+        self.condicao = condicao
+        self.entao = entao
+        self.senao = senao
+        self.linha = linha
+        self.coluna = coluna
+
+class Enquanto:
+    __slots__ = ("condicao", "corpo", "linha", "coluna")
+
+    def __init__(self, condicao, corpo, linha, coluna=None):
+        self.condicao = condicao
+        self.corpo = corpo
+        self.linha = linha
+        self.coluna = coluna
+
+class Leia:
+    __slots__ = ("alvo", "linha", "coluna")
+
+    def __init__(self, alvo, linha, coluna=None):
+        self.alvo = alvo
+        self.linha = linha
+        self.coluna = coluna
+
+class Escreva:
+    __slots__ = ("alvo", "linha", "coluna")
+
+    def __init__(self, alvo, linha, coluna=None):
+        self.alvo = alvo
+        self.linha = linha
+        self.coluna = coluna
+
+class Numero:
+    __slots__ = ("valor", "linha", "coluna", "tipo")
+
+    def __init__(self, valor, linha, coluna=None):
+        self.valor = valor
+        self.linha = linha
+        self.coluna = coluna
+        self.tipo = "inteiro"
+
+class Booleano:
+    __slots__ = ("valor", "linha", "coluna", "tipo")
+
+    def __init__(self, valor, linha, coluna=None):
+        self.valor = valor
+        self.linha = linha
+        self.coluna = coluna
+        self.tipo = "booleano"
+
+class Identificador:    # Uso de variável ou função; simbolo/tipo são preenchidos pelo semântico
+    __slots__ = ("nome", "linha", "coluna", "simbolo", "tipo")
+
+    def __init__(self, nome, linha, coluna=None):
+        self.nome = nome
+        self.linha = linha
+        self.coluna = coluna
+        self.simbolo = None
+        self.tipo = None
+
+class Unario:   # operador em '-u', '+u', 'nao'
+    __slots__ = ("operador", "operando", "linha", "coluna", "tipo")
+
+    def __init__(self, operador, operando, linha, coluna=None):
+        self.operador = operador
+        self.operando = operando
+        self.linha = linha
+        self.coluna = coluna
+        self.tipo = None
+
+class Binario:  # operador em '+', '-', '*', 'div', '<', '<=', '>', '>=', '=', '!=', 'e', 'ou'
+    __slots__ = ("operador", "esquerda", "direita", "linha", "coluna", "tipo", "entre_parenteses")
+
+    def __init__(self, operador, esquerda, direita, linha, coluna=None):
+        self.operador = operador
+        self.esquerda = esquerda
+        self.direita = direita
+        self.linha = linha
+        self.coluna = coluna
+        self.tipo = None
+        self.entre_parenteses = False   # '(a e b)': na condição com curto-circuito vale como um só operando
+
+def pos_ordem(expressao):   # Percorre a expressão em pós-ordem sem recursão (cadeias longas não estouram a pilha)
+    pendentes = [(expressao, False)]
+    while pendentes:
+        no, expandido = pendentes.pop()
+        if expandido:
+            yield no
+        elif no.__class__ is Binario:
+            pendentes.append((no, True))
+            pendentes.append((no.direita, False))
+            pendentes.append((no.esquerda, False))
+        elif no.__class__ is Unario:
+            pendentes.append((no, True))
+            pendentes.append((no.operando, False))
+        else:
+            yield no
+
+# ---------------------------------------------------------------- parser
+
+# Pontos de sincronização do modo pânico (os mesmos do modo de passo único)
+_SINCRONIZACAO = frozenset({Simbolo.SPONTO_VIRGULA, Simbolo.SFIM, Simbolo.SINICIO})
+_SINCRONIZACAO_DECLARACOES = _SINCRONIZACAO | _SUBROTINAS
+_SINCRONIZACAO_CABECALHO = _SINCRONIZACAO_DECLARACOES | {Simbolo.SVAR}
+
+class AnalisadorArvore:     # Parser descendente recursivo que só constrói a árvore (sem tabela nem geração)
+    """
+    Erros sobem como ErroCompilacao até o ponto de recuperação mais próximo (comando, linha de
+    declaração, cabeçalho de sub-rotina), que registra o diagnóstico em self.diagnosticos e
+    sincroniza em ';', 'fim' ou 'inicio'. O comando com erro fica fora da árvore.
+    """
+
+    def __init__(self, lexador):
+        self.lexador = lexador
+        self.token_atual = None
+        self.diagnosticos = []
+        self.panico = False     # ligado no erro, desligado ao sincronizar: evita erros em cascata
+
+    def analisar(self):     # Devolve o nó Programa (com os comandos que puderam ser analisados)
+        self.token_atual = self.lexador.proximo_token()
+        try:
+            return self._programa()
+        finally:
+            self.lexador.fechar()
+
+    def _erro(self, mensagem):
+        token = self.token_atual
+        if token is not None and token.simbolo == Simbolo.SERRO:
+            return ErroCompilacao(Diagnostico.no_token(LEXICO, f"Caractere inválido '{token.lexema}'", token))
+        return ErroCompilacao(Diagnostico.no_token(SINTATICO, mensagem, token))
+
+    def _registrar(self, erro):
+        if not self.panico:
+            self.diagnosticos.append(erro.diagnostico)
+        self.panico = True
+
+    def _sincronizar(self, parada=_SINCRONIZACAO):  # Descarta tokens até ';' (consumido), 'fim' ou 'inicio'
+        while self.token_atual and self.token_atual.simbolo not in parada:
+            self.token_atual = self.lexador.proximo_token()
+        if self.token_atual and self.token_atual.simbolo == Simbolo.SPONTO_VIRGULA:
+            self.token_atual = self.lexador.proximo_token()
+        self.panico = False
+
+    def _simbolo(self):
+        return self.token_atual.simbolo if self.token_atual else None
+
+    def _linha(self):
+        return self.token_atual.linha if self.token_atual else None
+
+    def _coluna(self):
+        return self.token_atual.coluna if self.token_atual else None
+
+    def _consumir(self, simbolo_esperado):  # Mesmas verificações (e mensagens) do modo de passo único
+        token = self.token_atual
+        if token is None:
+            raise self._erro(f"Esperado '{DESCRICAO_SIMBOLO[simbolo_esperado]}', mas encontrado 'EOF'")
+        if token.simbolo != simbolo_esperado:
+            raise self._erro(f"Esperado '{DESCRICAO_SIMBOLO[simbolo_esperado]}', mas encontrado '{token.lexema}'")
+        self.token_atual = self.lexador.proximo_token()
+        if self.token_atual and token.lexema == self.token_atual.lexema and token.lexema not in _REPETICAO_PERMITIDA:
+            raise self._erro(f"Símbolo '{self.token_atual.lexema}' duplicado.")
+        return token
+
+    def _programa(self):    # programa identificador; bloco .
+        linha, coluna = self._linha(), self._coluna()
+        nome = None
+        try:
+            self._consumir(Simbolo.SPROGRAMA)
+            nome = self._consumir(Simbolo.SIDENTIFICADOR).lexema
+            self._consumir(Simbolo.SPONTO_VIRGULA)
+        except ErroCompilacao as e:
+            self._registrar(e)
+            self._sincronizar(_SINCRONIZACAO_CABECALHO)
+        return Programa(nome, self._bloco(final=True), linha, coluna)
+
+    def _bloco(self, final=False):
+        variaveis = self._variaveis()
+        subrotinas = self._subrotinas()
+        return Bloco(variaveis, subrotinas, self._composto(final))
+
+    def _variaveis(self):   # var a, b: inteiro; c: booleano; ...
+        declaracoes = []
+        if self._simbolo() == Simbolo.SVAR:
+            self._consumir(Simbolo.SVAR)
+            while self._simbolo() == Simbolo.SIDENTIFICADOR:
+                try:
+                    declaracoes.append(self._declaracao_variaveis())
+                except ErroCompilacao as e:
+                    self._registrar(e)
+                    self._sincronizar(_SINCRONIZACAO_DECLARACOES)
+        return declaracoes
+
+    def _declaracao_variaveis(self):    # a, b: inteiro;
+        tokens = [self._consumir(Simbolo.SIDENTIFICADOR)]
+        while self._simbolo() == Simbolo.SVIRGULA:
+            self._consumir(Simbolo.SVIRGULA)
+            tokens.append(self._consumir(Simbolo.SIDENTIFICADOR))
+        self._consumir(Simbolo.SDOISPONTOS)
+        tipo = self._tipo("Tipo esperado (inteiro ou booleano)")
+        declaracao = DeclaracaoVariaveis([t.lexema for t in tokens], [(t.linha, t.coluna) for t in tokens],
+                                         tipo, self._linha(), self._coluna())
+        self._consumir(Simbolo.SPONTO_VIRGULA)
+        return declaracao
+
+    def _tipo(self, mensagem):
+        if self._simbolo() not in _TIPOS:
+            raise self._erro(mensagem)
+        return self._consumir(self.token_atual.simbolo).lexema
+
+    def _subrotinas(self):
+        subrotinas = []
+        while self._simbolo() in _SUBROTINAS:
+            procedimento = self._consumir(self.token_atual.simbolo).simbolo == Simbolo.SPROCEDIMENTO
+            linha, coluna = self._linha(), self._coluna()
+            nome = tipo = None
+            try:
+                nome = self._consumir(Simbolo.SIDENTIFICADOR).lexema
+                if procedimento:
+                    tipo = "procedimento"
+                else:
+                    self._consumir(Simbolo.SDOISPONTOS)
+                    tipo = "funcao " + self._tipo("Tipo de retorno esperado (inteiro ou booleano)")
+                self._consumir(Simbolo.SPONTO_VIRGULA)
+            except ErroCompilacao as e:
+                # Cabeçalho inválido: o corpo ainda é analisado para achar os erros de dentro dele
+                self._registrar(e)
+                self._sincronizar(_SINCRONIZACAO_CABECALHO)
+                nome = tipo = None
+            subrotinas.append(Subrotina(nome, tipo, self._bloco(), linha, coluna))
+            if self.panico:
+                self._sincronizar(_SINCRONIZACAO_DECLARACOES)
+        return subrotinas
+
+    def _composto(self, final=False):   # inicio comandos fim ('.' no programa, ';' nos demais)
+        linha, coluna = self._linha(), self._coluna()
+        if self._simbolo() != Simbolo.SINICIO:
+            self._registrar(self._erro("Esperado 'inicio' para iniciar o bloco de comandos."))
+            self._sincronizar()
+        if self._simbolo() == Simbolo.SINICIO:
+            self._consumir(Simbolo.SINICIO)
+        comandos = []
+        while self.token_atual and self.token_atual.simbolo != Simbolo.SFIM:
+            try:
+                comandos.append(self._comando())
+            except ErroCompilacao as e:
+                self._registrar(e)
+            if self.panico:
+                self._sincronizar()
+        try:
+            self._consumir(Simbolo.SFIM)
+            self._consumir(Simbolo.SPONTO if final else Simbolo.SPONTO_VIRGULA)
+        except ErroCompilacao as e:
+            self._registrar(e)  # quem chamou sincroniza
+        return Composto(comandos, linha, coluna)
+
+    def _comando(self, sentao_ssenao=False):
+        simbolo = self._simbolo()
+        if simbolo == Simbolo.SSE:
+            return self._se()
+        if simbolo == Simbolo.SENQUANTO:
+            return self._enquanto()
+        if simbolo == Simbolo.SINICIO:
+            return self._composto()
+        if simbolo == Simbolo.SIDENTIFICADOR:
+            comando = self._atrib_chprocedimento()
+        elif simbolo == Simbolo.SESCREVA:
+            comando = Escreva(*self._leia_escreva(Simbolo.SESCREVA))
+        elif simbolo == Simbolo.SLEIA:
+            comando = Leia(*self._leia_escreva(Simbolo.SLEIA))
+        elif simbolo is None:
+            raise self._erro("Esperado um comando, mas encontrado 'EOF'")
+        else:
+            raise self._erro(f"Comando inválido ou inesperado '{self.token_atual.lexema}'.")
+
+        # ';' é opcional antes de 'fim' e, dentro de se/senao, antes de qualquer coisa
+        if self._simbolo() == Simbolo.SFIM:
+            return comando
+        if sentao_ssenao:
+            if self._simbolo() == Simbolo.SPONTO_VIRGULA:
+                self._consumir(Simbolo.SPONTO_VIRGULA)
+            return comando
+        self._consumir(Simbolo.SPONTO_VIRGULA)
+        return comando
+
+    def _atrib_chprocedimento(self):
+        token = self._consumir(Simbolo.SIDENTIFICADOR)
+        alvo = Identificador(token.lexema, token.linha, token.coluna)
+        if self._simbolo() == Simbolo.SATRIBUICAO:
+            self._consumir(Simbolo.SATRIBUICAO)
+            expressao = self._expressao()
+            return Atribuicao(alvo, expressao, self._linha(), self._coluna())
+        return ChamadaProcedimento(alvo, token.linha, token.coluna)
+
+    def _leia_escreva(self, simbolo):   # leia(x) / escreva(x): devolve (alvo, linha, coluna)
+        linha, coluna = self._linha(), self._coluna()
+        self._consumir(simbolo)
+        self._consumir(Simbolo.SABRE_PARENTESES)
+        token = self._consumir(Simbolo.SIDENTIFICADOR)
+        self._consumir(Simbolo.SFECHA_PARENTESES)
+        return Identificador(token.lexema, token.linha, token.coluna), linha, coluna
+
+    def _enquanto(self):
+        self._consumir(Simbolo.SENQUANTO)
+        condicao = self._expressao()
+        linha, coluna = self._linha(), self._coluna()
+        self._consumir(Simbolo.SFACA)
+        return Enquanto(condicao, self._comando(), linha, coluna)
+
+    def _se(self):
+        self._consumir(Simbolo.SSE)
+        condicao = self._expressao()
+        linha, coluna = self._linha(), self._coluna()
+        self._consumir(Simbolo.SENTAO)
+        entao = self._comando(sentao_ssenao=True)
+        senao = None
+        if self._simbolo() == Simbolo.SSENAO:
+            self._consumir(Simbolo.SSENAO)
+            senao = self._comando(sentao_ssenao=True)
+        return Se(condicao, entao, senao, linha, coluna)
+
+    # Expressões por precedência: 'limite' é a maior ordem de operador que ainda pode ser absorvida.
+    # Sinal unário só vale no início da expressão, após '(' ou após um relacional.
+    def _expressao(self, limite=ORDEM_MAXIMA, sinal=True):
+        return self._continua_binario(self._operando(sinal), limite)
+
+    def _continua_binario(self, esquerda, limite):
+        while self._simbolo() in OPERADORES_BINARIOS:
+            operador, ordem = OPERADORES_BINARIOS[self.token_atual.simbolo]
+            if ordem > limite:
+                break
+            token = self._consumir(self.token_atual.simbolo)
+            direita = self._expressao(ordem - 1, sinal=ordem == ORDEM_RELACIONAL)
+            esquerda = Binario(operador, esquerda, direita, token.linha, token.coluna)
+        return esquerda
+
+    def _operando(self, sinal):
+        token = self.token_atual
+        if token is None:
+            raise self._erro("Esperado um fator, mas encontrado 'EOF'")
+        if sinal and token.simbolo in OPERADORES_SINAL:
+            self._consumir(token.simbolo)
+            return Unario(OPERADORES_SINAL[token.simbolo], self._operando(False), token.linha, token.coluna)
+        if token.simbolo == Simbolo.SIDENTIFICADOR:
+            self._consumir(Simbolo.SIDENTIFICADOR)
+            return Identificador(token.lexema, token.linha, token.coluna)
+        if token.simbolo == Simbolo.SNUMERO:
+            self._consumir(Simbolo.SNUMERO)
+            return Numero(int(token.lexema), token.linha, token.coluna)
+        if token.simbolo in _BOOLEANOS:
+            self._consumir(token.simbolo)
+            return Booleano(_BOOLEANOS[token.simbolo], token.linha, token.coluna)
+        if token.simbolo == Simbolo.SABRE_PARENTESES:
+            self._consumir(Simbolo.SABRE_PARENTESES)
+            expressao = self._expressao()
+            self._consumir(Simbolo.SFECHA_PARENTESES)
+            if expressao.__class__ is Binario:
+                expressao.entre_parenteses = True
+            return expressao
+        if token.simbolo == Simbolo.SNAO:
+            # 'nao' seguido de '(' nega só o grupo; senão alcança os operadores até os relacionais
+            self._consumir(Simbolo.SNAO)
+            if self._simbolo() == Simbolo.SABRE_PARENTESES:
+                operando = self._operando(False)
+            else:
+                operando = self._continua_binario(self._operando(False), ORDEM_RELACIONAL)
+            return Unario("nao", operando, token.linha, token.coluna)
+        raise self._erro(f"Fator inválido ou inesperado '{token.lexema}'.")
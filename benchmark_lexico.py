@@ -0,0 +1,147 @@
+import argparse
+import glob
+import json
+import os
+import random
+import sys
+import tempfile
+import time
+import tracemalloc
+from analisador_lexical import AnalisadorLexical
+
+PERFIS = ("identificadores", "comentarios", "operadores", "numeros_longos", "misto")
+CORPUS_LEXICO = os.path.join(os.path.dirname(os.path.abspath(__file__)), "input", "test_lex")
+
+_PALAVRAS = ("se", "entao", "senao", "enquanto", "faca", "inicio", "fim", "escreva", "leia",
+             "verdadeiro", "falso", "div", "e", "ou", "nao")
+_OPERADORES = ("+", "-", "*", "div", "<", "<=", ">", ">=", "=", "!=", "e", "ou")
+
+def _identificador(rnd, minimo=1, maximo=12):   # Nome aleatório começando por letra
+    letras = "abcdefghijklmnopqrstuvwxyz"
+    tamanho = rnd.randint(minimo, maximo)
+    return rnd.choice(letras) + "".join(rnd.choice(letras + "0123456789_") for _ in range(tamanho - 1))
+
+def _linha(rnd, perfil):    # Gera uma linha de código com a distribuição do perfil escolhido
+    if perfil == "misto":
+        perfil = rnd.choice(PERFIS[:-1])
+    if perfil == "identificadores":
+        nomes = [_identificador(rnd, 6, 24) for _ in range(rnd.randint(2, 6))]
+        return f"  {nomes[0]} := {' + '.join(nomes[1:])}; {rnd.choice(_PALAVRAS)} {_identificador(rnd, 8, 30)};"
+    if perfil == "comentarios":
+        palavras = " ".join(_identificador(rnd) for _ in range(rnd.randint(4, 16)))
+        if rnd.random() < 0.3:
+            return "{ " + palavras + "\n  " + palavras + " }"
+        return f"  x := 1; {{ {palavras} }}"
+    if perfil == "operadores":
+        partes = [rnd.choice(("a", "b", "c", "1", "(a)", "(b-c)"))]
+        for _ in range(rnd.randint(6, 20)):
+            partes.append(rnd.choice(("+", "-", "*", "<", "<=", ">=", "!=", "<>", "=")))
+            partes.append(rnd.choice(("a", "b", "c", "1", "(a)", "(b-c)")))
+        return "  r:=" + "".join(partes) + ";"
+    # numeros_longos
+    numeros = ["".join(rnd.choice("0123456789") for _ in range(rnd.randint(12, 60))) for _ in range(rnd.randint(2, 5))]
+    return f"  n := {' * '.join(numeros)};"
+
+def gerar_fonte(tamanho_bytes, perfil="misto", semente=0):  # Gera um programa sintético com ~tamanho_bytes
+    """Gera texto-fonte sintético do perfil pedido; o conteúdo é determinístico para a mesma semente."""
+    if perfil not in PERFIS:
+        raise ValueError(f"Perfil desconhecido: '{perfil}'. Use um de {', '.join(PERFIS)}.")
+    rnd = random.Random(semente)
+    linhas = ["programa sintetico;", "var a, b, c, r, n, x: inteiro;", "inicio"]
+    tamanho = sum(len(linha) + 1 for linha in linhas)
+    while tamanho < tamanho_bytes:
+        linha = _linha(rnd, perfil)
+        linhas.append(linha)
+        tamanho += len(linha) + 1
+    linhas.append("fim.")
+    return "\n".join(linhas) + "\n"
+
+def _contar_tokens(caminho):    # Executa o léxico completo sobre um arquivo e devolve a quantidade de tokens
+    lexico = AnalisadorLexical(caminho)
+    quantidade = 0
+    while lexico.proximo_token() is not None:
+        quantidade += 1
+    lexico.fechar()
+    return quantidade
+
+def medir(caminho, repeticoes=3):   # Mede vazão (melhor de N execuções) e pico de memória do léxico
+    tamanho = os.path.getsize(caminho)
+    melhor = None
+    for _ in range(repeticoes):
+        inicio = time.perf_counter()
+        tokens = _contar_tokens(caminho)
+        duracao = time.perf_counter() - inicio
+        melhor = duracao if melhor is None else min(melhor, duracao)
+
+    # O tracemalloc deixa a execução mais lenta, então o pico é medido em uma rodada separada
+    tracemalloc.start()
+    _contar_tokens(caminho)
+    _, pico = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    return {
+        "bytes": tamanho,
+        "tokens": tokens,
+        "segundos": round(melhor, 6),
+        "tokens_por_segundo": round(tokens / melhor, 1),
+        "mb_por_segundo": round(tamanho / 1e6 / melhor, 3),
+        "pico_memoria_bytes": pico,
+    }
+
+def _serializar_tokens(caminho):    # Uma linha por token: "linha SIMBOLO lexema" (o léxico original não tinha coluna)
+    lexico = AnalisadorLexical(caminho)
+    linhas = [f"{t.linha} {t.simbolo.name} {t.lexema}" for t in lexico.tokens()]
+    return "\n".join(linhas) + "\n"
+
+def verificar_corpus(diretorio=CORPUS_LEXICO, atualizar=False):  # Compara cada .txt com o seu .tokens de referência
+    """Devolve {arquivo: 'ok' | 'diferente' | 'sem referencia' | 'atualizado'}."""
+    resultado = {}
+    for fonte in sorted(glob.glob(os.path.join(diretorio, "*.txt"))):
+        referencia = os.path.splitext(fonte)[0] + ".tokens"
+        atual = _serializar_tokens(fonte)
+        nome = os.path.basename(fonte)
+        if atualizar:
+            with open(referencia, "w") as f:
+                f.write(atual)
+            resultado[nome] = "atualizado"
+        elif not os.path.exists(referencia):
+            resultado[nome] = "sem referencia"
+        else:
+            with open(referencia) as f:
+                resultado[nome] = "ok" if f.read() == atual else "diferente"
+    return resultado
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark de vazão do analisador léxico (saída em JSON).")
+    parser.add_argument("--tamanho-mb", type=float, default=1.0, help="tamanho de cada fonte sintética (MB)")
+    parser.add_argument("--perfis", nargs="+", choices=PERFIS, default=list(PERFIS), help="perfis de fonte a gerar")
+    parser.add_argument("--repeticoes", type=int, default=3, help="execuções por perfil (vale a mais rápida)")
+    parser.add_argument("--semente", type=int, default=0, help="semente do gerador de fontes")
+    parser.add_argument("--saida", help="grava o JSON neste arquivo além de imprimir")
+    parser.add_argument("--sem-corpus", action="store_true", help="não verifica os tokens de input/test_lex")
+    parser.add_argument("--atualizar-referencia", action="store_true", help="regrava os .tokens de input/test_lex")
+    args = parser.parse_args(argv)
+
+    relatorio = {"python": sys.version.split()[0], "tamanho_mb": args.tamanho_mb, "perfis": {}}
+    with tempfile.TemporaryDirectory() as pasta:
+        for perfil in args.perfis:
+            caminho = os.path.join(pasta, f"{perfil}.txt")
+            with open(caminho, "w") as f:
+                f.write(gerar_fonte(int(args.tamanho_mb * 1e6), perfil, args.semente))
+            relatorio["perfis"][perfil] = medir(caminho, args.repeticoes)
+
+    falhou = False
+    if not args.sem_corpus:
+        corpus = verificar_corpus(atualizar=args.atualizar_referencia)
+        relatorio["corpus_test_lex"] = corpus
+        falhou = any(estado != "ok" and estado != "atualizado" for estado in corpus.values())
+
+    saida = json.dumps(relatorio, indent=2, ensure_ascii=False)
+    print(saida)
+    if args.saida:
+        with open(args.saida, "w") as f:
+            f.write(saida + "\n")
+    return 1 if falhou else 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,94 @@
+# Formato binário da MVD (.mvdb): conversão de ida e volta com o .obj em texto.
+# O layout do arquivo e a leitura (mmap/memoryview) ficam em core.py, junto da MVD que o executa; aqui ficam a
+# codificação a partir do código gerado e a desmontagem de volta para texto (exportação / depuração).
+import argparse
+import sys
+from array import array
+from core import (ARGUMENTOS_BINARIO, ARIDADE, CABECALHO_BINARIO, MAGICO_BINARIO, OPCODES, VERSAO_BINARIO,
+                  caminho_rotulos, secoes_binario)
+from geracao_codigo import Gera, linhas_obj
+from ligador import escrever_rotulos, resolver_rotulos
+
+def codificar(gera):   # Registros do Gera (com rótulos ou já ligados) -> (bytes do .mvdb, {índice: rótulo})
+    """
+    Lê os arrays do Gera direto, sem passar pelo texto. Nos programas com rótulos os saltos são resolvidos aqui
+    (o Gera não muda): no binário só existem índices.
+    ValueError se um argumento (constante ou endereço) não cabe nos int64 do formato.
+    """
+    tipo = ARGUMENTOS_BINARIO[VERSAO_BINARIO]
+    try:
+        arg1 = array(tipo, gera.arg1)
+        arg2 = array(tipo, gera.arg2)
+    except OverflowError:
+        bits = 8 * array(tipo).itemsize
+        indice = next(i for i, argumentos in enumerate(zip(gera.arg1, gera.arg2))
+                      if any(not -2 ** (bits - 1) <= argumento < 2 ** (bits - 1) for argumento in argumentos))
+        instrucao = " ".join(parte for parte in gera.registro(indice)[1:] if parte is not None)
+        raise ValueError(f"Argumento de '{instrucao}' fora do limite do formato binário (int{bits})") from None
+    rotulos = {}
+    if not gera.ligado:
+        saltos, rotulos = resolver_rotulos(gera)
+        for indice, destino in saltos:
+            arg1[indice] = destino
+    if sys.byteorder != "little":
+        arg1.byteswap()
+        arg2.byteswap()
+    n = len(gera)
+    codigos = bytes(gera.opcodes) + bytes((n + 3) // 4 * 4 - n)     # completa os códigos até múltiplo de 4
+    dados = CABECALHO_BINARIO.pack(MAGICO_BINARIO, VERSAO_BINARIO, n) + codigos + arg1.tobytes() + arg2.tobytes()
+    return dados, rotulos
+
+def desmontar(dados, gera=None):    # Bytes do .mvdb -> Gera com o código ligado (o texto sai como o do ligador)
+    codigos, arg1, arg2 = secoes_binario(dados)
+    if gera is None:
+        gera = Gera()
+    gera.limpa()
+    gera.ligado = True
+    for codigo, primeiro, segundo in zip(codigos, arg1, arg2):
+        nome = OPCODES[codigo]
+        aridade = ARIDADE[nome]
+        gera("", nome, primeiro if aridade >= 1 else "", segundo if aridade == 2 else "")
+    return gera
+
+def escrever_binario(caminho, dados, rotulos=None):     # Grava o .mvdb (e o .rot, se houver rótulos)
+    with open(caminho, "wb") as f:
+        f.write(dados)
+    if rotulos:
+        escrever_rotulos(caminho, rotulos)
+
+def _copiar_rotulos(origem, destino):   # A tabela .rot (se existir) acompanha o programa convertido
+    try:
+        with open(caminho_rotulos(origem), "r") as f:
+            rotulos = f.read()
+    except OSError:
+        return
+    with open(caminho_rotulos(destino), "w") as f:
+        f.write(rotulos)
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Converte programas da MVD entre .obj (texto) e .mvdb (binário).")
+    parser.add_argument("entrada", help=".obj (texto, com rótulos ou ligado) ou .mvdb (binário)")
+    parser.add_argument("saida", help="arquivo de saída, no formato oposto ao da entrada")
+    args = parser.parse_args(argv)
+
+    with open(args.entrada, "rb") as f:
+        dados = f.read()
+    if dados.startswith(MAGICO_BINARIO):
+        with open(args.saida, "w") as f:    # no caminho pedido, sem a extensão .obj que o Gera.escreve acrescenta
+            f.writelines(linha + "\n" for linha in linhas_obj(desmontar(dados)))
+        _copiar_rotulos(args.entrada, args.saida)
+    else:
+        gera = Gera()
+        gera.acrescenta(dados.decode().splitlines())
+        try:
+            binario, rotulos = codificar(gera)
+        except ValueError as e:
+            print(f"Erro: {e}", file=sys.stderr)
+            return 1
+        escrever_binario(args.saida, binario, rotulos)
+        if not rotulos:     # entrada já ligada: a tabela dela continua valendo
+            _copiar_rotulos(args.entrada, args.saida)
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,102 @@
+# Cache em disco dos .obj, endereçado pelo conteúdo: a chave é o hash do texto-fonte, da versão do compilador
+# e das opções. Um acerto devolve o código guardado sem rodar léxico, sintático nem geração.
+import hashlib
+import json
+import os
+import tempfile
+
+_MODULOS_COMPILADOR = ("analisador_lexical.py", "analisador_sintatico.py", "analisador_semantico.py",
+                       "arvore_sintatica.py", "geracao_codigo.py", "diagnosticos.py", "compilador.py",
+                       "otimizador.py", "ligador.py", "bytecode.py", "core.py")  # core: tabela de opcodes da MVD
+_versao = None
+
+def versao_compilador():    # Impressão digital do código do compilador: qualquer mudança invalida o cache
+    global _versao
+    if _versao is None:
+        pasta = os.path.dirname(os.path.abspath(__file__))
+        resumo = hashlib.sha256()
+        for nome in _MODULOS_COMPILADOR:
+            with open(os.path.join(pasta, nome), "rb") as arquivo:
+                resumo.update(nome.encode() + b"\0" + arquivo.read() + b"\0")
+        _versao = resumo.hexdigest()[:16]
+    return _versao
+
+class CacheCompilacao:  # Diretório de .obj com remoção dos menos usados (LRU) quando passa do limite
+    """
+    Cada entrada é um arquivo <pasta>/<2 primeiros hex>/<chave>.obj; o horário de modificação marca o último
+    uso. Só compilações sem erros são guardadas. Gravações são atômicas (arquivo temporário + os.replace),
+    então vários processos do compilar_lote podem dividir a mesma pasta.
+    """
+
+    def __init__(self, pasta, limite_bytes=64 * 1024 * 1024):
+        self.pasta = pasta
+        self.limite_bytes = limite_bytes
+        self.acertos = 0
+        self.faltas = 0
+        self._tamanho = None    # total em bytes (calculado na primeira gravação)
+
+    def chave(self, texto, opcoes): # Hash de versão + opções + fonte
+        resumo = hashlib.sha256()
+        resumo.update(versao_compilador().encode() + b"\0")
+        resumo.update(json.dumps(opcoes.como_dict(), sort_keys=True).encode() + b"\0")
+        resumo.update(texto.encode())
+        return resumo.hexdigest()
+
+    def _caminho(self, chave):
+        return os.path.join(self.pasta, chave[:2], chave + ".obj")
+
+    def buscar(self, chave):    # Devolve as linhas do .obj guardado, ou None
+        caminho = self._caminho(chave)
+        try:
+            with open(caminho, "r") as arquivo:
+                instrucoes = arquivo.read().splitlines()
+            os.utime(caminho)   # marca como usado agora
+        except OSError:
+            self.faltas += 1
+            return None
+        self.acertos += 1
+        return instrucoes
+
+    def guardar(self, chave, instrucoes):
+        caminho = self._caminho(chave)
+        os.makedirs(os.path.dirname(caminho), exist_ok=True)
+        conteudo = "".join(instrucao + "\n" for instrucao in instrucoes)
+        descritor, temporario = tempfile.mkstemp(dir=os.path.dirname(caminho), suffix=".tmp")
+        with os.fdopen(descritor, "w") as arquivo:
+            arquivo.write(conteudo)
+        os.replace(temporario, caminho)
+
+        if self._tamanho is None:
+            self._tamanho = sum(tamanho for _, tamanho, _ in self._entradas())
+        else:
+            self._tamanho += len(conteudo.encode())
+        if self._tamanho > self.limite_bytes:
+            self._remover_antigos()
+
+    def _entradas(self):    # (último uso, tamanho, caminho) de cada entrada
+        if not os.path.isdir(self.pasta):
+            return
+        for sub in os.scandir(self.pasta):
+            if not sub.is_dir():
+                continue
+            for entrada in os.scandir(sub.path):
+                if entrada.name.endswith(".obj"):
+                    try:
+                        info = entrada.stat()
+                    except OSError:     # removida por outro processo
+                        continue
+                    yield info.st_mtime, info.st_size, entrada.path
+
+    def _remover_antigos(self): # Apaga as entradas menos usadas até ficar em 90% do limite
+        entradas = sorted(self._entradas())
+        total = sum(tamanho for _, tamanho, _ in entradas)
+        alvo = self.limite_bytes * 0.9
+        for _, tamanho, caminho in entradas:
+            if total <= alvo:
+                break
+            try:
+                os.remove(caminho)
+            except OSError:
+                pass
+            total -= tamanho
+        self._tamanho = total
@@ -0,0 +1,191 @@
+# Recompilação incremental por subrotina: cada procedimento/função é identificado pelo seu trecho de tokens e
+# pelos símbolos externos que ele enxerga; se nada disso mudou desde a compilação anterior, o bloco de
+# instruções já gerado é reaproveitado sem passar de novo por _analisa_declaracao_procedimento/_funcao.
+from collections import deque
+from itertools import islice
+from analisador_lexical import LexicoIncremental, Simbolo
+from analisador_sintatico import AnalisadorSintatico, _SUBROTINAS
+from compilador import ProgramaCompilado
+from geracao_codigo import Gera, Rotulo, linhas_obj
+
+class _LexadorComRetorno:   # Fluxo de tokens que aceita devolver tokens já lidos (lidos à frente para medir a subrotina)
+    def __init__(self, tokens):
+        self._tokens = iter(tokens)
+        self.devolvidos = deque()
+        self.entregues = 0  # quantos tokens já foram entregues ao analisador
+
+    def proximo_token(self):
+        self.entregues += 1
+        if self.devolvidos:
+            return self.devolvidos.popleft()
+        return next(self._tokens, None)
+
+    def devolver(self, tokens):
+        self.devolvidos.extendleft(reversed(tokens))
+        self.entregues -= len(tokens)
+
+    def fechar(self):
+        pass
+
+def _pular_subrotina(proximo):  # Consome "nome ... ;" de uma subrotina sem analisá-la; False se não der para delimitar
+    """
+    Segue só a estrutura do bloco (cabeçalho até ';', 'var', subrotinas aninhadas e o 'inicio ... fim;' do corpo),
+    que é exatamente o trecho que o analisador consome quando a subrotina não tem erros.
+    """
+    token = proximo()
+    while token is not None and token.simbolo != Simbolo.SPONTO_VIRGULA:   # cabeçalho
+        if token.simbolo in (Simbolo.SERRO, Simbolo.SVAR, Simbolo.SINICIO, Simbolo.SFIM) or token.simbolo in _SUBROTINAS:
+            return False
+        token = proximo()
+    if token is None:
+        return False
+
+    token = proximo()
+    if token is not None and token.simbolo == Simbolo.SVAR:   # declarações de variáveis
+        while token is not None and token.simbolo not in _SUBROTINAS and token.simbolo != Simbolo.SINICIO:
+            if token.simbolo in (Simbolo.SERRO, Simbolo.SFIM):
+                return False
+            token = proximo()
+    while token is not None and token.simbolo in _SUBROTINAS:   # subrotinas aninhadas
+        if not _pular_subrotina(proximo):
+            return False
+        token = proximo()
+    if token is None or token.simbolo != Simbolo.SINICIO:
+        return False
+
+    profundidade = 1    # corpo: 'inicio' e 'fim' balanceados
+    while profundidade:
+        token = proximo()
+        if token is None or token.simbolo == Simbolo.SERRO:
+            return False
+        if token.simbolo == Simbolo.SINICIO:
+            profundidade += 1
+        elif token.simbolo == Simbolo.SFIM:
+            profundidade -= 1
+    token = proximo()
+    return token is not None and token.simbolo == Simbolo.SPONTO_VIRGULA
+
+class _BlocoCompilado:  # O que uma subrotina sem erros deixou para o resto do programa
+    __slots__ = ("instrucoes", "subrotinas", "tipo", "rotulo", "endereco_depois", "aninhados")
+
+    def __init__(self, instrucoes, subrotinas, tipo, rotulo, endereco_depois, aninhados):
+        self.instrucoes = instrucoes
+        self.subrotinas = subrotinas    # Gera.subrotinas do trecho, com posições relativas ao início dele
+        self.tipo = tipo
+        self.rotulo = rotulo
+        self.endereco_depois = endereco_depois
+        self.aninhados = aninhados  # chaves das subrotinas internas (continuam valendo enquanto esta valer)
+
+class AnalisadorIncremental(AnalisadorSintatico):  # Passo único com rótulos estáveis e reaproveitamento de subrotinas
+    """
+    Os rótulos de cada subrotina vêm de um Rotulo próprio, prefixado pelo caminho de nomes ("L.soma.1",
+    "L.soma.aux.2"), então editar uma subrotina não renumera as outras. O programa principal continua com L1, L2, ...
+    """
+
+    def __init__(self, tokens, blocos, usados):
+        self._iniciar(_LexadorComRetorno(tokens), Gera())
+        self.blocos = blocos    # chave -> _BlocoCompilado (da compilação anterior)
+        self.usados = usados    # chaves usadas nesta compilação (as demais são descartadas no fim)
+        self.caminho = []       # nomes das subrotinas em análise, da mais externa para a atual
+        self.reaproveitadas = 0
+        self.recompiladas = 0
+
+    def _analisa_declaracao_procedimento(self):
+        self._declaracao_incremental(super()._analisa_declaracao_procedimento)
+
+    def _analisa_declaracao_funcao(self):
+        self._declaracao_incremental(super()._analisa_declaracao_funcao)
+
+    def _chave(self, tokens):   # Trecho da subrotina + contexto externo que influencia o código gerado
+        dependencias = []
+        for nome in sorted({t.lexema for t in tokens if t.simbolo == Simbolo.SIDENTIFICADOR}):
+            try:
+                simbolo = self.tabela.buscar_simbolo(nome)
+                dependencias.append((nome, simbolo.tipo, simbolo.memoria, simbolo.rotulo))
+            except ValueError:
+                dependencias.append((nome, None))
+        return (".".join(self.caminho), self.tabela.endereco_memoria, self.tabela.nivel_atual, self.pisos[-1],
+                tuple((t.simbolo, t.lexema) for t in tokens), tuple(dependencias))
+
+    def _declaracao_incremental(self, analisar):
+        nome = self.token_atual
+        tokens = [nome] if nome is not None else []
+        def proximo():
+            token = self.lexador.proximo_token()
+            if token is not None:
+                tokens.append(token)
+            return token
+        delimitada = nome is not None and nome.simbolo == Simbolo.SIDENTIFICADOR and _pular_subrotina(proximo)
+        chave = self._chave(tokens) if delimitada and not self.erro else None
+
+        bloco = self.blocos.get(chave) if chave is not None else None
+        if bloco is not None:
+            self._reaproveitar(nome.lexema, bloco)
+            self.usados[chave] = bloco
+            for aninhada in bloco.aninhados:
+                if aninhada in self.blocos:
+                    self.usados[aninhada] = self.blocos[aninhada]
+            self.reaproveitadas += 1
+            return
+
+        self.lexador.devolver(tokens[1:])
+        entregues = self.lexador.entregues
+        inicio = len(self.gera)
+        subrotinas = len(self.gera.subrotinas)
+        erros = len(self.diagnosticos)
+        guardados = len(self.usados)
+        rotulo_externo = self.rotulo
+        self.caminho.append(nome.lexema if nome is not None else "?")
+        self.rotulo = Rotulo(f"L.{'.'.join(self.caminho)}.")
+        analisar()
+        self.rotulo = rotulo_externo
+        self.caminho.pop()
+        self.recompiladas += 1
+
+        # Só guarda subrotinas sem erros que consumiram exatamente o trecho delimitado
+        if chave is None or self.erro or len(self.diagnosticos) != erros or self.lexador.entregues - entregues != len(tokens):
+            return
+        simbolo = self.tabela.simbolo_local(nome.lexema)
+        if simbolo is not None:
+            aninhados = tuple(islice(self.usados, guardados, None))
+            trechos = tuple((nome_sub, rotulo, de - inicio, ate - inicio)
+                            for nome_sub, rotulo, de, ate in self.gera.subrotinas[subrotinas:])
+            self.usados[chave] = _BlocoCompilado(list(linhas_obj(self.gera, inicio)), trechos, simbolo.tipo,
+                                                 simbolo.rotulo, self.tabela.endereco_memoria, aninhados)
+
+    def _reaproveitar(self, nome, bloco):   # Repete os efeitos da subrotina sem analisá-la
+        self.tabela.adicionar_simbolo(nome, tipo=bloco.tipo, rotulo=bloco.rotulo)
+        base = len(self.gera)
+        self.gera.subrotinas.extend((nome_sub, rotulo, de + base, ate + base) for nome_sub, rotulo, de, ate in bloco.subrotinas)
+        self.gera.acrescenta(bloco.instrucoes)
+        self.tabela.endereco_memoria = bloco.endereco_depois
+        self.token_atual = self.lexador.proximo_token()
+        # mesma checagem de símbolo repetido que _consumir faz depois do ';' final
+        if self.token_atual and self.token_atual.lexema == ";":
+            self._erro_sintatico("Símbolo ';' duplicado.")
+
+class CompiladorIncremental:    # Guarda os blocos das subrotinas entre compilações do mesmo programa
+    """
+    Para o editor: cada compilar(texto) re-lexa só as linhas alteradas (LexicoIncremental) e reaproveita as
+    subrotinas cujo trecho e contexto não mudaram. O .obj usa rótulos prefixados por subrotina e é equivalente
+    (não idêntico em texto) ao do compilar_fonte.
+    """
+
+    def __init__(self):
+        self.lexico = None
+        self.blocos = {}
+        self.reaproveitadas = 0     # estatísticas da última compilação
+        self.recompiladas = 0
+
+    def compilar(self, texto):
+        if self.lexico is None:
+            self.lexico = LexicoIncremental(texto)
+        else:
+            self.lexico.atualizar_texto(texto)
+        usados = {}
+        analisador = AnalisadorIncremental(self.lexico.tokens(), self.blocos, usados)
+        diagnosticos = analisador.compilar()
+        self.blocos = usados    # descarta blocos de subrotinas que não existem mais
+        self.reaproveitadas = analisador.reaproveitadas
+        self.recompiladas = analisador.recompiladas
+        return ProgramaCompilado([] if diagnosticos else analisador.gera.instructions, diagnosticos)
@@ -0,0 +1,123 @@
+# API de compilação em memória: texto-fonte -> código da MVD, sem arquivos nem subprocessos.
+# Cada chamada usa o seu próprio léxico, tabela, contador de rótulos e Gera, então várias compilações
+# podem rodar no mesmo processo (ou em threads diferentes) sem que a numeração dos rótulos vaze entre elas.
+import os
+from analisador_sintatico import AnalisadorSintatico, compilar_em_passes
+from analisador_lexical import AnalisadorLexical
+from bytecode import codificar, escrever_binario
+from core import CABECALHO_LIGADO
+from geracao_codigo import Gera
+from ligador import escrever_rotulos, ligar
+from otimizador import LIMITE_EXPANSAO, otimizar_gera, superinstrucoes_gera
+
+class OpcoesCompilacao:     # Opções que mudam o código gerado (fazem parte da identidade da compilação)
+    __slots__ = ("arvore", "otimizar", "ligar", "superinstrucoes", "curto_circuito", "limite_expansao")
+
+    def __init__(self, arvore=False, otimizar=False, ligar=False, superinstrucoes=False, curto_circuito=False,
+                 limite_expansao=LIMITE_EXPANSAO):
+        self.arvore = arvore    # True: compila em passes sobre a árvore em vez do passo único
+        self.otimizar = otimizar    # True: passa o código pelo otimizador peephole (otimizador.py)
+        self.ligar = ligar      # True: .obj ligado, com saltos em índices absolutos e sem rótulos (ligador.py)
+        self.superinstrucoes = superinstrucoes  # True: usa LDVV, INCV, CMEJF, ... (só a MVD nova executa)
+        self.curto_circuito = curto_circuito    # True: 'e'/'ou' de se/enquanto só avaliam o lado direito se preciso
+        self.limite_expansao = limite_expansao  # com otimizar: tamanho máximo das subrotinas expandidas (0 desliga)
+
+    def como_dict(self):
+        return {nome: getattr(self, nome) for nome in self.__slots__}
+
+    def __repr__(self):
+        return f"OpcoesCompilacao({', '.join(f'{k}={v!r}' for k, v in self.como_dict().items())})"
+
+class ProgramaCompilado:    # Resultado de uma compilação: instruções da MVD e diagnósticos
+    __slots__ = ("instrucoes", "diagnosticos", "rotulos")
+
+    def __init__(self, instrucoes, diagnosticos, rotulos=None):
+        self.instrucoes = instrucoes        # linhas do .obj (vazia quando há diagnósticos)
+        self.diagnosticos = diagnosticos    # lista de diagnosticos.Diagnostico
+        self.rotulos = rotulos              # {índice: rótulo} de um .obj ligado; None no formato com rótulos
+
+    @property
+    def ok(self):
+        return not self.diagnosticos
+
+    @property
+    def quantidade_instrucoes(self):    # Instruções da MVD, sem o cabeçalho do .obj ligado
+        return len(self.instrucoes) - (self.instrucoes[:1] == [CABECALHO_LIGADO])
+
+    def texto(self):    # Conteúdo do .obj
+        return "".join(instrucao + "\n" for instrucao in self.instrucoes)
+
+    def escreve(self, caminho):     # Grava o .obj (só faz sentido quando a compilação não teve erros)
+        pasta = os.path.dirname(caminho)
+        if pasta:
+            os.makedirs(pasta, exist_ok=True)
+        with open(caminho, "w") as f:
+            f.write(self.texto())
+        if self.rotulos is not None:
+            escrever_rotulos(caminho, self.rotulos)
+
+    def escreve_binario(self, caminho):     # Grava o programa no formato binário (.mvdb) e a tabela .rot
+        gera = Gera()
+        gera.acrescenta(self.instrucoes)
+        dados, rotulos = codificar(gera)
+        escrever_binario(caminho, dados, rotulos or self.rotulos)
+
+def compilar_fonte(texto, opcoes=None, cache=None, estatisticas=None):     # Compila o texto-fonte em memória
+    """
+    Devolve um ProgramaCompilado; erros vêm em .diagnosticos e nunca como exceção.
+    Com um cache_compilacao.CacheCompilacao, um acerto devolve o código guardado sem compilar.
+    Com um estatisticas.Estatisticas, acumula nele os tempos por fase e os contadores.
+    O cache guarda o código antes da ligação; ligar é barato e refaz a tabela de rótulos.
+    As linhas do .obj são montadas dos registros do Gera só para o resultado (e para o cache, antes da ligação).
+    """
+    opcoes = opcoes or OpcoesCompilacao()
+    if cache is not None:
+        chave = cache.chave(texto, opcoes)
+        instrucoes = cache.buscar(chave)
+        if instrucoes is not None:
+            if not opcoes.ligar:
+                return ProgramaCompilado(instrucoes, [])
+            gera = Gera()
+            gera.acrescenta(instrucoes)
+            return _resultado(gera, [], opcoes, estatisticas)
+
+    gera = Gera()
+    if opcoes.arvore:
+        diagnosticos = compilar_em_passes(AnalisadorLexical.de_texto(texto), gera, estatisticas, opcoes.curto_circuito)
+    else:
+        analisador = AnalisadorSintatico.de_texto(texto, gera)
+        analisador.curto_circuito = opcoes.curto_circuito
+        if estatisticas:
+            estatisticas.instrumentar_sintatico(analisador)
+        diagnosticos = analisador.compilar()
+        if estatisticas:
+            estatisticas.finalizar(gera)
+    if opcoes.otimizar and not diagnosticos:
+        otimizar_gera(gera, estatisticas, opcoes.limite_expansao)
+    if opcoes.superinstrucoes and not diagnosticos:
+        superinstrucoes_gera(gera, estatisticas)
+    if cache is not None and not diagnosticos:
+        instrucoes = gera.instructions
+        cache.guardar(chave, instrucoes)
+        if not opcoes.ligar:
+            return ProgramaCompilado(instrucoes, [])
+    return _resultado(gera, diagnosticos, opcoes, estatisticas)
+
+def _resultado(gera, diagnosticos, opcoes, estatisticas):    # ProgramaCompilado com o código do Gera, ligado se as opções pedirem
+    if diagnosticos:
+        return ProgramaCompilado([], diagnosticos)
+    rotulos = None
+    if opcoes.ligar:
+        rotulos = (estatisticas.medir("ligacao", ligar) if estatisticas else ligar)(gera)
+    return ProgramaCompilado(gera.instructions, diagnosticos, rotulos)
+
+def compilar_arquivo(caminho, opcoes=None, cache=None):     # Lê um .txt e grava o .obj ao lado dele se não houve erros
+    with open(caminho, "r") as arquivo:
+        programa = compilar_fonte(arquivo.read(), opcoes, cache)
+    if programa.ok:
+        programa.escreve(os.path.splitext(caminho)[0] + ".obj")
+    return programa
+
+# Nomes da API pedidos pelos serviços externos
+compile_source = compilar_fonte
+CompiledProgram = ProgramaCompilado
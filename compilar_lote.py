@@ -0,0 +1,111 @@
+# Compila diretórios inteiros de programas .txt distribuindo os arquivos entre vários processos.
+# Cada arquivo vira uma linha JSON na saída padrão assim que termina; o resumo vai para a saída de erro.
+import argparse
+import json
+import multiprocessing
+import os
+import sys
+import time
+from cache_compilacao import CacheCompilacao
+from compilador import compilar_fonte, OpcoesCompilacao
+from otimizador import LIMITE_EXPANSAO
+
+def listar_fontes(caminhos):    # Expande diretórios (recursivamente) em arquivos .txt, em ordem estável
+    fontes = []
+    for caminho in caminhos:
+        if os.path.isdir(caminho):
+            for pasta, subpastas, arquivos in os.walk(caminho):
+                subpastas.sort()
+                fontes.extend(os.path.join(pasta, nome) for nome in sorted(arquivos) if nome.endswith(".txt"))
+        else:
+            fontes.append(caminho)
+    return fontes
+
+def compilar_um(tarefa):    # Executado nos processos filhos: compila um arquivo e devolve o registro do resultado
+    caminho, opcoes, gravar, cache, binario = tarefa
+    inicio = time.perf_counter()
+    try:
+        with open(caminho, "r") as arquivo:
+            texto = arquivo.read()
+    except OSError as e:
+        return {"arquivo": caminho, "ok": False, "diagnosticos": [{"linha": None, "coluna": None, "fase": "arquivo",
+                "mensagem": str(e)}], "segundos": 0.0, "instrucoes": 0, "bytes": 0, "cache": False}
+    acertos = cache.acertos if cache is not None else 0
+    programa = compilar_fonte(texto, opcoes, cache)
+    diagnosticos = [d.como_dict() for d in programa.diagnosticos]
+    if programa.ok and gravar and binario:
+        try:
+            programa.escreve_binario(os.path.splitext(caminho)[0] + ".mvdb")
+        except ValueError as e:     # argumento que não cabe no formato binário
+            diagnosticos.append({"linha": None, "coluna": None, "fase": "binario", "mensagem": str(e)})
+    elif programa.ok and gravar:
+        programa.escreve(os.path.splitext(caminho)[0] + ".obj")
+    return {
+        "arquivo": caminho,
+        "ok": not diagnosticos,
+        "diagnosticos": diagnosticos,
+        "segundos": round(time.perf_counter() - inicio, 6),
+        "instrucoes": programa.quantidade_instrucoes,
+        "bytes": len(texto),
+        "cache": cache is not None and cache.acertos > acertos,
+    }
+
+def compilar_lote(fontes, opcoes=None, processos=None, gravar=True, cache=None, binario=False):  # Gera os resultados conforme ficam prontos
+    """
+    Com processos=1 compila no processo atual; caso contrário usa um pool (padrão: um processo por núcleo).
+    Com binario=True grava .mvdb (bytecode.py) em vez de .obj.
+    """
+    tarefas = [(caminho, opcoes, gravar, cache, binario) for caminho in fontes]
+    processos = processos or os.cpu_count() or 1
+    if processos == 1 or len(tarefas) <= 1:
+        yield from map(compilar_um, tarefas)
+        return
+    # Lotes pequenos por envio amortizam a comunicação sem deixar processos ociosos no fim
+    pedaco = max(1, min(64, len(tarefas) // (processos * 8)))
+    with multiprocessing.Pool(processos) as pool:
+        yield from pool.imap_unordered(compilar_um, tarefas, chunksize=pedaco)
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Compila vários programas .txt em paralelo (resultados em JSON lines).")
+    parser.add_argument("caminhos", nargs="+", help="arquivos .txt ou diretórios (percorridos recursivamente)")
+    parser.add_argument("-j", "--processos", type=int, default=None, help="quantidade de processos (padrão: núcleos da máquina)")
+    parser.add_argument("--arvore", action="store_true", help="compila em passes separados sobre a árvore")
+    parser.add_argument("-O", "--otimizar", action="store_true", help="passa o código pelo otimizador peephole")
+    parser.add_argument("--limite-expansao", type=int, default=LIMITE_EXPANSAO,
+                        help="com -O: expande subrotinas folha de até N instruções no lugar das chamadas (0 desliga)")
+    parser.add_argument("--curto-circuito", action="store_true", help="'e'/'ou' de se/enquanto com curto-circuito")
+    parser.add_argument("--superinstrucoes", action="store_true", help="usa as superinstruções da MVD (LDVV, INCV, ...)")
+    parser.add_argument("--ligar", action="store_true", help="grava .obj ligados (saltos em índices, rótulos no .rot)")
+    parser.add_argument("--binario", action="store_true", help="grava .mvdb (formato binário) em vez de .obj")
+    parser.add_argument("--sem-obj", action="store_true", help="não grava os .obj (só compila e reporta)")
+    parser.add_argument("--cache", help="pasta do cache de .obj (reaproveita compilações de fontes já vistas)")
+    parser.add_argument("--cache-limite-mb", type=float, default=64.0, help="tamanho máximo do cache (MB)")
+    args = parser.parse_args(argv)
+
+    fontes = listar_fontes(args.caminhos)
+    opcoes = OpcoesCompilacao(arvore=args.arvore, otimizar=args.otimizar, ligar=args.ligar,
+                               superinstrucoes=args.superinstrucoes, curto_circuito=args.curto_circuito,
+                               limite_expansao=args.limite_expansao)
+    processos = args.processos or os.cpu_count() or 1
+    cache = CacheCompilacao(args.cache, int(args.cache_limite_mb * 1024 * 1024)) if args.cache else None
+
+    inicio = time.perf_counter()
+    total = falhas = instrucoes = tamanho = acertos = 0
+    for resultado in compilar_lote(fontes, opcoes, processos, gravar=not args.sem_obj, cache=cache,
+                                   binario=args.binario):
+        print(json.dumps(resultado, ensure_ascii=False), flush=True)
+        total += 1
+        falhas += not resultado["ok"]
+        instrucoes += resultado["instrucoes"]
+        tamanho += resultado["bytes"]
+        acertos += resultado["cache"]
+    duracao = time.perf_counter() - inicio
+
+    por_segundo = total / duracao if duracao else 0.0
+    print(f"{total} arquivos ({total - falhas} ok, {falhas} com erros) em {duracao:.3f}s com {processos} processos: "
+          f"{por_segundo:.1f} arquivos/s, {tamanho / 1e6 / duracao if duracao else 0.0:.3f} MB/s, "
+          f"{instrucoes} instruções geradas" + (f", {acertos} acertos no cache" if cache else ""), file=sys.stderr)
+    return 1 if falhas else 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,3 +1,68 @@
+import mmap
+import os
+import struct
+import sys
+
+# Primeira linha de um .obj ligado: sem rótulos, saltos e CALL já com o índice absoluto da instrução destino.
+# Para os carregadores antigos é só um comentário (e os índices numéricos continuam válidos como argumentos).
+CABECALHO_LIGADO = "; MVD ligado"
+
+# Formato binário (.mvdb), little-endian:
+#   cabeçalho CABECALHO_BINARIO: mágico, versão, quantidade n de instruções
+#   n bytes com o código de cada instrução (índice em OPCODES), completados com zeros até múltiplo de 4
+#   n int64 com o primeiro argumento e n int64 com o segundo (0 quando a instrução não tem o argumento)
+# A versão 1 tinha argumentos int32 e continua sendo lida.
+MAGICO_BINARIO = b"MVDB"
+VERSAO_BINARIO = 2
+ARGUMENTOS_BINARIO = {1: "i", 2: "q"}   # versão -> tipo (array/memoryview) dos argumentos
+CABECALHO_BINARIO = struct.Struct("<4sHxxI")
+# Superinstruções (opcionais, geradas com --superinstrucoes): cada uma faz o trabalho de uma sequência comum
+#   LDVV a b  = LDV a; LDV b          LDVC a k = LDV a; LDC k        ADDC k = LDC k; ADD
+#   INCV a k  = LDV a; LDC k; ADD; STR a                            CMEJF L = CME; JMPF L (idem CMA, CEQ, ...)
+DESVIOS_COMPARACAO = {"CMEJF": "CME", "CMAJF": "CMA", "CEQJF": "CEQ", "CDIFJF": "CDIF", "CMEQJF": "CMEQ", "CMAQJF": "CMAQ"}
+SUPERINSTRUCOES = ("LDVV", "LDVC", "ADDC", "INCV") + tuple(DESVIOS_COMPARACAO)
+OPCODES = ("START", "HLT", "NULL", "LDC", "LDV", "STR", "ALLOC", "DALLOC",
+           "ADD", "SUB", "MULT", "DIVI", "INV", "AND", "OR", "NEG",
+           "CME", "CMA", "CEQ", "CDIF", "CMEQ", "CMAQ",
+           "JMP", "JMPF", "CALL", "RETURN", "RD", "PRN") + SUPERINSTRUCOES
+_COMPARACOES = {
+    "CMEJF": lambda a, b: a < b, "CMAJF": lambda a, b: a > b, "CEQJF": lambda a, b: a == b,
+    "CDIFJF": lambda a, b: a != b, "CMEQJF": lambda a, b: a <= b, "CMAQJF": lambda a, b: a >= b,
+}
+SALTOS = frozenset(("JMP", "JMPF", "CALL") + tuple(DESVIOS_COMPARACAO))     # o argumento é o destino
+ARIDADE = dict.fromkeys(OPCODES, 0)     # quantos argumentos cada instrução usa
+ARIDADE.update(dict.fromkeys(("LDC", "LDV", "STR", "ADDC") + tuple(SALTOS), 1))
+ARIDADE.update(ALLOC=2, DALLOC=2, LDVV=2, LDVC=2, INCV=2)
+
+def caminho_rotulos(nome_arquivo):
+    """Tabela de rótulos (para depuração) que acompanha um programa ligado: programa.obj -> programa.rot"""
+    return os.path.splitext(nome_arquivo)[0] + ".rot"
+
+def secoes_binario(dados):
+    """
+    Divide o conteúdo de um .mvdb (bytes, mmap ou memoryview) em (códigos, arg1, arg2) sem copiar:
+    memoryviews de bytes e de int64 (int32 na versão 1). Em máquinas big-endian os argumentos são convertidos (cópia).
+    """
+    dados = memoryview(dados)
+    magico, versao, n = CABECALHO_BINARIO.unpack_from(dados)
+    if magico != MAGICO_BINARIO or versao not in ARGUMENTOS_BINARIO:
+        raise ValueError("Arquivo binário da MVD inválido ou de versão desconhecida")
+    tipo = ARGUMENTOS_BINARIO[versao]
+    tamanho = struct.calcsize(tipo) * n
+    inicio = CABECALHO_BINARIO.size
+    codigos = dados[inicio:inicio + n]
+    inicio += (n + 3) // 4 * 4
+    if len(dados) < inicio + 2 * tamanho:
+        raise ValueError("Arquivo binário da MVD truncado")
+    arg1 = dados[inicio:inicio + tamanho].cast(tipo)
+    arg2 = dados[inicio + tamanho:inicio + 2 * tamanho].cast(tipo)
+    if sys.byteorder != "little":
+        from array import array
+        arg1, arg2 = array(tipo, arg1.tobytes()), array(tipo, arg2.tobytes())
+        arg1.byteswap()
+        arg2.byteswap()
+    return codigos, arg1, arg2
+
 class MVD:
     """
     Máquina Virtual (MVD) com pilha dinâmica e mecanismo de "shadow stack".
@@ -52,7 +117,7 @@ class MVD:
         arg_str = str(arg).strip()
         if arg_str == "" or arg_str.upper() in ("NULL", "NONE", "-"): return None
         # Se for um salto e o token é um rótulo conhecido, devolve o índice
-        if mnemonico in ("JMP", "JMPF", "CALL") and arg_str in self.mapa_rotulos:
+        if mnemonico in SALTOS and arg_str in self.mapa_rotulos:
             return self.mapa_rotulos[arg_str]
         try:
             # Tenta converter para inteiro direto
@@ -69,6 +134,8 @@ class MVD:
         - Suporta rótulos colocados no início da linha (com ou sem ':').
         - Ignora linhas vazias e comentários iniciados por ';'.
         - Preenche self.P com tuplas (mnemonico, arg1, arg2) já parseadas.
+        - Arquivos ligados (CABECALHO_LIGADO na primeira linha) são lidos sem resolver rótulos.
+        - Arquivos binários (.mvdb, começam com MAGICO_BINARIO) são mapeados em memória, sem parsing por linha.
         """
         self.P = []
         self.mapa_rotulos = {}
@@ -77,14 +144,16 @@ class MVD:
         temp_label_map = {}
         
         # Conjunto de mnemonicos reconhecidos (maiúsculos)
-        MNEMONICOS = {
-            "START","HLT","NULL","LDC","LDV","STR","ALLOC","DALLOC",
-            "ADD","SUB","MULT","DIVI","INV","AND","OR","NEG",
-            "CME","CMA","CEQ","CDIF","CMEQ","CMAQ",
-            "JMP","JMPF","CALL","RETURN","RD","PRN"
-        }
+        MNEMONICOS = set(OPCODES)
         
+        with open(nome_arquivo, 'rb') as f:
+            if f.read(len(MAGICO_BINARIO)) == MAGICO_BINARIO:
+                return self._carregar_binario(f, nome_arquivo)
+
         with open(nome_arquivo, 'r') as f:
+            if f.readline().strip() == CABECALHO_LIGADO:
+                return self._carregar_ligado(f, nome_arquivo)
+            f.seek(0)
             for linha in f:
                 linha = linha.strip()
                 # Ignora comentários e linhas vazias
@@ -127,6 +196,60 @@ class MVD:
         # Marca que o programa está pronto para executar
         self.running = True
 
+    def _carregar_ligado(self, linhas, nome_arquivo):
+        """
+        Formato ligado (gerado com --ligar): uma instrução por linha, argumentos já numéricos.
+        Não há rótulos para resolver; os nomes, se existirem, vêm da tabela .rot ao lado do .obj.
+        """
+        for linha in linhas:
+            partes = linha.split()
+            if not partes: continue
+            args = [int(arg) for arg in partes[1:]] + [None, None]
+            self.P.append((partes[0], args[0], args[1]))
+
+        self._verificar_saltos()
+        self._carregar_rotulos(nome_arquivo)
+        self.running = True
+
+    def _carregar_binario(self, f, nome_arquivo):
+        """
+        Formato binário: as seções do arquivo mapeado são lidas como memoryviews e o programa é montado
+        numa só passada (zip), sem texto para quebrar nem rótulos para resolver.
+        Argumentos ausentes ficam 0 (a instrução não os usa; ver ARIDADE).
+        """
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mapa:
+            codigos, arg1, arg2 = secoes_binario(mapa)
+            try:
+                if max(codigos, default=0) >= len(OPCODES):
+                    raise ValueError(f"Código de instrução desconhecido: {max(codigos)}")
+                self.P = list(zip(map(OPCODES.__getitem__, codigos), arg1, arg2))
+            finally:
+                for secao in (codigos, arg1, arg2):
+                    if isinstance(secao, memoryview): secao.release()
+        self._verificar_saltos()
+        self._carregar_rotulos(nome_arquivo)
+        self.running = True
+
+    def _verificar_saltos(self):
+        """Programas ligados (texto ou binário) já trazem índices: só confere se caem dentro do programa."""
+        for indice, (mnemonico, arg1, _) in enumerate(self.P):
+            if mnemonico in SALTOS and not 0 <= arg1 < len(self.P):
+                raise ValueError(f"Destino de salto inválido: {arg1} (instrução {indice})")
+
+    def _carregar_rotulos(self, nome_arquivo):
+        """Lê a tabela .rot opcional (índice rótulo) para exibir os rótulos de um programa ligado."""
+        self.labels_by_index = [None] * len(self.P)
+        try:
+            with open(caminho_rotulos(nome_arquivo), 'r') as f:
+                for linha in f:
+                    partes = linha.split()
+                    if len(partes) != 2: continue
+                    indice, rotulo = int(partes[0]), partes[1]
+                    self.mapa_rotulos[rotulo] = indice
+                    if indice < len(self.P): self.labels_by_index[indice] = rotulo
+        except OSError:
+            pass    # a tabela de rótulos é opcional
+
     def _ensure_capacity(self, idx):
         """
         Garante que a memória M tenha pelo menos índice 'idx'.
@@ -244,6 +367,29 @@ class MVD:
                 addr = arg1
                 self.M[addr] = self.M[self.s]
                 self.s -= 1
+
+            # --- Superinstruções (uma instrução no lugar de uma sequência; ver SUPERINSTRUCOES) ---
+            elif instrucao == "INCV":
+                # INCV addr k : M[addr] += k (LDV addr; LDC k; ADD; STR addr)
+                self.M[arg1] += arg2
+            elif instrucao == "LDVC":
+                # LDVC addr k : empilha M[addr] e depois k
+                self.s += 2
+                self._ensure_capacity(self.s)
+                self.M[self.s - 1] = self.M[arg1]
+                self.M[self.s] = arg2
+            elif instrucao == "LDVV":
+                # LDVV a b : empilha M[a] e depois M[b]
+                self.s += 2
+                self._ensure_capacity(self.s)
+                self.M[self.s - 1] = self.M[arg1]
+                self.M[self.s] = self.M[arg2]
+            elif instrucao == "ADDC": self.M[self.s] += arg1
+            elif instrucao in DESVIOS_COMPARACAO:
+                # CMEJF addr (e as demais) : compara os dois do topo, consome ambos e pula se a comparação é falsa
+                a, b = self.M[self.s - 1], self.M[self.s]
+                self.s -= 2
+                if not _COMPARACOES[instrucao](a, b): proxima_inst = arg1
             
             elif instrucao == "HLT":
                 # Finaliza execução
@@ -0,0 +1,39 @@
+# Diagnósticos estruturados da compilação: cada erro vira um registro (linha, coluna, fase, mensagem)
+# em vez de um print, para que uma compilação reporte todos os erros e ferramentas possam consumi-los.
+
+LEXICO = "lexico"
+SINTATICO = "sintatico"
+SEMANTICO = "semantico"
+
+_TITULOS = {LEXICO: "Erro Léxico", SINTATICO: "Erro Sintático", SEMANTICO: "Erro Semântico"}
+
+class Diagnostico:  # Um erro encontrado na compilação
+    __slots__ = ("linha", "coluna", "fase", "mensagem")
+
+    def __init__(self, fase, mensagem, linha=None, coluna=None):
+        self.fase = fase
+        self.mensagem = mensagem
+        self.linha = linha
+        self.coluna = coluna
+
+    @classmethod
+    def no_token(cls, fase, mensagem, token):   # Posiciona o diagnóstico no token (ou sem posição, no fim do arquivo)
+        if token is None:
+            return cls(fase, mensagem)
+        return cls(fase, mensagem, token.linha, token.coluna)
+
+    def __str__(self):  # Formato mostrado ao usuário (e procurado pela interface): "Erro Sintático na linha 3: ..."
+        if self.linha is None:
+            return f"{_TITULOS[self.fase]}: {self.mensagem}"
+        return f"{_TITULOS[self.fase]} na linha {self.linha}: {self.mensagem}"
+
+    def __repr__(self):
+        return f"Diagnostico({self.fase!r}, {self.mensagem!r}, linha={self.linha}, coluna={self.coluna})"
+
+    def como_dict(self):    # Forma serializável em JSON
+        return {"linha": self.linha, "coluna": self.coluna, "fase": self.fase, "mensagem": self.mensagem}
+
+class ErroCompilacao(Exception):    # Interrompe um passo levando o diagnóstico que o causou
+    def __init__(self, diagnostico):
+        super().__init__(str(diagnostico))
+        self.diagnostico = diagnostico
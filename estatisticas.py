@@ -0,0 +1,123 @@
+# Tempos por fase e contadores da compilação (--time-passes / --stats).
+# A medição é feita embrulhando os métodos das instâncias de uma compilação, então o compilador não paga
+# nada quando as estatísticas não foram pedidas.
+import json
+import os
+from time import perf_counter
+
+class Estatisticas:
+    """
+    Cada fase acumula tempo próprio (o tempo das fases chamadas dentro dela é descontado — o léxico roda
+    sob demanda dentro do sintático, por exemplo) e quantidade de chamadas.
+    """
+
+    def __init__(self):
+        self.tempos = {}        # fase -> segundos (tempo próprio)
+        self.chamadas = {}      # fase -> quantidade de chamadas
+        self.contadores = {"tokens": 0, "buscas_simbolos": 0, "escopos": 0, "instrucoes": 0, "bytes_escritos": 0}
+        self.otimizacoes = {}   # regra do peephole -> {"aplicacoes": n, "removidas": n}
+        self.subrotinas_removidas = []  # subrotinas nunca chamadas tiradas pelo otimizador
+        self._pilha = []        # tempo gasto nas fases internas de cada medição em andamento
+
+    def medir(self, fase, funcao, contador=None):   # Embrulha a função medindo o tempo próprio da fase
+        self.tempos.setdefault(fase, 0.0)
+        self.chamadas.setdefault(fase, 0)
+        pilha = self._pilha
+
+        def medida(*args, **kwargs):
+            inicio = perf_counter()
+            pilha.append(0.0)
+            try:
+                resultado = funcao(*args, **kwargs)
+            finally:
+                total = perf_counter() - inicio
+                self.tempos[fase] += total - pilha.pop()
+                self.chamadas[fase] += 1
+                if pilha:
+                    pilha[-1] += total
+            if contador is not None and resultado is not None:
+                self.contadores[contador] += 1
+            return resultado
+        return medida
+
+    def _instrumentar(self, objeto, metodo, fase, contador=None):
+        setattr(objeto, metodo, self.medir(fase, getattr(objeto, metodo), contador))
+
+    def instrumentar_lexico(self, lexador):
+        self._instrumentar(lexador, "proximo_token", "lexico", "tokens")
+
+    def instrumentar_tabela(self, tabela):
+        buscar, entrar = tabela.buscar_simbolo, tabela.entrar_escopo
+
+        def buscar_simbolo(nome):   # conta também as buscas que falham (nome não declarado)
+            self.contadores["buscas_simbolos"] += 1
+            return buscar(nome)
+
+        def entrar_escopo():
+            self.contadores["escopos"] += 1
+            return entrar()
+
+        tabela.buscar_simbolo = self.medir("tabela_simbolos", buscar_simbolo)
+        tabela.entrar_escopo = self.medir("tabela_simbolos", entrar_escopo)
+        self._instrumentar(tabela, "adicionar_simbolo", "tabela_simbolos")
+        self._instrumentar(tabela, "sair_escopo", "tabela_simbolos")
+
+    def instrumentar_gera(self, gera):  # Escrita do .obj (tempo e bytes)
+        escreve = gera.escreve
+        def escreve_contando():
+            escreve()
+            self.contadores["bytes_escritos"] += os.path.getsize(gera.filename)
+        gera.escreve = self.medir("escrita", escreve_contando)
+
+    def instrumentar_sintatico(self, analisador):   # Modo de passo único: parsing, expressões, tabela, léxico e escrita
+        self.instrumentar_lexico(analisador.lexador)
+        self.instrumentar_tabela(analisador.tabela)
+        self.instrumentar_gera(analisador.gera)
+        self._instrumentar(analisador, "_expressao", "expressoes")
+        self._instrumentar(analisador, "compilar", "sintatico")
+
+    def registrar_otimizacao(self, relatorio, subrotinas_removidas=()):  # Soma o relatório de um OtimizadorPeephole
+        self.subrotinas_removidas.extend(subrotinas_removidas)
+        for regra, contagem in relatorio.items():
+            total = self.otimizacoes.setdefault(regra, {"aplicacoes": 0, "removidas": 0})
+            total["aplicacoes"] += contagem["aplicacoes"]
+            total["removidas"] += contagem["removidas"]
+
+    def finalizar(self, gera):  # Contadores lidos do resultado
+        self.contadores["instrucoes"] += len(gera)
+
+    @property
+    def total(self):
+        return sum(self.tempos.values())
+
+    def como_dict(self):
+        dados = {
+            "total_segundos": round(self.total, 6),
+            "fases": {fase: {"segundos": round(self.tempos[fase], 6), "chamadas": self.chamadas[fase]}
+                      for fase in self.tempos},
+            "contadores": dict(self.contadores),
+        }
+        if self.otimizacoes:
+            dados["otimizacoes"] = {regra: dict(contagem) for regra, contagem in self.otimizacoes.items()}
+            dados["subrotinas_removidas"] = list(self.subrotinas_removidas)
+        return dados
+
+    def como_json(self):
+        return json.dumps(self.como_dict(), ensure_ascii=False, indent=2)
+
+    def como_texto(self):   # Tabela no estilo de -time-passes
+        total = self.total or 1e-12
+        linhas = [f"{'Fase':<18}{'Tempo (s)':>12}{'%':>8}{'Chamadas':>11}"]
+        for fase in sorted(self.tempos, key=self.tempos.get, reverse=True):
+            linhas.append(f"{fase:<18}{self.tempos[fase]:>12.6f}{100 * self.tempos[fase] / total:>7.1f}%"
+                          f"{self.chamadas[fase]:>11}")
+        linhas.append(f"{'total':<18}{self.total:>12.6f}{100.0:>7.1f}%")
+        linhas.append("")
+        linhas.extend(f"{nome:<18}{valor:>12}" for nome, valor in self.contadores.items())
+        if self.otimizacoes:
+            linhas.append("")
+            linhas.append(f"{'Regra (peephole)':<26}{'Aplicações':>12}{'Removidas':>11}")
+            linhas.extend(f"{regra:<26}{c['aplicacoes']:>12}{c['removidas']:>11}" for regra, c in self.otimizacoes.items())
+        if self.subrotinas_removidas:
+            linhas.append(f"Subrotinas nunca chamadas (removidas): {', '.join(self.subrotinas_removidas)}")
+        return "\n".join(linhas)
@@ -1,9 +1,45 @@
 # file to create code generation logic
 import os
+from array import array
+from itertools import islice
+from arvore_sintatica import (pos_ordem, Atribuicao, ChamadaProcedimento, Composto, Enquanto, Escreva,
+                              Identificador, Leia, Se, Numero, Booleano, Binario)
+from core import ARIDADE, CABECALHO_LIGADO, OPCODES, SALTOS
+
+_OPCODE = {nome: codigo for codigo, nome in enumerate(OPCODES)}
+_SEM_ROTULO = -1
+_LIMITE_ARRAY = 2 ** 63     # argumentos de array("q"); constantes maiores passam os argumentos para listas
+_FORMATOS = [(nome, ARIDADE[nome], nome in SALTOS) for nome in OPCODES]    # opcode -> (mnemônico, aridade, salto?)
+
+class Rotulo:   # Gera rótulos únicos para desvios (L1, L2, ...); cada compilação tem o seu contador
+    def __init__(self, prefixo="L"):
+        self.prefixo = prefixo  # rótulos de prefixos diferentes nunca colidem (ex.: "L.soma." -> L.soma.1)
+        self.contador = 1
+
+    def __call__(self):   # Cria um novo rótulo único automaticamente
+        rotulo = f"{self.prefixo}{self.contador}"
+        self.contador += 1
+        return rotulo
+
+    def go_back_i_want_to_be_monke(self):   # Decrementa o contador para reutilizar o último rótulo gerado
+        self.contador = self.contador - 1
+
+def _inteiro(valor):    # Argumento recebido pelo Gera ("", número ou texto de número) -> int; "" = não usado
+    return 0 if valor == "" or valor is None else int(valor)
 
 class Gera:
+    """
+    Guarda o código em registros compactos, em arrays paralelos indexados pela instrução: o opcode (índice em
+    core.OPCODES), os dois argumentos inteiros e o rótulo da instrução (id na tabela de rótulos ou -1). Nos
+    saltos, o argumento é o id do rótulo de destino (no código ligado, o índice absoluto). O texto do .obj só
+    é montado na saída, uma linha por vez (linhas_obj); `instructions` monta a lista de linhas inteira a cada
+    acesso, para quem trabalha com o .obj em texto. Ligação (ligador.ligar) e formato binário (bytecode.codificar)
+    leem os registros direto.
+    """
+
     def __init__(self, filename="output.obj"):
-        self.instructions = []
+        self.limpa()
+        self.subrotinas = []    # (nome, rótulo, início, fim): fatia [início, fim) de cada subrotina emitida
         self.label_counter = 0
         # aceita caminho completo ou apenas nome; garante extensão .obj
         if not filename.endswith('.obj'):
@@ -11,16 +47,103 @@ class Gera:
         self.filename = filename
         self.indent = " " * 4  # 4 espaços de indentação
 
+    def limpa(self):    # Esvazia o código (as subrotinas registradas ficam como estão)
+        self.opcodes = array("B")
+        self.arg1 = array("q")
+        self.arg2 = array("q")
+        self.rotulos = array("i")
+        self.nomes_rotulos = []     # id -> nome do rótulo
+        self._ids_rotulos = {}      # nome -> id
+        self.ligado = False         # saltos com índices absolutos (o .obj começa com CABECALHO_LIGADO)
+
     def __call__(self, label, instr, end1, end2):
-        label = str(label)
         instr = str(instr)
-        end1 = str(end1)
-        end2 = str(end2)
-
-        if label == "":
-            self.instructions.append(f"{self.indent}{instr} {end1} {end2}")
+        if instr not in _OPCODE:
+            raise ValueError(f"Instrução desconhecida: '{instr}'")
+        opcode = _OPCODE[instr]
+        if instr in SALTOS and not self.ligado:
+            end1 = self._id_rotulo(end1)
         else:
-            self.instructions.append(f"{label}{(4 - len(label)) * ' '}{instr} {end1} {end2}")
+            end1 = _inteiro(end1)
+        end2 = _inteiro(end2)
+        if not (-_LIMITE_ARRAY <= end1 < _LIMITE_ARRAY and -_LIMITE_ARRAY <= end2 < _LIMITE_ARRAY):
+            self.arg1, self.arg2 = list(self.arg1), list(self.arg2)     # a MVD trabalha com inteiros sem limite
+        self.opcodes.append(opcode)
+        self.arg1.append(end1)
+        self.arg2.append(end2)
+        self.rotulos.append(self._id_rotulo(label))
+
+    def __len__(self):
+        return len(self.opcodes)
+
+    def _id_rotulo(self, rotulo):   # Nome do rótulo -> id na tabela ("" = sem rótulo)
+        rotulo = str(rotulo)
+        if rotulo == "":
+            return _SEM_ROTULO
+        if rotulo not in self._ids_rotulos:
+            self._ids_rotulos[rotulo] = len(self.nomes_rotulos)
+            self.nomes_rotulos.append(rotulo)
+        return self._ids_rotulos[rotulo]
+
+    def registro(self, indice):     # (rótulo ou None, mnemônico, arg1, arg2) da instrução, argumentos em texto ou None
+        nome = OPCODES[self.opcodes[indice]]
+        aridade = ARIDADE[nome]
+        rotulo = self.rotulos[indice]
+        arg1 = None
+        if aridade >= 1:
+            arg1 = self.arg1[indice]
+            if nome in SALTOS and not self.ligado:
+                arg1 = self.nomes_rotulos[arg1] if arg1 != _SEM_ROTULO else None
+            else:
+                arg1 = str(arg1)
+        return (None if rotulo == _SEM_ROTULO else self.nomes_rotulos[rotulo], nome, arg1,
+                str(self.arg2[indice]) if aridade == 2 else None)
+
+    def subrotina(self, nome, rotulo, inicio):  # Registra a subrotina emitida de inicio até aqui (rótulo ... RETURN)
+        self.subrotinas.append((nome, rotulo, inicio, len(self)))
+
+    def remenda(self, indice, instr, end1):    # Reescreve uma instrução sem rótulo já emitida (destino decidido depois)
+        self.opcodes[indice] = _OPCODE[instr]
+        self.arg1[indice] = self._id_rotulo(end1) if instr in SALTOS and not self.ligado else _inteiro(end1)
+
+    def desfaz(self, quantidade):   # Remove as últimas instruções emitidas (ex.: LDCs substituídos por uma constante dobrada)
+        inicio = len(self) - quantidade
+        for registros in (self.opcodes, self.arg1, self.arg2, self.rotulos):
+            del registros[inicio:]
+
+    def liga(self, saltos):     # Passa ao código ligado: cada (índice, destino) vira o índice absoluto do salto, sem rótulos
+        for indice, destino in saltos:
+            self.arg1[indice] = destino
+        self.rotulos = array("i", [_SEM_ROTULO]) * len(self)
+        self.nomes_rotulos = []
+        self._ids_rotulos = {}
+        self.ligado = True
+
+    def acrescenta(self, linhas):   # Emite as linhas de um .obj em texto (CABECALHO_LIGADO marca o código ligado)
+        for linha in linhas:
+            partes = linha.split()
+            if not partes:
+                continue
+            if linha.strip() == CABECALHO_LIGADO:
+                self.ligado = True
+                continue
+            rotulo = ""
+            if not linha[0].isspace():
+                rotulo, partes = partes[0], partes[1:]
+            partes += ["", ""]
+            self(rotulo, partes[0], partes[1], partes[2])
+
+    @property
+    def instructions(self):     # Linhas do .obj (montadas agora, a partir dos registros)
+        return list(linhas_obj(self))
+
+    @instructions.setter
+    def instructions(self, linhas):
+        self.limpa()
+        self.acrescenta(linhas)
+
+    def texto(self):    # Conteúdo do .obj, sem passar pelo disco
+        return "".join(linha + "\n" for linha in linhas_obj(self))
 
     def escreve(self):
         # garante que a pasta de destino exista
@@ -28,5 +151,237 @@ class Gera:
         if dirname:
             os.makedirs(dirname, exist_ok=True)
         with open(self.filename, "w") as f:
-            for instr in self.instructions:
-                f.write(instr + "\n")
\ No newline at end of file
+            f.writelines(linha + "\n" for linha in linhas_obj(self))
+
+def linhas_obj(gera, inicio=0):     # Serializa os registros do Gera em linhas do .obj, uma de cada vez
+    if gera.ligado and inicio == 0:
+        yield CABECALHO_LIGADO
+    indent, nomes = gera.indent, gera.nomes_rotulos
+    saltos_com_rotulo = not gera.ligado
+    registros = zip(gera.opcodes, gera.arg1, gera.arg2, gera.rotulos)
+    for opcode, arg1, arg2, rotulo in islice(registros, inicio, None):
+        nome, aridade, salto = _FORMATOS[opcode]
+        if aridade == 0:
+            linha = f"{nome}  "
+        elif aridade == 2:
+            linha = f"{nome} {arg1} {arg2}"
+        elif salto and saltos_com_rotulo:
+            linha = f"{nome} {nomes[arg1] if arg1 != _SEM_ROTULO else ''} "
+        else:
+            linha = f"{nome} {arg1} "
+        if rotulo == _SEM_ROTULO:
+            yield indent + linha
+        else:
+            rotulo = nomes[rotulo]
+            yield f"{rotulo}{max(1, 4 - len(rotulo)) * ' '}{linha}"
+
+def alocar_quadro(inicio, tamanho, piso, principal=False):  # Área [inicio, inicio+tamanho) do bloco -> ([(m, n) de cada ALLOC], piso depois)
+    """
+    `piso` é o menor valor possível de s ao entrar no bloco. O ALLOC m n da MVD sobe s até m + n - 1 quando a
+    pilha está abaixo disso e o DALLOC não desfaz o ajuste: numa subrotina, o RETURN leria o endereço de
+    retorno da posição errada. Por isso a área de uma subrotina é dividida em ALLOCs de até piso - inicio + 1
+    variáveis, que cabem abaixo de s; cada um empilha as cópias das suas variáveis, então o seguinte também
+    cabe. No programa principal o ajuste não faz mal (ele termina no HLT) e a área sai num ALLOC só.
+    """
+    if principal:
+        return [(inicio, tamanho)], max(piso, inicio + tamanho - 1) + tamanho
+    passo = max(1, piso - inicio + 1)
+    return [(m, min(passo, inicio + tamanho - m)) for m in range(inicio, inicio + tamanho, passo)], piso + tamanho
+
+INSTRUCOES_BINARIAS = {
+    '+': "ADD", '-': "SUB", '*': "MULT", 'div': "DIVI",
+    '<': "CME", '<=': "CMEQ", '>': "CMA", '>=': "CMAQ", '=': "CEQ", '!=': "CDIF",
+    'e': "AND", 'ou': "OR",
+}
+INSTRUCOES_UNARIAS = {'-u': "INV", 'nao': "NEG", '+u': None}
+
+# Semântica de cada instrução da MVD (core.MVD.executar_passo), usada para dobrar constantes em tempo de compilação
+_AVALIACAO = {
+    "ADD": lambda a, b: a + b, "SUB": lambda a, b: a - b, "MULT": lambda a, b: a * b,
+    "DIVI": lambda a, b: int(a / b),
+    "AND": lambda a, b: 1 if (a and b) else 0, "OR": lambda a, b: 1 if (a or b) else 0,
+    "CME": lambda a, b: 1 if a < b else 0, "CMA": lambda a, b: 1 if a > b else 0,
+    "CEQ": lambda a, b: 1 if a == b else 0, "CDIF": lambda a, b: 1 if a != b else 0,
+    "CMEQ": lambda a, b: 1 if a <= b else 0, "CMAQ": lambda a, b: 1 if a >= b else 0,
+    "INV": lambda a: -a, "NEG": lambda a: 1 - a,
+}
+
+def avaliar_constante(instrucao, *valores):     # Resultado da instrução sobre constantes, ou None se não der para dobrar
+    """Divisão por zero não é dobrada: o erro continua acontecendo na execução, como antes."""
+    if instrucao == "DIVI" and valores[1] == 0:
+        return None
+    return _AVALIACAO[instrucao](*valores)
+
+def _cadeia(expressao, operador):  # "a e b e c" -> [a, b, c]; grupos entre parênteses ficam inteiros
+    partes = []
+    while expressao.__class__ is Binario and expressao.operador == operador and not expressao.entre_parenteses:
+        partes.append(expressao.direita)
+        expressao = expressao.esquerda
+    partes.append(expressao)
+    partes.reverse()
+    return partes
+
+class GeradorArvore:    # Passo de geração do modo em passes: percorre a árvore já verificada e emite no Gera
+    """
+    Emite exatamente o mesmo código do modo de passo único (mesma ordem de rótulos, a área de variáveis de
+    cada bloco alocada por alocar_quadro), para que os dois modos possam ser comparados.
+    """
+
+    def __init__(self, gera, curto_circuito=False):
+        self.gera = gera
+        self.curto_circuito = curto_circuito    # 'e'/'ou' das condições de se/enquanto viram desvios
+        self.rotulo = Rotulo()
+        self._comandos = {
+            Atribuicao: self._atribuicao,
+            ChamadaProcedimento: self._chamada_procedimento,
+            Composto: self._composto,
+            Enquanto: self._enquanto,
+            Escreva: self._escreva,
+            Leia: self._leia,
+            Se: self._se,
+        }
+
+    def gerar(self, programa):
+        self.gera("", "START", "", "")
+        self.gera("", "ALLOC", 0, 1)
+        self._bloco(programa.bloco, self.rotulo(), 1, principal=True)    # s = 1 depois do ALLOC 0 1
+        self.gera("", "DALLOC", 0, 1)
+        self.gera("", "HLT", "", "")
+        return self.gera
+
+    def _bloco(self, bloco, rotulo_skip, piso, principal=False):   # piso: menor s possível na entrada do bloco
+        quadros = []
+        if bloco.tamanho:
+            quadros, piso = alocar_quadro(bloco.endereco, bloco.tamanho, piso, principal)
+        for inicio, tamanho in quadros:
+            self.gera("", "ALLOC", inicio, tamanho)
+
+        if bloco.subrotinas:
+            self.gera("", "JMP", rotulo_skip, "")
+            for subrotina in bloco.subrotinas:
+                subrotina.simbolo.rotulo = self.rotulo()
+                rotulo_interno = self.rotulo()
+                inicio = len(self.gera)
+                self.gera(subrotina.simbolo.rotulo, "NULL", "", "")
+                self._bloco(subrotina.bloco, rotulo_interno, piso + 1)    # + o endereço de retorno do CALL
+                self.gera("", "RETURN", "", "")
+                self.gera.subrotina(subrotina.nome, subrotina.simbolo.rotulo, inicio)
+            self.gera(rotulo_skip, "NULL", "", "")
+        else:
+            self.rotulo.go_back_i_want_to_be_monke()
+
+        self._composto(bloco.corpo)
+        for inicio, tamanho in reversed(quadros):
+            self.gera("", "DALLOC", inicio, tamanho)
+
+    def _comando(self, comando):
+        self._comandos[comando.__class__](comando)
+
+    def _composto(self, composto):
+        for comando in composto.comandos:
+            self._comando(comando)
+
+    def _atribuicao(self, atribuicao):
+        self._expressao(atribuicao.expressao)
+        simbolo = atribuicao.alvo.simbolo
+        if simbolo.tipo in ['funcao inteiro', 'funcao booleano']:
+            self.gera("", "STR", "0", "")     # retorno de função fica no endereço 0
+        else:
+            self.gera("", "STR", simbolo.memoria, "")
+
+    def _chamada_procedimento(self, chamada):
+        self.gera("", "CALL", chamada.alvo.simbolo.rotulo, "")
+
+    def _leia(self, leia):
+        self.gera("", "RD", "", "")
+        self.gera("", "STR", leia.alvo.simbolo.memoria, "")
+
+    def _escreva(self, escreva):
+        self._carrega(escreva.alvo.simbolo)
+        self.gera("", "PRN", "", "")
+
+    def _se(self, se):
+        rotulo_se = self.rotulo()
+        rotulo_pula_senao = self.rotulo()
+        self._condicao(se.condicao, rotulo_se)
+        self._comando(se.entao)
+        if se.senao is not None:
+            self.gera("", "JMP", rotulo_pula_senao, "")
+        self.gera(rotulo_se, "NULL", "", "")
+        if se.senao is not None:
+            self._comando(se.senao)
+            self.gera(rotulo_pula_senao, "NULL", "", "")
+
+    def _enquanto(self, enquanto):
+        rotulo_inicio = self.rotulo()
+        rotulo_sair = self.rotulo()
+        self.gera(rotulo_inicio, "NULL", "", "")
+        self._condicao(enquanto.condicao, rotulo_sair)
+        self._comando(enquanto.corpo)
+        self.gera("", "JMP", rotulo_inicio, "")
+        self.gera(rotulo_sair, "NULL", "", "")
+
+    def _condicao(self, condicao, rotulo_falso):    # Cai no corpo se a condição é verdadeira, senão pula para rotulo_falso
+        """Mesmo código do AnalisadorSintatico._condicao (ver lá o esquema dos desvios com curto-circuito)."""
+        if not self.curto_circuito:
+            self._expressao(condicao)
+            self.gera("", "JMPF", rotulo_falso, "")
+            return
+        termos = _cadeia(condicao, 'ou')
+        rotulo_verdade = None
+        for posicao, termo in enumerate(termos):
+            pendentes = []
+            for operando in _cadeia(termo, 'e'):
+                self._expressao(operando)
+                pendentes.append(len(self.gera))
+                self.gera("", "JMPF", "", "")
+            if posicao == len(termos) - 1:
+                for indice in pendentes:
+                    self.gera.remenda(indice, "JMPF", rotulo_falso)
+                continue
+            if rotulo_verdade is None:
+                rotulo_verdade = self.rotulo()
+            self.gera("", "JMP", rotulo_verdade, "")
+            rotulo_proximo = self.rotulo()
+            for indice in pendentes:
+                self.gera.remenda(indice, "JMPF", rotulo_proximo)
+            self.gera(rotulo_proximo, "NULL", "", "")
+        if rotulo_verdade is not None:
+            self.gera(rotulo_verdade, "NULL", "", "")
+
+    def _carrega(self, simbolo):    # Empilha o valor de uma variável ou o retorno de uma função
+        if 'funcao' in simbolo.tipo:
+            self.gera("", "CALL", simbolo.rotulo, "")
+            self.gera("", "LDV", "0", "")
+        else:
+            self.gera("", "LDV", simbolo.memoria, "")
+
+    def _expressao(self, expressao):    # Pós-ordem da árvore = a mesma pós-fixa do modo de passo único
+        constantes = []     # valor de cada operando já emitido, ou None se não for constante
+        for no in pos_ordem(expressao):
+            classe = no.__class__
+            if classe is Identificador:
+                self._carrega(no.simbolo)
+                constantes.append(None)
+            elif classe is Numero:
+                self.gera("", "LDC", no.valor, "")
+                constantes.append(no.valor)
+            elif classe is Booleano:
+                self.gera("", "LDC", 1 if no.valor else 0, "")
+                constantes.append(1 if no.valor else 0)
+            elif classe is Binario:
+                direita = constantes.pop()
+                esquerda = constantes.pop()
+                constantes.append(self._operacao(INSTRUCOES_BINARIAS[no.operador], esquerda, direita))
+            elif INSTRUCOES_UNARIAS[no.operador] is not None:
+                constantes.append(self._operacao(INSTRUCOES_UNARIAS[no.operador], constantes.pop()))
+
+    def _operacao(self, instrucao, *operandos):     # Emite a instrução, ou dobra os LDCs dos operandos num só
+        if None not in operandos:
+            valor = avaliar_constante(instrucao, *operandos)
+            if valor is not None:
+                self.gera.desfaz(len(operandos))
+                self.gera("", "LDC", valor, "")
+                return valor
+        self.gera("", instrucao, "", "")
+        return None
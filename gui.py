@@ -1,4 +1,5 @@
 from tkinter import Tk, Frame, Button, Label, Listbox, Scrollbar, Entry, messagebox, scrolledtext, filedialog, PanedWindow  # GUI toolkit padrão
+from core import ARIDADE
 
 class MVD_GUI(Tk):
     
@@ -148,7 +149,7 @@ class MVD_GUI(Tk):
     def carregar_arquivo(self):
         filepath = filedialog.askopenfilename(
             title="Selecionar Arquivo .obj",
-            filetypes=(("OBJ files", "*.obj"), ("All files", "*.*"))
+            filetypes=(("OBJ files", "*.obj"), ("MVD bytecode", "*.mvdb"), ("All files", "*.*"))
         )
         if not filepath:
             return
@@ -172,8 +173,9 @@ class MVD_GUI(Tk):
                 self.mvd.carregar_programa(self.filepath)           # Carrega novo .obj
                 
                 for i, (mnem, a1, a2) in enumerate(self.mvd.P):     # Monta listbox
-                    a1_str = str(a1) if a1 is not None else ""
-                    a2_str = str(a2) if a2 is not None else ""
+                    aridade = ARIDADE.get(mnem, 2)                   # .mvdb guarda 0 nos argumentos não usados
+                    a1_str = str(a1) if a1 is not None and aridade >= 1 else ""
+                    a2_str = str(a2) if a2 is not None and aridade == 2 else ""
                     label = None
                     if hasattr(self.mvd, "labels_by_index") and i < len(self.mvd.labels_by_index):
                         label = self.mvd.labels_by_index[i]
@@ -0,0 +1,61 @@
+# Ligação do código da MVD em tempo de compilação: os rótulos viram índices absolutos de instrução e o .obj sai
+# sem rótulos (formato ligado, marcado por CABECALHO_LIGADO). Os nomes ficam numa tabela à parte (.rot) só para
+# depuração, então a MVD carrega o programa sem resolver nada.
+import argparse
+import sys
+from core import CABECALHO_LIGADO, OPCODES, SALTOS, caminho_rotulos
+from geracao_codigo import _SEM_ROTULO, Gera
+
+_SALTOS = frozenset(OPCODES.index(nome) for nome in SALTOS)     # opcodes cujo arg1 é um rótulo
+
+def resolver_rotulos(gera):     # Registros do Gera com rótulos -> ([(índice do salto, índice do destino)], {índice: rótulo})
+    nomes = gera.nomes_rotulos
+    posicoes = [None] * len(nomes)  # id do rótulo -> índice da instrução que o define
+    rotulos = {}
+    for indice, rotulo in enumerate(gera.rotulos):
+        if rotulo != _SEM_ROTULO:
+            rotulos[indice] = nomes[rotulo]
+            posicoes[rotulo] = indice
+    saltos = []
+    for indice, (opcode, destino) in enumerate(zip(gera.opcodes, gera.arg1)):
+        if opcode in _SALTOS:
+            if destino == _SEM_ROTULO or posicoes[destino] is None:
+                nome = nomes[destino] if destino != _SEM_ROTULO else ""
+                raise ValueError(f"Rótulo '{nome}' usado em {OPCODES[opcode]} não foi definido")
+            saltos.append((indice, posicoes[destino]))
+    return saltos, rotulos
+
+def ligar(gera):    # Liga o código do Gera no lugar (saltos com índices absolutos, sem rótulos); devolve {índice: rótulo}
+    if gera.ligado:
+        return {}
+    saltos, rotulos = resolver_rotulos(gera)
+    gera.liga(saltos)
+    return rotulos
+
+def texto_rotulos(rotulos):     # Conteúdo do .rot: "índice rótulo" por linha
+    return "".join(f"{indice} {rotulo}\n" for indice, rotulo in sorted(rotulos.items()))
+
+def escrever_rotulos(caminho_obj, rotulos):     # Grava a tabela ao lado do .obj (programa.obj -> programa.rot)
+    with open(caminho_rotulos(caminho_obj), "w") as f:
+        f.write(texto_rotulos(rotulos))
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Liga um .obj da MVD (rótulos -> índices absolutos).")
+    parser.add_argument("arquivo", help="caminho do .obj com rótulos")
+    parser.add_argument("-o", "--saida", help="grava o .obj ligado neste arquivo (padrão: sobrescreve a entrada)")
+    args = parser.parse_args(argv)
+
+    with open(args.arquivo, "r") as f:
+        linhas = f.read().splitlines()
+    if linhas and linhas[0].strip() == CABECALHO_LIGADO:
+        print(f"'{args.arquivo}' já está ligado.", file=sys.stderr)
+        return 1
+    gera = Gera(filename=args.saida or args.arquivo)
+    gera.acrescenta(linhas)
+    rotulos = ligar(gera)
+    gera.escreve()
+    escrever_rotulos(gera.filename, rotulos)
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
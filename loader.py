@@ -1,3 +1,5 @@
+from core import OPCODES
+
 def load_program(file_path):
     """
     Load a program from a specified file and parse its instructions.
@@ -10,12 +12,7 @@ def load_program(file_path):
     """
     program = []                # Lista final de instruções já parseadas
     label_map = {}              # Mapa: nome_do_rotulo -> índice da instrução
-    mnemonics = {               # Conjunto de instruções válidas reconhecidas pela MVD
-        "START", "HLT", "NULL", "LDC", "LDV", "STR", "ALLOC", "DALLOC",
-        "ADD", "SUB", "MULT", "DIVI", "INV",
-        "AND", "OR", "NEG", "CME", "CMA", "CEQ", "CDIF", "CMEQ", "CMAQ",
-        "JMP", "JMPF", "CALL", "RETURN", "RD", "PRN"
-    }
+    mnemonics = set(OPCODES)    # Conjunto de instruções válidas reconhecidas pela MVD
 
     with open(file_path, 'r') as f:                     # Abre o arquivo .obj para leitura
         for line in f:                                  # Percorre cada linha
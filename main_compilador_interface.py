@@ -1,13 +1,16 @@
 import tkinter as tk
 from tkinter import filedialog, messagebox
-import subprocess
 import os
+from analisador_lexical import LexicoIncremental, Simbolo
+from compilacao_incremental import CompiladorIncremental
 
 class EditorTxt:
     def __init__(self, root):
         self.root = root
         self.root.title("Editor txt")
         self.file_path = None
+        self.lexico = LexicoIncremental()   # Tokens do texto do editor, atualizados só nas linhas editadas
+        self.compilador = CompiladorIncremental()   # Reaproveita subrotinas que não mudaram entre compilações
 
         # Barra de botões no topo
         topbar = tk.Frame(root, bg="#e0e0e0")
@@ -39,6 +42,13 @@ class EditorTxt:
         self.text.bind("<Button-1>", self.update_linenumbers)
         self.text.bind("<Configure>", self.update_linenumbers)
         self.text.bind("<FocusIn>", self.update_linenumbers)
+        self.text.tag_configure("token_invalido", underline=True, foreground="red")
+
+        # Toda edição do widget (teclado, colar, desfazer, abrir arquivo) passa por _comando_texto, que conhece
+        # o trecho alterado e re-lexa só ele, sem reler o texto inteiro a cada tecla
+        self._comando_original = self.text._w + "_original"
+        self.text.tk.call("rename", self.text._w, self._comando_original)
+        self.text.tk.createcommand(self.text._w, self._comando_texto)
 
         # Área de saída
         self.output = tk.Text(root, wrap="word", font=("Consolas", 11), height=10, bg="#f0f0f0")
@@ -68,6 +78,58 @@ class EditorTxt:
             self.root.title(f"Editor txt - {os.path.basename(caminho)}")
             self.update_linenumbers()
 
+    def _comando_texto(self, operacao, *args):  # Comando Tcl do widget de texto: executa e repassa as edições ao léxico
+        trecho = self._trecho_editado(operacao, args)
+        resultado = self.text.tk.call((self._comando_original, operacao) + args)
+        if trecho:
+            self.atualizar_lexico(*trecho)
+        elif trecho is not None or (operacao == "edit" and args[:1] in (("undo",), ("redo",))):
+            self.atualizar_lexico()
+        return resultado
+
+    def _trecho_editado(self, operacao, args):  # (inicio, fim, texto) de insert/delete/replace; () se não dá para saber
+        if operacao == "insert" and args:
+            inicio = self._posicao(args[0])
+            return inicio, inicio, "".join(args[1::2])
+        if operacao == "replace" and len(args) >= 3:
+            return self._posicao(args[0]), self._posicao(args[1]), "".join(args[2::2])
+        if operacao == "delete" and 1 <= len(args) <= 2:
+            inicio = self._posicao(args[0])
+            fim = self._posicao(args[1] if len(args) == 2 else f"{args[0]}+1c")
+            if len(args) == 2 and inicio[0] > 0 and inicio[1] == 0 and self.text.compare(args[1], ">=", "end"):
+                inicio = (inicio[0] - 1, len(self.lexico.linhas[inicio[0] - 1]))  # até "end": o Tk leva a quebra anterior
+            return (inicio, fim, "") if inicio < fim else None    # o Tk ignora intervalos vazios ou invertidos
+        return () if operacao in ("insert", "delete", "replace") else None
+
+    def _posicao(self, indice):     # Índice do Tk -> (linha, coluna) do léxico; a quebra de linha final do Tk não conta
+        indice = self.text.index(indice)
+        if self.text.compare(indice, ">", "end-1c"):
+            indice = self.text.index("end-1c")
+        linha, coluna = indice.split(".")
+        return int(linha) - 1, int(coluna)
+
+    def atualizar_lexico(self, inicio=None, fim=None, texto=""):   # Re-lexa só as linhas da edição [inicio, fim) -> texto
+        if inicio is None:
+            primeira, ultima = self.lexico.atualizar_texto(self.text.get("1.0", "end-1c"))
+        else:
+            primeira, ultima = self.lexico.editar(inicio, fim, texto)
+            if not self._lexico_em_dia(primeira, ultima):   # o Tk ajustou a edição (ex.: apagar até "end")
+                primeira, ultima = self.lexico.atualizar_texto(self.text.get("1.0", "end-1c"))
+        if primeira < ultima:
+            self.marcar_tokens_invalidos(primeira, ultima)
+
+    def _lexico_em_dia(self, primeira, ultima):     # Confere o número de linhas e as linhas re-lexadas com o widget
+        if int(self.text.index("end-1c").split(".")[0]) != len(self.lexico.linhas):
+            return False
+        return all(self.text.get(f"{i + 1}.0", f"{i + 1}.end") == self.lexico.linhas[i] for i in range(primeira, ultima))
+
+    def marcar_tokens_invalidos(self, primeira, ultima):    # Sublinha caracteres inválidos nas linhas [primeira, ultima)
+        self.text.tag_remove("token_invalido", f"{primeira + 1}.0", f"{ultima + 1}.0")
+        for i in range(primeira, ultima):
+            for token in self.lexico.tokens_da_linha(i):
+                if token.simbolo == Simbolo.SERRO:
+                    self.text.tag_add("token_invalido", f"{i + 1}.{token.coluna}", f"{i + 1}.{token.coluna + len(token.lexema)}")
+
     def salvar_arquivo(self):
         if not self.file_path:
             caminho = filedialog.asksaveasfilename(
@@ -86,11 +148,11 @@ class EditorTxt:
 
     def executar_analisador(self):
         try:
-            resultado = subprocess.run(
-                ["python3", "analisador_sintatico.py", self.file_path],
-                capture_output=True, text=True
-            )
-            saida = resultado.stdout + resultado.stderr
+            with open(self.file_path, "r") as f:
+                programa = self.compilador.compilar(f.read())  # compila no próprio processo, sem subprocess
+            if programa.ok:
+                programa.escreve(os.path.splitext(self.file_path)[0] + ".obj")
+            saida = "\n".join(str(diagnostico) for diagnostico in programa.diagnosticos)
             self.mostrar_saida(saida)
         except Exception as e:
             self.mostrar_saida(f"Erro ao executar: {e}")
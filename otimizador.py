@@ -0,0 +1,806 @@
+# Otimizador sobre as instruções da MVD já geradas (os registros do Gera ou um .obj): eliminação de subrotinas
+# nunca chamadas, expansão de subrotinas pequenas, invariantes de laço, chamadas de cauda e peephole. Cada regra
+# do peephole olha janelas pequenas do código; a tabela de regras é aplicada até nenhuma mudar mais nada.
+import argparse
+import sys
+from core import DESVIOS_COMPARACAO, SALTOS
+from geracao_codigo import Gera, avaliar_constante
+
+_FIM_DE_FLUXO = frozenset({"JMP", "RETURN", "HLT"})   # depois delas só se chega por um rótulo
+_UNARIAS = frozenset({"INV", "NEG"})
+_BINARIAS = frozenset({"ADD", "SUB", "MULT", "DIVI", "AND", "OR", "CME", "CMA", "CEQ", "CDIF", "CMEQ", "CMAQ"})
+
+class Instrucao:    # Uma linha do .obj: rótulo opcional, mnemônico e até dois argumentos
+    __slots__ = ("rotulo", "nome", "arg1", "arg2")
+
+    def __init__(self, rotulo, nome, arg1=None, arg2=None):
+        self.rotulo = rotulo
+        self.nome = nome
+        self.arg1 = arg1
+        self.arg2 = arg2
+
+    def __repr__(self):
+        return f"Instrucao({self.rotulo!r}, {self.nome!r}, {self.arg1!r}, {self.arg2!r})"
+
+def ler_instrucoes(linhas):     # Linhas no formato do Gera -> lista de Instrucao
+    codigo = []
+    for linha in linhas:
+        partes = linha.split()
+        if not partes:
+            continue
+        rotulo = None
+        if not linha[0].isspace():
+            rotulo, partes = partes[0], partes[1:]
+        partes += [None, None]
+        codigo.append(Instrucao(rotulo, partes[0], partes[1], partes[2]))
+    return codigo
+
+def escrever_instrucoes(codigo):    # Lista de Instrucao -> linhas no formato do Gera
+    gera = Gera()
+    gravar_no_gera(gera, codigo)
+    return gera.instructions
+
+def instrucoes_do_gera(gera):   # Registros do Gera -> lista de Instrucao, sem passar pelo texto do .obj
+    return [Instrucao(*gera.registro(indice)) for indice in range(len(gera))]
+
+def gravar_no_gera(gera, codigo):   # Troca o código do Gera pela lista de Instrucao
+    ligado = gera.ligado
+    gera.limpa()
+    gera.ligado = ligado
+    for instrucao in codigo:
+        gera(instrucao.rotulo or "", instrucao.nome, _texto(instrucao.arg1), _texto(instrucao.arg2))
+
+def _texto(argumento):
+    return "" if argumento is None else argumento
+
+def _resolver(apelidos, rotulo):
+    while rotulo in apelidos:
+        rotulo = apelidos[rotulo]
+    return rotulo
+
+def _compactar(codigo, remover):    # Remove os índices pedidos levando os rótulos para a próxima instrução mantida
+    """Se a próxima instrução já tem rótulo, o rótulo removido vira apelido dele e os saltos são redirecionados."""
+    novo = []
+    pendente = None
+    apelidos = {}
+    for i, instrucao in enumerate(codigo):
+        if i in remover:
+            if instrucao.rotulo is not None:
+                if pendente is None:
+                    pendente = instrucao.rotulo
+                else:
+                    apelidos[instrucao.rotulo] = pendente
+            continue
+        if pendente is not None:
+            if instrucao.rotulo is None:
+                instrucao.rotulo = pendente
+            else:
+                apelidos[pendente] = instrucao.rotulo
+            pendente = None
+        novo.append(instrucao)
+    if pendente is not None:    # rótulo no fim do código: continua marcando um NULL
+        novo.append(Instrucao(pendente, "NULL"))
+    if apelidos:
+        for instrucao in novo:
+            if instrucao.nome in SALTOS:
+                instrucao.arg1 = _resolver(apelidos, instrucao.arg1)
+    return novo
+
+def _posicoes(codigo):  # rótulo -> índice da instrução que ele marca
+    return {instrucao.rotulo: i for i, instrucao in enumerate(codigo) if instrucao.rotulo is not None}
+
+# Cada regra recebe o código e devolve (quantidade de aplicações, índices a remover)
+
+def _nulos(codigo):     # NULL não faz nada: o rótulo passa para a instrução seguinte
+    remover = {i for i, instrucao in enumerate(codigo[:-1]) if instrucao.nome == "NULL"}
+    return len(remover), remover
+
+def _encadeamento_de_saltos(codigo):    # JMP/JMPF para um rótulo que só faz outro JMP vai direto ao destino final
+    posicoes = _posicoes(codigo)
+    aplicacoes = 0
+    for instrucao in codigo:
+        if instrucao.nome not in ("JMP", "JMPF"):
+            continue
+        vistos = {instrucao.arg1}
+        destino = posicoes.get(instrucao.arg1)
+        while destino is not None and codigo[destino].nome == "JMP" and codigo[destino].arg1 not in vistos:
+            vistos.add(codigo[destino].arg1)
+            instrucao.arg1 = codigo[destino].arg1
+            destino = posicoes.get(instrucao.arg1)
+            aplicacoes += 1
+    return aplicacoes, ()
+
+def _salto_para_a_seguinte(codigo):     # JMP para a instrução logo abaixo não muda nada
+    posicoes = _posicoes(codigo)
+    remover = {i for i, instrucao in enumerate(codigo) if instrucao.nome == "JMP" and posicoes.get(instrucao.arg1) == i + 1}
+    return len(remover), remover
+
+def _rotulos_sem_uso(codigo):   # Rótulos que nenhum salto usa não marcam entrada de fluxo (e somem do .obj)
+    usados = {instrucao.arg1 for instrucao in codigo if instrucao.nome in SALTOS}
+    aplicacoes = 0
+    for instrucao in codigo:
+        if instrucao.rotulo is not None and instrucao.rotulo not in usados:
+            instrucao.rotulo = None
+            aplicacoes += 1
+    return aplicacoes, ()
+
+def _codigo_inalcancavel(codigo):   # Depois de JMP/RETURN/HLT, só se chega a uma instrução com rótulo
+    remover = set()
+    morto = False
+    for i, instrucao in enumerate(codigo):
+        if instrucao.rotulo is not None:
+            morto = False
+        elif morto:
+            remover.add(i)
+        if instrucao.nome in _FIM_DE_FLUXO:
+            morto = True
+    return len(remover), remover
+
+def _carrega_e_guarda(codigo):  # "LDV a; STR a" lê e grava o mesmo valor
+    remover = set()
+    for i in range(len(codigo) - 1):
+        carga, guarda = codigo[i], codigo[i + 1]
+        if (carga.nome == "LDV" and guarda.nome == "STR" and guarda.rotulo is None and carga.arg1 == guarda.arg1
+                and i not in remover):
+            remover.update((i, i + 1))
+    return len(remover) // 2, remover
+
+def _constantes(codigo):    # "LDC a; INV", "LDC a; LDC b; ADD", ... viram um LDC com o resultado (semântica da MVD)
+    remover = set()
+    aplicacoes = 0
+    for i, instrucao in enumerate(codigo):
+        if i in remover or instrucao.rotulo is not None:
+            continue
+        if instrucao.nome in _UNARIAS:
+            operandos = [i - 1]
+        elif instrucao.nome in _BINARIAS:
+            operandos = [i - 2, i - 1]
+        else:
+            continue
+        if operandos[0] < 0 or any(j in remover or codigo[j].nome != "LDC" for j in operandos):
+            continue
+        if any(codigo[j].rotulo is not None for j in operandos[1:]):    # um salto poderia entrar no meio
+            continue
+        valor = avaliar_constante(instrucao.nome, *(int(codigo[j].arg1) for j in operandos))
+        if valor is None:
+            continue
+        codigo[operandos[0]].arg1 = str(valor)
+        remover.update(operandos[1:])
+        remover.add(i)
+        aplicacoes += 1
+    return aplicacoes, remover
+
+REGRAS = (
+    ("nulos", _nulos),
+    ("encadeamento_de_saltos", _encadeamento_de_saltos),
+    ("salto_para_a_seguinte", _salto_para_a_seguinte),
+    ("rotulos_sem_uso", _rotulos_sem_uso),
+    ("codigo_inalcancavel", _codigo_inalcancavel),
+    ("carrega_e_guarda", _carrega_e_guarda),
+    ("constantes", _constantes),
+)
+
+def eliminar_subrotinas_mortas(gera):   # Tira do Gera as subrotinas que o programa principal nunca alcança por CALL
+    """
+    Usa Gera.subrotinas (registradas na geração) para saber a subrotina mais interna dona de cada instrução;
+    o grafo de chamadas liga o dono de cada CALL ao rótulo chamado. Devolve os nomes removidos ("p", "p.aux").
+    """
+    if not gera.subrotinas:
+        return []
+    codigo = instrucoes_do_gera(gera)
+    trechos = sorted(gera.subrotinas, key=lambda trecho: trecho[2])    # as externas começam antes das internas
+    dono = [None] * len(codigo)     # índice em trechos da subrotina mais interna; None = programa principal
+    nomes = []
+    por_rotulo = {}
+    for indice, (nome, rotulo, inicio, fim) in enumerate(trechos):
+        externa = dono[inicio]
+        nomes.append(nome if externa is None else f"{nomes[externa]}.{nome}")
+        por_rotulo[rotulo] = indice
+        dono[inicio:fim] = [indice] * (fim - inicio)
+
+    chamadas = {}   # dono -> subrotinas chamadas no seu próprio corpo
+    for i, instrucao in enumerate(codigo):
+        if instrucao.nome == "CALL" and instrucao.arg1 in por_rotulo:
+            chamadas.setdefault(dono[i], set()).add(por_rotulo[instrucao.arg1])
+    alcancadas = set()
+    pendentes = [None]
+    while pendentes:
+        for chamada in chamadas.get(pendentes.pop(), ()):
+            if chamada not in alcancadas:
+                alcancadas.add(chamada)
+                pendentes.append(chamada)
+
+    mortas = [indice for indice in range(len(trechos)) if indice not in alcancadas]
+    if not mortas:
+        return []
+    manter = [True] * len(codigo)
+    for indice in mortas:
+        _, _, inicio, fim = trechos[indice]
+        manter[inicio:fim] = [False] * (fim - inicio)
+    novo_indice = []    # posição de cada instrução (e do fim do código) depois da remoção
+    posicao = 0
+    for mantida in manter:
+        novo_indice.append(posicao)
+        posicao += mantida
+    novo_indice.append(posicao)
+    gravar_no_gera(gera, [instrucao for instrucao, mantida in zip(codigo, manter) if mantida])
+    gera.subrotinas = [(nome, rotulo, novo_indice[inicio], novo_indice[fim])
+                       for indice, (nome, rotulo, inicio, fim) in enumerate(trechos) if indice in alcancadas]
+    return [nomes[indice] for indice in mortas]
+
+def _topo(quadro):  # Último endereço do quadro (m, n) de um ALLOC
+    return int(quadro[0]) + int(quadro[1]) - 1
+
+class _MapaSubrotinas:  # Onde está cada subrotina do Gera, o quadro que ela aloca e até onde a pilha chega nela
+    """
+    O ALLOC da MVD sobe o topo da pilha (s) até o fim do quadro quando a pilha está abaixo dele, e isso depende do
+    valor de s. As trocas que tiram o endereço de retorno da pilha (chamadas de cauda, expansão em linha) e os
+    ALLOCs novos dos temporários de laço só são feitos quando o piso garante que esse ajuste não acontece.
+    Uma subrotina pode alocar a área em vários ALLOCs seguidos (geracao_codigo.alocar_quadro): o quadro é o
+    primeiro, os outros contam como ALLOCs abertos do dono, mas as variáveis de todos ficam abaixo de `livres`.
+    """
+    __slots__ = ("trechos", "dono", "por_rotulo", "externas", "quadros", "pisos", "livres", "_piso_principal",
+                 "_livre_principal")
+
+    def __init__(self, codigo, subrotinas):
+        self.trechos = sorted(subrotinas, key=lambda trecho: trecho[2])     # as externas começam antes das internas
+        self.dono = [None] * len(codigo)    # índice em trechos da subrotina mais interna; None = programa principal
+        self.por_rotulo = {}
+        self.externas = []  # subrotina em que cada uma foi declarada (None = programa principal)
+        self.quadros = []   # (m, n) do ALLOC logo depois do rótulo, ou None se a subrotina não tem variáveis
+        self.pisos = []     # menor valor possível de s entre os comandos da subrotina
+        self.livres = []    # primeiro endereço acima das variáveis que os comandos da subrotina enxergam
+        for indice, (_, rotulo, inicio, fim) in enumerate(self.trechos):
+            self.externas.append(self.dono[inicio])
+            self.por_rotulo[rotulo] = indice
+            self.dono[inicio:fim] = [indice] * (fim - inicio)
+            alocacao = codigo[inicio + 1]
+            self.quadros.append((alocacao.arg1, alocacao.arg2) if alocacao.nome == "ALLOC" else None)
+        # depois de "ALLOC m n", s >= m + 2n - 1 (o quadro e a cópia dos valores antigos ficam abaixo de s);
+        # no programa principal valem os ALLOCs logo depois do START, que duram até o HLT
+        self._piso_principal = -1
+        self._livre_principal = 0
+        for instrucao in codigo[1:]:
+            if instrucao.nome != "ALLOC":
+                break
+            self._piso_principal = max(self._piso_principal, _topo((instrucao.arg1, instrucao.arg2)) + int(instrucao.arg2))
+            self._livre_principal = max(self._livre_principal, _topo((instrucao.arg1, instrucao.arg2)) + 1)
+        for indice, quadro in enumerate(self.quadros):
+            piso = self.piso_entrada(indice)
+            self.pisos.append(max(piso, _topo(quadro) + int(quadro[1])) if quadro else piso)
+            if quadro is None:
+                self.livres.append(self.livre(self.externas[indice]))
+                continue
+            livre = _topo(quadro) + 1
+            k = self.trechos[indice][2] + 2
+            while codigo[k].nome == "ALLOC" and int(codigo[k].arg1) == livre:   # o resto da área, em seguida
+                livre += int(codigo[k].arg2)
+                k += 1
+            self.livres.append(livre)
+
+    def piso_entrada(self, indice):     # s logo depois do CALL que entra na subrotina (endereço de retorno empilhado)
+        externa = self.externas[indice]
+        return (self._piso_principal if externa is None else self.pisos[externa]) + 1
+
+    def piso(self, dono):   # s mínimo entre os comandos do dono (None = programa principal)
+        return self._piso_principal if dono is None else self.pisos[dono]
+
+    def livre(self, dono):  # Primeiro endereço acima das variáveis do dono e das subrotinas que o envolvem
+        return self._livre_principal if dono is None else self.livres[dono]
+
+    def sem_ajuste(self, piso, indice):     # O ALLOC da subrotina, executado com s >= piso, não mexe em s?
+        quadro = self.quadros[indice]
+        return quadro is None or piso >= _topo(quadro)
+
+def _continuacao(codigo, i, posicoes):  # Primeira instrução que faz algo a partir de i (pula NULL, JMP e "LDV 0; STR 0")
+    """"LDV 0; STR 0" é o "f := g" de uma função: o retorno de g já está no endereço 0. None se o fluxo entra em laço."""
+    visitados = set()
+    while i < len(codigo) and i not in visitados:
+        visitados.add(i)
+        instrucao = codigo[i]
+        if instrucao.nome == "NULL":
+            i += 1
+        elif instrucao.nome == "JMP" and instrucao.arg1 in posicoes:
+            i = posicoes[instrucao.arg1]
+        elif (instrucao.nome == "LDV" and instrucao.arg1 == "0" and i + 1 < len(codigo)
+              and codigo[i + 1].nome == "STR" and codigo[i + 1].arg1 == "0"):
+            i += 2
+        else:
+            return i
+    return None
+
+def chamadas_de_cauda(gera):    # Troca os CALL em posição de cauda por JMP; devolve o relatório por tipo de troca
+    """
+    Um CALL está em posição de cauda quando depois dele a subrotina só desaloca o quadro e retorna
+    ("CALL g; DALLOC m n; RETURN", talvez passando por NULL, JMP e "LDV 0; STR 0"). O RETURN de g volta direto
+    para quem chamou a subrotina atual, então a pilha não cresce a cada chamada:
+
+    - quadro igual ao de g (inclusive recursão direta): "JMP" para depois do ALLOC de g, que reaproveita o
+      quadro; o DALLOC de g restaura os valores salvos pelo ALLOC da subrotina atual
+    - subrotina atual sem variáveis: "JMP g" (g retorna no lugar dela)
+    - quadros diferentes: "DALLOC m n; JMP g", desde que g não seja interna da subrotina atual (uma interna
+      enxerga as variáveis dela, que precisam continuar com os valores atuais)
+
+    Nos dois últimos casos g entra com um endereço de retorno a menos na pilha; a troca só é feita se nenhum
+    ALLOC envolvido depende disso (_MapaSubrotinas) e se o piso que g supõe na entrada continua valendo (uma g
+    interna da subrotina atual conta com o endereço de retorno dela na pilha). Precisa de Gera.subrotinas, que
+    fica com as posições atualizadas.
+    """
+    relatorio = {nome: {"aplicacoes": 0, "removidas": 0} for nome in ("cauda_mesmo_quadro", "cauda_sem_quadro", "cauda_dalloc")}
+    if not gera.subrotinas:
+        return relatorio
+    codigo = instrucoes_do_gera(gera)
+    posicoes = _posicoes(codigo)
+    mapa = _MapaSubrotinas(codigo, gera.subrotinas)
+    trechos, dono, por_rotulo, quadros = mapa.trechos, mapa.dono, mapa.por_rotulo, mapa.quadros
+
+    inserir = {}    # índice do CALL -> DALLOC que entra antes do JMP
+    for i, instrucao in enumerate(codigo):
+        if instrucao.nome != "CALL" or dono[i] is None or instrucao.arg1 not in por_rotulo:
+            continue
+        atual, chamada = dono[i], por_rotulo[instrucao.arg1]
+        quadro = quadros[atual]
+        j = _continuacao(codigo, i + 1, posicoes)
+        if j is not None and quadro is not None and codigo[j].nome == "DALLOC" and (codigo[j].arg1, codigo[j].arg2) == quadro:
+            j = _continuacao(codigo, j + 1, posicoes)
+        if j is None or codigo[j].nome != "RETURN" or dono[j] != atual:
+            continue
+        _, rotulo, inicio, fim = trechos[chamada]
+        entrada = mapa.piso_entrada(atual)  # s no salto, com o quadro da atual já desalocado
+        if quadro is not None and quadro == quadros[chamada]:
+            corpo = codigo[inicio + 2]
+            if corpo.rotulo is None:
+                corpo.rotulo = f"{rotulo}.corpo"
+                posicoes[corpo.rotulo] = inicio + 2
+            instrucao.nome, instrucao.arg1 = "JMP", corpo.rotulo
+            relatorio["cauda_mesmo_quadro"]["aplicacoes"] += 1
+        elif not mapa.sem_ajuste(entrada, chamada) or mapa.piso_entrada(chamada) > entrada:
+            continue
+        elif quadro is None:
+            instrucao.nome = "JMP"
+            relatorio["cauda_sem_quadro"]["aplicacoes"] += 1
+        elif mapa.sem_ajuste(entrada, atual) and not trechos[atual][2] <= inicio < trechos[atual][3]:
+            inserir[i] = Instrucao(None, "DALLOC", *quadro)
+            instrucao.nome = "JMP"
+            relatorio["cauda_dalloc"]["aplicacoes"] += 1
+            relatorio["cauda_dalloc"]["removidas"] -= 1
+
+    if inserir:
+        novo = []
+        novo_indice = []    # posição de cada instrução (e do fim do código) depois das inserções
+        for i, instrucao in enumerate(codigo):
+            novo_indice.append(len(novo))
+            if i in inserir:    # o DALLOC fica com o rótulo do CALL, se houver
+                inserir[i].rotulo, instrucao.rotulo = instrucao.rotulo, None
+                novo.append(inserir[i])
+            novo.append(instrucao)
+        novo_indice.append(len(novo))
+        codigo = novo
+        gera.subrotinas = [(nome, rotulo, novo_indice[inicio], novo_indice[fim])
+                           for nome, rotulo, inicio, fim in gera.subrotinas]
+    if any(contagem["aplicacoes"] for contagem in relatorio.values()):
+        gravar_no_gera(gera, codigo)
+    return relatorio
+
+LIMITE_EXPANSAO = 8     # tamanho máximo do corpo (instruções, sem NULL e sem o ALLOC/DALLOC do quadro) para expandir
+
+def _copia_expansivel(codigo, mapa, indice, limite):    # Trecho "ALLOC ... DALLOC" que substitui o CALL, ou None
+    _, _, inicio, fim = mapa.trechos[indice]
+    copia = codigo[inicio + 1:fim - 1]  # sem o NULL do rótulo da subrotina e sem o RETURN
+    if codigo[fim - 1].nome != "RETURN" or any(instrucao.nome in ("CALL", "RETURN") for instrucao in copia):
+        return None     # chama outra subrotina (ou a si mesma) ou tem subrotinas internas
+    definidos = {instrucao.rotulo for instrucao in copia if instrucao.rotulo is not None}
+    if any(instrucao.nome in SALTOS and instrucao.arg1 not in definidos for instrucao in copia):
+        return None
+    tamanho = sum(instrucao.nome != "NULL" for instrucao in copia) - (2 if mapa.quadros[indice] else 0)
+    return copia if tamanho <= limite else None
+
+def expandir_subrotinas(gera, limite=LIMITE_EXPANSAO):  # Troca o CALL de subrotinas pequenas pelo corpo delas; devolve o relatório
+    """
+    Só subrotinas folha (sem CALL) com corpo de até `limite` instruções: a cópia leva o ALLOC/DALLOC do quadro,
+    então as variáveis continuam salvas e restauradas como na chamada, e some só o CALL/RETURN. Os rótulos da
+    cópia ganham o sufixo ".n" da expansão, para não repetir os da subrotina nem os de outras cópias. Uma
+    subrotina que só chamava folhas vira folha depois da rodada e pode ser expandida na seguinte.
+
+    Sem o endereço de retorno a pilha fica uma posição mais baixa no ALLOC da cópia, por isso a expansão só é
+    feita onde o piso da pilha (_MapaSubrotinas) garante que o ALLOC não a ajusta. No fim, as subrotinas que
+    ficaram sem nenhuma chamada saem do código. Precisa de Gera.subrotinas, que fica com as posições atualizadas.
+    """
+    relatorio = {"expansao_em_linha": {"aplicacoes": 0, "removidas": 0}}
+    contagem = relatorio["expansao_em_linha"]
+    if not gera.subrotinas or limite <= 0:
+        return relatorio
+    codigo = instrucoes_do_gera(gera)
+    while True:
+        mapa = _MapaSubrotinas(codigo, gera.subrotinas)
+        copias = {}     # rótulo da subrotina -> (índice em trechos, instruções a copiar)
+        for indice, (_, rotulo, _, _) in enumerate(mapa.trechos):
+            copia = _copia_expansivel(codigo, mapa, indice, limite)
+            if copia is not None:
+                copias[rotulo] = (indice, copia)
+        novo = []
+        novo_indice = []    # posição de cada instrução (e do fim do código) depois das expansões
+        expandidas = contagem["aplicacoes"]
+        for i, instrucao in enumerate(codigo):
+            novo_indice.append(len(novo))
+            chamada = copias.get(instrucao.arg1) if instrucao.nome == "CALL" else None
+            dono = mapa.dono[i]
+            if chamada is None or not mapa.sem_ajuste(mapa.piso(dono), chamada[0]):
+                novo.append(instrucao)
+                continue
+            contagem["aplicacoes"] += 1
+            sufixo = f".{contagem['aplicacoes']}"
+            # o rótulo do CALL fica num NULL; logo depois do rótulo da subrotina, o NULL também evita que o ALLOC
+            # da cópia pareça ser o quadro dela
+            if instrucao.rotulo is not None or (dono is not None and mapa.trechos[dono][2] + 1 == i):
+                novo.append(Instrucao(instrucao.rotulo, "NULL"))
+            novo.extend(Instrucao(None if copiada.rotulo is None else copiada.rotulo + sufixo, copiada.nome,
+                                  copiada.arg1 + sufixo if copiada.nome in SALTOS else copiada.arg1, copiada.arg2)
+                        for copiada in chamada[1])
+            contagem["removidas"] -= len(novo) - novo_indice[-1] - 1
+        if contagem["aplicacoes"] == expandidas:
+            break
+        novo_indice.append(len(novo))
+        codigo = novo
+        gera.subrotinas = [(nome, rotulo, novo_indice[inicio], novo_indice[fim])
+                           for nome, rotulo, inicio, fim in gera.subrotinas]
+    if contagem["aplicacoes"]:
+        gravar_no_gera(gera, codigo)
+        antes = len(gera)
+        eliminar_subrotinas_mortas(gera)    # as que só eram chamadas nos pontos expandidos
+        contagem["removidas"] += antes - len(gera)
+    return relatorio
+
+_PURAS = (_BINARIAS - {"DIVI"}) | _UNARIAS    # operações que nunca falham (DIVI pode dividir por zero)
+_CONSUMIDORAS = frozenset({"STR", "JMPF", "PRN"})   # tiram um valor da pilha e não empilham nada
+
+def _gravados_por_subrotina(codigo, mapa):  # Endereços que cada subrotina (com as que ela chama) pode deixar alterados
+    """O quadro da própria subrotina não conta: o DALLOC dela restaura os valores antes do RETURN."""
+    proprios = [set() for _ in mapa.trechos]
+    chamadas = [set() for _ in mapa.trechos]
+    for i, instrucao in enumerate(codigo):
+        dono = mapa.dono[i]
+        if dono is None:
+            continue
+        if instrucao.nome == "STR":
+            proprios[dono].add(int(instrucao.arg1))
+        elif instrucao.nome == "CALL":
+            chamadas[dono].add(mapa.por_rotulo[instrucao.arg1])
+    gravados = [set() for _ in mapa.trechos]
+    mudou = True
+    while mudou:    # recursão direta ou mútua: repete até nenhum conjunto crescer
+        mudou = False
+        for indice, quadro in enumerate(mapa.quadros):
+            novos = set(proprios[indice]).union(*(gravados[chamada] for chamada in chamadas[indice]))
+            if quadro is not None:
+                novos.difference_update(range(int(quadro[0]), _topo(quadro) + 1))
+            if novos != gravados[indice]:
+                gravados[indice] = novos
+                mudou = True
+    return gravados
+
+def _guardar(achadas, codigo, operando):    # Registra o operando (início, fim, invariante, com operação) se valer a pena
+    inicio, fim, invariante, operacao = operando
+    if not (invariante and operacao):
+        return
+    trecho = codigo[inicio:fim]
+    if any(instrucao.rotulo is not None or instrucao.nome not in _PURAS and instrucao.nome not in ("LDC", "LDV")
+           for instrucao in trecho):
+        return      # um CALL no meio (função que não grava o retorno) ou um rótulo
+    achadas.setdefault(tuple((instrucao.nome, instrucao.arg1, instrucao.arg2) for instrucao in trecho), []).append((inicio, fim))
+
+def _subexpressoes_invariantes(codigo, inicio, fim, alterados):     # {instruções: [(início, fim)]} das partes que não mudam
+    """
+    Percorre o código pós-fixo de [inicio, fim) com uma pilha de operandos: um operando é invariante se só lê
+    constantes e endereços fora de `alterados` com operações puras. Ficam as maiores subexpressões invariantes
+    com pelo menos uma operação, as que são consumidas por uma operação que não é invariante ou por
+    STR/JMPF/PRN. Um rótulo (junção de fluxo) ou uma instrução sem efeito conhecido na pilha a esvazia.
+    """
+    achadas = {}
+    pilha = []  # (início, fim, invariante, com operação)
+    for k in range(inicio, fim):
+        instrucao = codigo[k]
+        nome = instrucao.nome
+        if instrucao.rotulo is not None:
+            pilha.clear()
+        if nome == "LDC" or nome == "LDV":
+            pilha.append((k, k + 1, nome == "LDC" or int(instrucao.arg1) not in alterados, False))
+        elif nome in _BINARIAS or nome in _UNARIAS:
+            aridade = 2 if nome in _BINARIAS else 1
+            if len(pilha) < aridade:
+                pilha.clear()
+                pilha.append((k, k + 1, False, True))
+                continue
+            operandos = pilha[-aridade:]
+            del pilha[-aridade:]
+            invariante = nome in _PURAS and all(operando[2] for operando in operandos)
+            if not invariante:
+                for operando in operandos:
+                    _guardar(achadas, codigo, operando)
+            pilha.append((operandos[0][0], k + 1, invariante, True))
+        elif nome in _CONSUMIDORAS:
+            if pilha:
+                _guardar(achadas, codigo, pilha.pop())
+        elif nome == "RD":
+            pilha.append((k, k + 1, False, False))
+        elif nome not in ("NULL", "CALL", "ALLOC", "DALLOC"):
+            pilha.clear()
+    return achadas
+
+def _mover_do_laco(codigo, mapa, gravados, referencias, i, j):  # (antes, trocas, depois) do laço [i, j], ou None
+    """
+    O laço começa no NULL com rótulo em i e volta pelo JMP em j; o NULL com rótulo em j + 1 é a saída. Só se
+    entra no laço pelo começo e só se sai pela saída, senão o ALLOC/DALLOC dos temporários não fica pareado.
+    """
+    if j + 1 >= len(codigo) or codigo[i].nome != "NULL" or codigo[j + 1].nome != "NULL" or codigo[j + 1].rotulo is None:
+        return None
+    dono = mapa.dono[i]
+    if any(outro != dono for outro in mapa.dono[i:j + 2]):
+        return None
+    definidos = {instrucao.rotulo for instrucao in codigo[i:j + 2] if instrucao.rotulo is not None}
+    if any(not i <= k <= j for rotulo in definidos for k in referencias.get(rotulo, ())):
+        return None
+    alterados = set()
+    for instrucao in codigo[i:j + 1]:
+        nome = instrucao.nome
+        if nome in ("RETURN", "HLT"):
+            return None
+        if nome == "CALL":
+            alterados |= gravados[mapa.por_rotulo[instrucao.arg1]]
+        elif nome in SALTOS and instrucao.arg1 not in definidos:
+            return None
+        elif nome == "STR":
+            alterados.add(int(instrucao.arg1))
+        elif nome == "ALLOC":
+            alterados.update(range(int(instrucao.arg1), _topo((instrucao.arg1, instrucao.arg2)) + 1))
+
+    # ALLOCs do dono ainda abertos em i: cópias expandidas e temporários de laços externos
+    if dono is None:
+        comeco = 1
+        while codigo[comeco].nome == "ALLOC":
+            comeco += 1
+    else:
+        comeco = mapa.trechos[dono][2] + (2 if mapa.quadros[dono] else 1)
+    abertos = []
+    for k in range(comeco, i):
+        if mapa.dono[k] != dono:
+            continue
+        if codigo[k].nome == "ALLOC":
+            abertos.append((codigo[k].arg1, codigo[k].arg2))
+        elif codigo[k].nome == "DALLOC" and abertos:
+            abertos.pop()
+    internos = [(instrucao.arg1, instrucao.arg2) for instrucao in codigo[i:j + 1] if instrucao.nome == "ALLOC"]
+    base = max([mapa.livre(dono)] + [_topo(quadro) + 1 for quadro in abertos + internos])
+    # s na entrada do laço: o piso do dono mais os valores salvos pelos ALLOCs abertos; os temporários têm de
+    # caber abaixo dele para o ALLOC não ajustar s
+    vagas = mapa.piso(dono) + sum(int(quadro[1]) for quadro in abertos) - base + 1
+    if vagas <= 0:
+        return None
+    achadas = _subexpressoes_invariantes(codigo, i + 1, j, alterados)
+    if not achadas:
+        return None
+    escolhidas = sorted(achadas.items(), key=lambda item: len(item[0]) * len(item[1]), reverse=True)[:vagas]
+    escolhidas.sort(key=lambda item: item[1][0][0])     # temporários na ordem em que aparecem no laço
+    quantidade = str(len(escolhidas))
+    # logo depois do rótulo da subrotina, o NULL evita que o ALLOC dos temporários pareça ser o quadro dela
+    antes = [Instrucao(None, "NULL")] if dono is not None and mapa.trechos[dono][2] + 1 == i else []
+    antes.append(Instrucao(None, "ALLOC", str(base), quantidade))
+    trocas = {}     # início da subexpressão -> (fim, LDV do temporário)
+    for deslocamento, (instrucoes, ocorrencias) in enumerate(escolhidas):
+        endereco = str(base + deslocamento)
+        antes.extend(Instrucao(None, *campos) for campos in instrucoes)
+        antes.append(Instrucao(None, "STR", endereco))
+        for inicio, fim in ocorrencias:
+            trocas[inicio] = (fim, Instrucao(None, "LDV", endereco))
+    return antes, trocas, [Instrucao(None, "DALLOC", str(base), quantidade)]
+
+def mover_invariantes(gera):    # Calcula antes de cada laço as subexpressões que não mudam nas voltas; devolve o relatório
+    """
+    Um laço é um salto para trás até um NULL com rótulo (o "enquanto"). As subexpressões puras (sem DIVI, que
+    pode falhar) que só leem endereços que o laço e as subrotinas chamadas nele não gravam são calculadas uma
+    vez antes do laço e guardadas em temporários; dentro do laço viram um LDV. A MVD não tem registradores e
+    as variáveis dividem a memória com a pilha, então os temporários ficam num "ALLOC t k" logo acima das
+    variáveis que o laço enxerga, desalocado na saída: quem chamar uma subrotina lá dentro continua salvando e
+    restaurando esses endereços como qualquer variável. Os laços externos são tratados antes dos internos.
+    Precisa de Gera.subrotinas, que fica com as posições atualizadas.
+    """
+    relatorio = {"invariantes_de_laco": {"aplicacoes": 0, "removidas": 0}}
+    contagem = relatorio["invariantes_de_laco"]
+    codigo = instrucoes_do_gera(gera)
+    tamanho = len(codigo)
+    tratados = set()    # rótulos de começo de laço já vistos
+    while True:
+        mapa = _MapaSubrotinas(codigo, gera.subrotinas)
+        if any(instrucao.nome == "CALL" and instrucao.arg1 not in mapa.por_rotulo for instrucao in codigo):
+            break   # sem Gera.subrotinas não dá para saber o que as chamadas gravam
+        gravados = _gravados_por_subrotina(codigo, mapa)
+        posicoes = _posicoes(codigo)
+        referencias = {}    # rótulo -> índices dos saltos que o usam
+        for k, instrucao in enumerate(codigo):
+            if instrucao.nome in SALTOS:
+                referencias.setdefault(instrucao.arg1, []).append(k)
+        lacos = sorted((posicoes[instrucao.arg1], j) for j, instrucao in enumerate(codigo)
+                       if instrucao.nome == "JMP" and posicoes.get(instrucao.arg1, j) < j)
+        troca = None
+        for i, j in lacos:
+            if codigo[i].rotulo in tratados:
+                continue
+            tratados.add(codigo[i].rotulo)
+            troca = _mover_do_laco(codigo, mapa, gravados, referencias, i, j)
+            if troca is not None:
+                break
+        if troca is None:
+            break
+        antes, trocas, depois = troca
+        contagem["aplicacoes"] += int(depois[0].arg2)
+        novo = []
+        novo_indice = []    # posição de cada instrução (e do fim do código) depois da troca
+        pular_ate = 0
+        for k, instrucao in enumerate(codigo):
+            novo_indice.append(len(novo))
+            if k == i:
+                novo.extend(antes)
+            if k in trocas:
+                pular_ate, carga = trocas[k]
+                novo.append(carga)
+            elif k >= pular_ate:
+                novo.append(instrucao)
+            if k == j + 1:
+                novo.extend(depois)
+        novo_indice.append(len(novo))
+        codigo = novo
+        gera.subrotinas = [(nome, rotulo, novo_indice[inicio], novo_indice[fim])
+                           for nome, rotulo, inicio, fim in gera.subrotinas]
+    if contagem["aplicacoes"]:
+        gravar_no_gera(gera, codigo)
+        contagem["removidas"] = tamanho - len(codigo)
+    return relatorio
+
+# Seleção de superinstruções (--superinstrucoes): cada padrão é uma sequência de mnemônicos (ou conjuntos deles)
+# e uma função que recebe as instruções casadas e devolve as substitutas [(nome, arg1, arg2)], ou None se não vale.
+_SOMA = ("ADD", "SUB")
+_DESVIO_DE = {comparacao: desvio for desvio, comparacao in DESVIOS_COMPARACAO.items()}
+
+def _com_sinal(operacao, constante):    # k de "LDC k; ADD" ou -k de "LDC k; SUB"
+    return str(int(constante) if operacao == "ADD" else -int(constante))
+
+PADROES_SUPERINSTRUCOES = (
+    ("INCV", ("LDV", "LDC", _SOMA, "STR"),
+     lambda v, c, op, s: [("INCV", v.arg1, _com_sinal(op.nome, c.arg1))] if s.arg1 == v.arg1 else None),
+    ("LDVC", ("LDV", "LDC"), lambda v, c: [("LDVC", v.arg1, c.arg1)]),
+    ("LDVV", ("LDV", "LDV"), lambda a, b: [("LDVV", a.arg1, b.arg1)]),
+    ("ADDC", ("LDC", _SOMA), lambda c, op: [("ADDC", _com_sinal(op.nome, c.arg1), None)]),
+    ("COMPARA_E_DESVIA", (tuple(_DESVIO_DE), "JMPF"), lambda cmp, jmpf: [(_DESVIO_DE[cmp.nome], jmpf.arg1, None)]),
+)
+
+def _casar(codigo, i, sequencia):   # As instruções a partir de i seguem a sequência (sem rótulo depois da primeira)?
+    if i + len(sequencia) > len(codigo):
+        return None
+    trecho = codigo[i:i + len(sequencia)]
+    for posicao, (instrucao, esperado) in enumerate(zip(trecho, sequencia)):
+        if posicao and instrucao.rotulo is not None:    # um salto entraria no meio da superinstrução
+            return None
+        if instrucao.nome not in ((esperado,) if isinstance(esperado, str) else esperado):
+            return None
+    return trecho
+
+def selecionar_superinstrucoes(linhas, padroes=PADROES_SUPERINSTRUCOES):     # Linhas do Gera -> (linhas, relatório)
+    """
+    Percorre o código uma vez trocando, em cada posição, o primeiro padrão que casar (a ordem de
+    PADROES_SUPERINSTRUCOES é a prioridade). O rótulo da primeira instrução casada passa para a substituta.
+    """
+    novo, relatorio = _selecionar(ler_instrucoes(linhas), padroes)
+    return escrever_instrucoes(novo), relatorio
+
+def _selecionar(codigo, padroes):   # Lista de Instrucao -> (lista com as superinstruções, relatório)
+    relatorio = {f"super_{nome.lower()}": {"aplicacoes": 0, "removidas": 0} for nome, _, _ in padroes}
+    novo = []
+    i = 0
+    while i < len(codigo):
+        for nome, sequencia, substituir in padroes:
+            trecho = _casar(codigo, i, sequencia)
+            substitutas = substituir(*trecho) if trecho else None
+            if substitutas:
+                novo.append(Instrucao(trecho[0].rotulo, *substitutas[0]))
+                novo.extend(Instrucao(None, *partes) for partes in substitutas[1:])
+                contagem = relatorio[f"super_{nome.lower()}"]
+                contagem["aplicacoes"] += 1
+                contagem["removidas"] += len(trecho) - len(substitutas)
+                i += len(trecho)
+                break
+        else:
+            novo.append(codigo[i])
+            i += 1
+    return novo, relatorio
+
+class OtimizadorPeephole:
+    """
+    Aplica REGRAS em sequência, repetindo a rodada até nenhuma regra mudar o código (ponto fixo).
+    self.relatorio guarda, por regra, quantas vezes ela foi aplicada e quantas instruções removeu.
+    """
+
+    def __init__(self, regras=REGRAS):
+        self.regras = regras
+        self.relatorio = {nome: {"aplicacoes": 0, "removidas": 0} for nome, _ in regras}
+        self.rodadas = 0
+        self.subrotinas_removidas = []  # preenchida por otimizar_gera (eliminar_subrotinas_mortas)
+
+    def otimizar(self, linhas):     # Linhas do Gera -> linhas otimizadas
+        return escrever_instrucoes(self.otimizar_codigo(ler_instrucoes(linhas)))
+
+    def otimizar_codigo(self, codigo):  # Lista de Instrucao -> lista otimizada
+        mudou = True
+        while mudou:
+            mudou = False
+            self.rodadas += 1
+            for nome, regra in self.regras:
+                aplicacoes, remover = regra(codigo)
+                if not aplicacoes:
+                    continue
+                mudou = True
+                self.relatorio[nome]["aplicacoes"] += aplicacoes
+                self.relatorio[nome]["removidas"] += len(remover)
+                if remover:
+                    codigo = _compactar(codigo, remover)
+        return codigo
+
+    def como_texto(self):
+        linhas = [f"{'Regra':<26}{'Aplicações':>12}{'Removidas':>11}"]
+        for nome, contagem in self.relatorio.items():
+            linhas.append(f"{nome:<26}{contagem['aplicacoes']:>12}{contagem['removidas']:>11}")
+        linhas.append(f"{'total':<26}{'':>12}{sum(c['removidas'] for c in self.relatorio.values()):>11}")
+        if self.subrotinas_removidas:
+            linhas.append(f"Subrotinas nunca chamadas (removidas): {', '.join(self.subrotinas_removidas)}")
+        return "\n".join(linhas)
+
+def otimizar_gera(gera, estatisticas=None, limite_expansao=LIMITE_EXPANSAO):  # Otimiza o código de um Gera no lugar; devolve o otimizador (com o relatório)
+    """
+    Primeiro tira as subrotinas mortas, expande as pequenas no lugar das chamadas, tira dos laços o que não muda
+    e troca as chamadas de cauda (esses passos precisam de Gera.subrotinas), depois roda o peephole.
+    """
+    medir = estatisticas.medir if estatisticas else lambda fase, funcao: funcao
+    otimizador = OtimizadorPeephole()
+    otimizador.subrotinas_removidas = medir("subrotinas_mortas", eliminar_subrotinas_mortas)(gera)
+    expansao = medir("expansao_em_linha", expandir_subrotinas)(gera, limite_expansao)
+    invariantes = medir("invariantes_de_laco", mover_invariantes)(gera)
+    cauda = medir("chamadas_de_cauda", chamadas_de_cauda)(gera)
+    gravar_no_gera(gera, medir("peephole", otimizador.otimizar_codigo)(instrucoes_do_gera(gera)))
+    otimizador.relatorio.update(expansao)
+    otimizador.relatorio.update(invariantes)
+    otimizador.relatorio.update(cauda)
+    if estatisticas:
+        estatisticas.registrar_otimizacao(otimizador.relatorio, otimizador.subrotinas_removidas)
+    gera.subrotinas = []    # as posições não valem mais depois do peephole
+    return otimizador
+
+def superinstrucoes_gera(gera, estatisticas=None):    # Seleciona as superinstruções no código do Gera; devolve o relatório
+    """Roda depois do peephole: as regras dele só conhecem as instruções originais da MVD."""
+    selecionar = estatisticas.medir("superinstrucoes", _selecionar) if estatisticas else _selecionar
+    codigo, relatorio = selecionar(instrucoes_do_gera(gera), PADROES_SUPERINSTRUCOES)
+    gravar_no_gera(gera, codigo)
+    gera.subrotinas = []
+    if estatisticas:
+        estatisticas.registrar_otimizacao(relatorio)
+    return relatorio
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Otimizador peephole de um .obj da MVD.")
+    parser.add_argument("arquivo", help="caminho do .obj")
+    parser.add_argument("-o", "--saida", help="grava o resultado neste arquivo (padrão: sobrescreve a entrada)")
+    args = parser.parse_args(argv)
+
+    with open(args.arquivo, "r") as f:
+        gera = Gera(filename=args.saida or args.arquivo)
+        gera.instructions = f.read().splitlines()
+    if gera.ligado:     # sem rótulos, o otimizador não acha os alvos dos saltos nem pode remover instruções
+        print(f"'{args.arquivo}' já está ligado: otimize o .obj com rótulos, antes de ligar.", file=sys.stderr)
+        return 1
+    antes = len(gera)
+    otimizador = otimizar_gera(gera)
+    gera.escreve()
+    print(otimizador.como_texto())
+    print(f"{antes} -> {len(gera)} instruções em {otimizador.rodadas} rodadas")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())